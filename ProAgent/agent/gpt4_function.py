@@ -4,7 +4,9 @@ import json
 from colorama import Fore, Style
 
 from ProAgent.loggers.logs import logger
-from ProAgent.agent.utils import _chat_completion_request
+from ProAgent.agent.llm_client import get_llm_client
+from ProAgent.agent.utils import _achat_completion_request
+from ProAgent.agent.retry import get_retry_budget
 
 
 class OpenAIFunction():
@@ -14,6 +16,13 @@ class OpenAIFunction():
     def parse(self, **args):
         """
         Parses the given arguments by making a chat completion request.
+        The blocking version of `aparse`.
+        """
+        return get_llm_client().run(self.aparse(**args))
+
+    async def aparse(self, **args):
+        """
+        Parses the given arguments by making a chat completion request.
 
         Args:
             **args: The keyword arguments to be passed to the chat completion request.
@@ -22,24 +31,34 @@ class OpenAIFunction():
             Tuple: A tuple containing the parsed content, function name, function arguments, and the original message.
 
         Raises:
-            None.
+            TimeoutError: If no function call is generated.
+
+        Note:
+            Failed requests are already retried with backoff by `_achat_completion_request`, so they are not retried here.
+            Asking again for a missing function call draws from the same retry budget.
         """
         retry_time = 1
         max_time = 3
         for i in range(max_time):
-            output = _chat_completion_request(**args)
-
-            if isinstance(output, Dict):
-                usage = output["usage"]
-                message = output["choices"][0]["message"]
-                print(usage)
-
-                if "function_call" in message.keys():
-                    break
-                else:
-                    args['messages'].append({"role": "assistant", "content": message['content']})
-                    args['messages'].append({"role": 'user', "content": "No Function call here! You should always use a function call as your response."})
+            output = await _achat_completion_request(**args)
+
+            if not isinstance(output, Dict):
+                retry_time = max_time + 1
+                break
+
+            usage = output["usage"]
+            message = output["choices"][0]["message"]
+            print(usage)
+
+            if "function_call" in message.keys():
+                break
+            else:
+                args['messages'].append({"role": "assistant", "content": message['content']})
+                args['messages'].append({"role": 'user', "content": "No Function call here! You should always use a function call as your response."})
             retry_time += 1
+            if retry_time <= max_time and not get_retry_budget().try_spend():
+                retry_time = max_time + 1
+                break
             logger._log(f"{Fore.RED} Retry for the {retry_time}'th time{Style.RESET_ALL}")
 
         if retry_time > max_time:
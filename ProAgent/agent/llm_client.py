@@ -0,0 +1,121 @@
+import os
+import json
+import asyncio
+import threading
+
+import aiohttp
+import openai
+
+from ProAgent.config import CONFIG
+
+
+class LLMClient():
+    """Sends chat completion requests from one background event loop.
+    All the requests share a kept-alive aiohttp session, are bounded by a semaphore,
+    and are cancelled with `asyncio.wait_for` once `timeout` is exceeded.
+    The coroutines can be awaited from any event loop, and the blocking wrappers can be called from any thread.
+    """
+
+    def __init__(self, api_key: str = None, api_base: str = None, max_concurrency: int = 8, pool_size: int = 16, timeout: float = 60):
+        """
+        Initializes the client and starts its event loop thread.
+
+        Parameters:
+            api_key (str): The OpenAI api key. Defaults to None.
+            api_base (str): The base url of the api, None for the openai default. Defaults to None.
+            max_concurrency (int): The number of requests allowed in flight at the same time. Defaults to 8.
+            pool_size (int): The number of kept-alive connections. Defaults to 16.
+            timeout (float): Seconds before a request is cancelled. Defaults to 60.
+
+        Returns:
+            None
+        """
+        self.api_key = api_key
+        self.api_base = api_base
+        self.max_concurrency = max_concurrency
+        self.pool_size = pool_size
+        self.timeout = timeout
+
+        self.session = None
+        self.semaphore = None
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="llm-client", daemon=True)
+        self.thread.start()
+
+    async def _create(self, **json_data) -> dict:
+        if self.session == None:
+            self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.pool_size))
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self.semaphore:
+            # the session is a context variable of openai, which is local to this task
+            openai.aiosession.set(self.session)
+            response = await asyncio.wait_for(openai.ChatCompletion.acreate(api_key=self.api_key, api_base=self.api_base, **json_data),
+                                              timeout=self.timeout)
+        return json.loads(str(response))
+
+    async def acreate(self, **json_data) -> dict:
+        """
+        Creates a chat completion.
+
+        Args:
+            **json_data: The arguments of `openai.ChatCompletion.create`.
+
+        Returns:
+            dict: The response json.
+
+        Raises:
+            asyncio.TimeoutError: If the response doesn't come within `timeout` seconds.
+        """
+        future = asyncio.run_coroutine_threadsafe(self._create(**json_data), self.loop)
+        return await asyncio.wrap_future(future)
+
+    def run(self, coroutine):
+        """
+        Runs a coroutine on the client loop and blocks until it's done.
+
+        Args:
+            coroutine: The coroutine, typically one awaiting `acreate`.
+
+        Returns:
+            The result of the coroutine.
+        """
+        if threading.current_thread() is self.thread:
+            raise RuntimeError("LLMClient.run can't be called from the client loop, await the coroutine instead")
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def create(self, **json_data) -> dict:
+        """
+        The blocking version of `acreate`.
+        """
+        return self.run(self._create(**json_data))
+
+    def close(self):
+        async def close_session():
+            if self.session != None:
+                await self.session.close()
+        self.run(close_session())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+_llm_client = None
+_llm_client_lock = threading.Lock()
+
+def get_llm_client() -> LLMClient:
+    """
+    Returns the process-wide client configured by `CONFIG.llm_client`, creating it on first use.
+    The api key and base are read from the `OPENAI_API_KEY` and `OPENAI_API_BASE` environment variables.
+
+    Returns:
+        LLMClient: The shared client.
+    """
+    global _llm_client
+    with _llm_client_lock:
+        if _llm_client == None:
+            client_cfg = CONFIG.llm_client
+            _llm_client = LLMClient(api_key=os.environ.get('OPENAI_API_KEY'),
+                                    api_base=os.environ.get('OPENAI_API_BASE'),
+                                    max_concurrency=client_cfg["max_concurrency"],
+                                    pool_size=client_cfg["pool_size"],
+                                    timeout=client_cfg["timeout"])
+        return _llm_client
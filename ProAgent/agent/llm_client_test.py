@@ -0,0 +1,95 @@
+import json
+import time
+import asyncio
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ProAgent.agent.llm_client import LLMClient
+
+
+class StandInOpenAIHandler(BaseHTTPRequestHandler):
+    """Answers /chat/completions like the OpenAI api, echoing the last message after `delay` seconds."""
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        with server.lock:
+            server.client_ports.add(self.client_address[1])
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        time.sleep(server.delay)
+        with server.lock:
+            server.in_flight -= 1
+
+        result = {
+            "id": "chatcmpl-test",
+            "object": "chat.completion",
+            "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": body["messages"][-1]["content"]}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }
+        payload = json.dumps(result).encode("utf-8")
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except ConnectionError:
+            # the client gave up waiting
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LLMClientTest(unittest.TestCase):
+    def setUp(self) -> None:
+        """
+        Start a stand-in api server on a free local port and connect a client to it.
+        """
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StandInOpenAIHandler)
+        self.server.lock = threading.Lock()
+        self.server.client_ports = set()
+        self.server.in_flight = 0
+        self.server.max_in_flight = 0
+        self.server.delay = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = LLMClient(api_key="sk-test", api_base=f"http://127.0.0.1:{self.server.server_port}",
+                                max_concurrency=2, pool_size=2, timeout=5)
+
+    def tearDown(self) -> None:
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def create(self, content):
+        return self.client.acreate(model="gpt-4", messages=[{"role": "user", "content": content}])
+
+    def test_create(self):
+        response = self.client.create(model="gpt-4", messages=[{"role": "user", "content": "hello"}])
+        self.assertEqual(response["choices"][0]["message"]["content"], "hello")
+
+    def test_concurrency_bounded(self):
+        """
+        Requests awaited together are sent concurrently, but never more than `max_concurrency` at once.
+        """
+        self.server.delay = 0.2
+        async def create_all():
+            return await asyncio.gather(*[self.create(str(k)) for k in range(6)])
+        responses = asyncio.run(create_all())
+        self.assertEqual([response["choices"][0]["message"]["content"] for response in responses], [str(k) for k in range(6)])
+        self.assertEqual(self.server.max_in_flight, 2)
+
+    def test_connection_reused(self):
+        for k in range(3):
+            self.client.create(model="gpt-4", messages=[{"role": "user", "content": str(k)}])
+        self.assertEqual(len(self.server.client_ports), 1)
+
+    def test_timeout(self):
+        self.client.timeout = 0.1
+        self.server.delay = 0.5
+        with self.assertRaises(asyncio.TimeoutError):
+            self.client.create(model="gpt-4", messages=[{"role": "user", "content": "slow"}])
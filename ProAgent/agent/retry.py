@@ -0,0 +1,238 @@
+"""Retry policy of the chat completion requests.
+
+- `RetryPolicy` decides whether an error is worth retrying, and how long to wait before the next attempt
+  (exponential backoff with full jitter, never shorter than the wait asked by the server).
+- `TokenBucket` paces the requests of the whole process, and is paused when the server reports a rate limit.
+- `RetryBudget` caps the number of retries in a session, shared by the ReACT agent and the pseudo-node ai calls.
+"""
+import re
+import time
+import random
+import asyncio
+import threading
+from email.utils import parsedate_to_datetime
+
+import openai
+
+from ProAgent.config import CONFIG
+
+
+retryable_errors = (
+    openai.error.RateLimitError,
+    openai.error.ServiceUnavailableError,
+    openai.error.APIConnectionError,
+    openai.error.APIError,
+    openai.error.Timeout,
+    openai.error.TryAgain,
+    asyncio.TimeoutError,
+)
+
+# such as "Please try again in 20s." or "Please retry after 3 seconds."
+retry_message_pattern = re.compile(r"(?:try again|retry after)(?: in)? (\d+(?:\.\d+)?) ?(ms|s|sec|seconds?)\b", re.IGNORECASE)
+duration_pattern = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+duration_units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_duration(text: str) -> float:
+    """
+    Parses the durations of the rate limit headers, such as "20ms", "1s" or "6m0s".
+
+    Returns:
+        float: The duration in seconds, or None if the format is unknown.
+    """
+    matches = duration_pattern.findall(text)
+    if len(matches) == 0 or "".join(value + unit for value, unit in matches) != text.strip():
+        return None
+    return sum(float(value) * duration_units[unit] for value, unit in matches)
+
+def get_retry_after(error: Exception) -> float:
+    """
+    Reads how long the server asks to wait before the next request, from the headers or the message of an error.
+
+    Args:
+        error (Exception): The error of a request.
+
+    Returns:
+        float: The wait in seconds, or None if the server didn't say.
+    """
+    headers = getattr(error, "headers", None) or {}
+    headers = {str(key).lower(): str(value) for key, value in headers.items()}
+
+    if "retry-after-ms" in headers.keys():
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    if "retry-after" in headers.keys():
+        value = headers["retry-after"]
+        try:
+            return float(value)
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    resets = [parse_duration(headers[key]) for key in ["x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"] if key in headers.keys()]
+    resets = [reset for reset in resets if reset != None]
+    if len(resets) > 0:
+        return max(resets)
+
+    match = retry_message_pattern.search(str(error))
+    if match != None:
+        return float(match.group(1)) * (0.001 if match.group(2).lower() == "ms" else 1)
+    return None
+
+
+class RetryPolicy():
+    """Exponential backoff with full jitter."""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 1, max_delay: float = 60):
+        """
+        Parameters:
+            max_attempts (int): The number of attempts of a request, including the first one. Defaults to 3.
+            base_delay (float): The backoff of the first retry in seconds. Defaults to 1.
+            max_delay (float): The upper bound of a backoff in seconds. Defaults to 60.
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def is_retryable(self, error: Exception) -> bool:
+        """
+        Invalid requests (including filtered contents) and authentication errors fail the same way on every attempt.
+        """
+        if isinstance(error, openai.error.OpenAIError) and getattr(error, "http_status", None) == 429:
+            return True
+        return isinstance(error, retryable_errors)
+
+    def get_delay(self, attempt: int, retry_after: float = None) -> float:
+        """
+        Computes the wait before the retry following the failed `attempt` (counted from 0).
+
+        Args:
+            attempt (int): The index of the failed attempt.
+            retry_after (float, optional): The wait asked by the server.
+
+        Returns:
+            float: The wait in seconds.
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after != None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+
+class TokenBucket():
+    """Allows `rate` requests per second on average, with bursts of up to `capacity` requests.
+    Used from the event loop of the llm client, so all the requests of the process share it.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def get_wait(self) -> float:
+        """
+        Takes a token if one is available.
+
+        Returns:
+            float: 0 if a token is taken, otherwise the seconds to wait before asking again.
+        """
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self):
+        """
+        Waits until a request is allowed.
+        """
+        wait = self.get_wait()
+        while wait > 0:
+            await asyncio.sleep(wait)
+            wait = self.get_wait()
+
+    def pause(self, seconds: float):
+        """
+        Stops handing out tokens for `seconds`, for example when the server reports a rate limit.
+        """
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class RetryBudget():
+    """The number of retries left in a session, shared by every caller."""
+
+    def __init__(self, max_retries: int):
+        self.max_retries = max_retries
+        self.lock = threading.Lock()
+        self.used = 0
+
+    def try_spend(self) -> bool:
+        """
+        Takes one retry from the budget.
+
+        Returns:
+            bool: False if the budget is exhausted.
+        """
+        with self.lock:
+            if self.used >= self.max_retries:
+                return False
+            self.used += 1
+            return True
+
+    def reset(self):
+        """
+        Starts a new session with the full budget.
+        """
+        with self.lock:
+            self.used = 0
+
+
+_retry_policy = None
+_rate_limiter = None
+_retry_budget = None
+_retry_lock = threading.Lock()
+
+def _init_retry():
+    global _retry_policy, _rate_limiter, _retry_budget
+    with _retry_lock:
+        if _retry_policy == None:
+            retry_cfg = CONFIG.llm_retry
+            _retry_policy = RetryPolicy(max_attempts=retry_cfg["max_attempts"],
+                                        base_delay=retry_cfg["base_delay"],
+                                        max_delay=retry_cfg["max_delay"])
+            _rate_limiter = TokenBucket(rate=retry_cfg["requests_per_minute"] / 60,
+                                        capacity=retry_cfg["burst"])
+            _retry_budget = RetryBudget(max_retries=retry_cfg["retry_budget"])
+
+def get_retry_policy() -> RetryPolicy:
+    """
+    Returns the process-wide policy configured by `CONFIG.llm_retry`.
+    """
+    _init_retry()
+    return _retry_policy
+
+def get_rate_limiter() -> TokenBucket:
+    """
+    Returns the process-wide token bucket configured by `CONFIG.llm_retry`.
+    """
+    _init_retry()
+    return _rate_limiter
+
+def get_retry_budget() -> RetryBudget:
+    """
+    Returns the retry budget of the current session, configured by `CONFIG.llm_retry`.
+    """
+    _init_retry()
+    return _retry_budget
@@ -0,0 +1,72 @@
+import time
+import asyncio
+import unittest
+
+import openai
+
+from ProAgent.agent.retry import RetryPolicy, TokenBucket, RetryBudget, get_retry_after, parse_duration
+
+
+class RetryAfterTest(unittest.TestCase):
+    def make_error(self, headers={}, message="Rate limit reached", error_type=openai.error.RateLimitError):
+        return error_type(message, http_status=429, headers=headers)
+
+    def test_headers(self):
+        self.assertEqual(get_retry_after(self.make_error({"Retry-After": "7"})), 7)
+        self.assertEqual(get_retry_after(self.make_error({"retry-after-ms": "250"})), 0.25)
+        self.assertEqual(get_retry_after(self.make_error({"x-ratelimit-reset-requests": "1s", "x-ratelimit-reset-tokens": "6m0s"})), 360)
+
+    def test_message(self):
+        """
+        Azure only tells the wait in the error message.
+        """
+        self.assertEqual(get_retry_after(self.make_error(message="Please retry after 3 seconds.")), 3)
+        self.assertEqual(get_retry_after(self.make_error(message="Please try again in 20ms.")), 0.02)
+        self.assertIsNone(get_retry_after(self.make_error()))
+
+    def test_parse_duration(self):
+        self.assertEqual(parse_duration("1m30s"), 90)
+        self.assertIsNone(parse_duration("soon"))
+
+
+class RetryPolicyTest(unittest.TestCase):
+    def test_delay(self):
+        policy = RetryPolicy(base_delay=1, max_delay=10)
+        for attempt in range(6):
+            self.assertTrue(0 <= policy.get_delay(attempt) <= min(10, 2 ** attempt))
+        self.assertGreaterEqual(policy.get_delay(0, retry_after=5), 5)
+        self.assertLessEqual(policy.get_delay(0, retry_after=100), 10)
+
+    def test_retryable(self):
+        policy = RetryPolicy()
+        self.assertTrue(policy.is_retryable(openai.error.RateLimitError("slow down")))
+        self.assertTrue(policy.is_retryable(asyncio.TimeoutError()))
+        self.assertFalse(policy.is_retryable(openai.error.InvalidRequestError("filtered", param=None)))
+        self.assertFalse(policy.is_retryable(openai.error.AuthenticationError("no key")))
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_rate(self):
+        """
+        After the burst, requests are let through at `rate` per second.
+        """
+        bucket = TokenBucket(rate=20, capacity=2)
+        async def acquire_all():
+            for _ in range(6):
+                await bucket.acquire()
+        start = time.monotonic()
+        asyncio.run(acquire_all())
+        self.assertGreaterEqual(time.monotonic() - start, 4 / 20 - 0.01)
+
+    def test_pause(self):
+        bucket = TokenBucket(rate=100, capacity=10)
+        bucket.pause(0.2)
+        self.assertGreater(bucket.get_wait(), 0.1)
+
+
+class RetryBudgetTest(unittest.TestCase):
+    def test_budget(self):
+        budget = RetryBudget(max_retries=2)
+        self.assertEqual([budget.try_spend() for _ in range(3)], [True, True, False])
+        budget.reset()
+        self.assertTrue(budget.try_spend())
@@ -14,11 +14,12 @@ from copy import deepcopy
 import requests
 import tiktoken
 import time
-from func_timeout import func_set_timeout
-import func_timeout
+import asyncio
 import random
 from ProAgent.config import CONFIG
 
+from ProAgent.agent.llm_client import get_llm_client
+from ProAgent.agent.retry import get_retry_policy, get_rate_limiter, get_retry_budget, get_retry_after
 from ProAgent.loggers.logs import logger
 from ProAgent.running_recorder import RunningRecoder
 from ProAgent.utils import LLMStatusCode
@@ -32,17 +33,28 @@ def _chat_completion_request_atomic(**json_data):
         **json_data: The JSON data for the chat completion request.
         
     Returns:
-        The response from the OpenAI ChatCompletion API.
+        The response json from the OpenAI ChatCompletion API.
     """
-    openai.api_key = os.environ.get('OPENAI_API_KEY')
-    openai.api_base = os.environ.get('OPENAI_API_BASE')
-    response = openai.ChatCompletion.create(
-                **json_data,
-            )
-    return response
-
-@func_set_timeout(60)
-def _chat_completion_request_without_retry(default_completion_kwargs, messages, functions=None,function_call=None, stop=None,restrict_cache_query=True ,recorder:RunningRecoder=None, **args):
+    return get_llm_client().create(**json_data)
+
+async def _achat_completion_request_atomic(**json_data):
+    """
+    The coroutine version of `_chat_completion_request_atomic`.
+    Waits for the process-wide rate limiter before sending the request.
+    """
+    await get_rate_limiter().acquire()
+    return await get_llm_client().acreate(**json_data)
+
+def _chat_completion_request_without_retry(**args):
+    """
+    The blocking version of `_achat_completion_request_without_retry`.
+
+    Raises:
+        asyncio.TimeoutError: If the response doesn't come within `CONFIG.llm_client["timeout"]` seconds.
+    """
+    return get_llm_client().run(_achat_completion_request_without_retry(**args))
+
+async def _achat_completion_request_without_retry(default_completion_kwargs, messages, functions=None,function_call=None, stop=None,restrict_cache_query=True ,recorder:RunningRecoder=None, **args):
     """
     Executes a chat completion request without retry.
 
@@ -66,7 +78,8 @@ def _chat_completion_request_without_retry(default_completion_kwargs, messages,
         if "content" not in message.keys():
             message["content"] = ""
 
-    json_data = default_completion_kwargs
+    # copy, so that the shared default kwargs (also recorded as base_kwargs) never carry the messages
+    json_data = dict(default_completion_kwargs)
     json_data["messages"] = messages
 
     json_data.update(args)
@@ -92,34 +105,51 @@ def _chat_completion_request_without_retry(default_completion_kwargs, messages,
             response = None
 
         if response == None:
-            response = _chat_completion_request_atomic(**json_data)
-            response = json.loads(str(response))
-
-        if recorder:
-            recorder.regist_llm_inout(base_kwargs = default_completion_kwargs,
-                                    messages=messages, 
-                                    functions=functions, 
-                                    function_call=function_call, 
-                                    stop = stop,
-                                    other_args = args,
-                                    output_data = response)
-        
-        return response, LLMStatusCode.SUCCESS
+            response = await _achat_completion_request_atomic(**json_data)
     
+    except asyncio.TimeoutError:
+        raise
     except Exception as e:
         traceback.print_exc()
         logger.info("Unable to generate ChatCompletion response")
         logger.info(f"Exception: {e}")
-        if recorder:
-            recorder.regist_llm_inout(base_kwargs = default_completion_kwargs,
-                                    messages=messages, 
-                                    functions=functions, 
-                                    function_call=function_call, 
-                                    stop = stop,
-                                    other_args = args,
-                                    output_data=f"Exception: {e}")
+        _regist_llm_inout(recorder,
+                          base_kwargs = default_completion_kwargs,
+                          messages=messages, 
+                          functions=functions, 
+                          function_call=function_call, 
+                          stop = stop,
+                          other_args = args,
+                          output_data=f"Exception: {e}")
         return e, LLMStatusCode.ERROR
 
+    # out of the try: the response is already paid for, a failed record write must not make it an LLM error
+    _regist_llm_inout(recorder,
+                      base_kwargs = default_completion_kwargs,
+                      messages=messages, 
+                      functions=functions, 
+                      function_call=function_call, 
+                      stop = stop,
+                      other_args = args,
+                      output_data = response)
+    return response, LLMStatusCode.SUCCESS
+
+def _regist_llm_inout(recorder: RunningRecoder, **record):
+    """
+    Registers an LLM call in the recorder, if any. A failed registration is logged and the
+    call goes on: the write errors of the recorder are reported by its `flush` and `close`.
+
+    Args:
+        recorder (RunningRecoder): The recorder, or None.
+        **record: The arguments of `RunningRecoder.regist_llm_inout`.
+    """
+    if recorder == None:
+        return
+    try:
+        recorder.regist_llm_inout(**record)
+    except Exception as e:
+        logger.error("record write failed", f"regist_llm_inout: {e}")
+
 def _chat_completion_request(**args):
     """
     Generates a chat completion request with the given arguments and attempts to retrieve the completed output.
@@ -130,15 +160,37 @@ def _chat_completion_request(**args):
     Returns:
         The completed output if the request is successful, otherwise None.
     """
+    return get_llm_client().run(_achat_completion_request(**args))
 
-    for i in range(3):
+async def _achat_completion_request(**args):
+    """
+    The coroutine version of `_chat_completion_request`.
+    Failed requests are retried with exponential backoff, as long as the error is retryable
+    and the retry budget of the session is not exhausted. A rate limit reported by the server
+    pauses the requests of the whole process.
+    """
+    policy = get_retry_policy()
+    for i in range(policy.max_attempts):
         if i > 0:
             logger.info(f"LLM retry for the {i+1}'th time")
 
         try:
-            output, output_code = _chat_completion_request_without_retry(**args)
+            output, output_code = await _achat_completion_request_without_retry(**args)
             if output_code == LLMStatusCode.SUCCESS:
                 return output
-        except func_timeout.exceptions.FunctionTimedOut: #TLE
+            error = output
+        except asyncio.TimeoutError as e: #TLE
             logger.info(f"LLM response time out")
-            continue
+            error = e
+
+        if not policy.is_retryable(error):
+            logger.info(f"LLM error is not retryable: {type(error).__name__}")
+            return None
+        if i + 1 >= policy.max_attempts or not get_retry_budget().try_spend():
+            logger.info(f"LLM retry budget exhausted")
+            return None
+        retry_after = get_retry_after(error)
+        if retry_after != None:
+            get_rate_limiter().pause(retry_after)
+        await asyncio.sleep(policy.get_delay(i, retry_after))
+    return None
@@ -0,0 +1,31 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from ProAgent.agent import utils
+from ProAgent.utils import LLMStatusCode
+
+
+class ChatCompletionRequestTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.response = {"choices": [{"message": {"content": "answer"}}]}
+        self.recorder = mock.Mock()
+        self.recorder.query_llm_inout.return_value = None
+        self.recorder.regist_llm_inout.side_effect = RuntimeError("record write failed")
+
+    def request(self):
+        return asyncio.run(utils._achat_completion_request_without_retry({"model": "gpt-4"}, [{"role": "user", "content": "hello"}], recorder=self.recorder))
+
+    def test_failed_record_write(self):
+        """
+        A failed record write is logged, the response is still returned.
+        """
+        with mock.patch.object(utils, "_achat_completion_request_atomic", mock.AsyncMock(return_value=self.response)):
+            self.assertEqual(self.request(), (self.response, LLMStatusCode.SUCCESS))
+        self.assertEqual(self.recorder.regist_llm_inout.call_args.kwargs["output_data"], self.response)
+
+    def test_failed_request(self):
+        error = ValueError("bad request")
+        with mock.patch.object(utils, "_achat_completion_request_atomic", mock.AsyncMock(side_effect=error)):
+            self.assertEqual(self.request(), (error, LLMStatusCode.ERROR))
+        self.assertEqual(self.recorder.regist_llm_inout.call_args.kwargs["output_data"], "Exception: bad request")
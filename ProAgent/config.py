@@ -107,6 +107,103 @@ class RPAgentConfig(CfgNode):
 
         C.default_knowledge = knowledge
 
+        # how transparent nodes are handed to n8n:
+        # - cli (default): one `n8n execute` process per workflow. It is not pooled: every node execution
+        #   cold-starts n8n, pool_size only bounds the number of processes running at the same time.
+        # - rest: a long-running n8n server, reached through a pooled keep-alive session. It uses the internal
+        #   endpoints of the n8n editor (n8n 1.x), logging in as the user N8N_EMAIL / N8N_PASSWORD (environment variables).
+        #   Start the server with scripts/run_n8n.sh, this is the backend that avoids the startup cost.
+        # timeout (seconds) applies to a single workflow with both backends.
+        C.n8n_executor = {
+            'backend': 'cli',
+            'pool_size': 4,
+            'base_url': 'http://localhost:5678',
+            'timeout': 120,
+        }
+
+        # memoization of transparent node executions on disk, keyed by (node meta, type version, credential, params, input data).
+        # Disabled by default: a cached node is not executed again until its entry expires (ttl seconds),
+        # so it returns stale data for reads and skips the side effects of writes.
+        # Only enable it for workflows whose nodes are free of side effects, integrations
+        # (or "integration.resource.operation") in uncached_integrations are always executed.
+        C.node_execution_cache = {
+            'enable': False,
+            'cache_dir': './records/node_execution_cache',
+            'max_entries': 1024,
+            'max_bytes': 64 * 1024 * 1024,
+            'ttl': 24 * 3600,
+            'uncached_integrations': ['slack', 'gmail'],
+        }
+
+        # the shared asynchronous client of the chat completion api.
+        # timeout cancels a request (seconds), max_concurrency bounds the requests in flight,
+        # pool_size is the number of kept-alive connections.
+        C.llm_client = {
+            'max_concurrency': 8,
+            'pool_size': 16,
+            'timeout': 60,
+        }
+
+        # retries of the chat completion requests: exponential backoff with jitter (seconds),
+        # a token bucket shared by the whole process, and a number of retries allowed per session.
+        C.llm_retry = {
+            'max_attempts': 3,
+            'base_delay': 1,
+            'max_delay': 60,
+            'requests_per_minute': 60,
+            'burst': 10,
+            'retry_budget': 30,
+        }
+
+        # opt-in replay of the unchanged calls between two test runs of a workflow: the outputs of the last run are reused
+        # for the calls before the first edited node, workflow or changed input, instead of executing those nodes again.
+        # Disabled by default, the replayed reads are as stale as the last run. The integrations in
+        # node_execution_cache['uncached_integrations'] are never replayed, and every call after them is executed.
+        C.incremental_execution = {
+            'enable': False,
+        }
+
+        # opt-in concurrent execution of the transparent node calls in the generated workflows.
+        # A node call returns at once, and the workflow only waits for it when its output is read.
+        C.parallel_execution = {
+            'enable': False,
+            'max_workers': 4,
+        }
+
+        # where the recorder writes a session:
+        # - directory (default): one file per llm call and tool call, the layout of apa_case
+        # - jsonl: one append-only session.jsonl
+        # - sqlite: one session.sqlite in WAL mode
+        # a recording is read back with the backend it was written with, whatever this setting.
+        # the writes are applied by a writer thread, behind a queue of at most queue_size writes,
+        # and the storage is flushed once the queue has been idle for flush_interval seconds.
+        # a loaded recording is read on demand, prefetch_window records ahead of the last one read.
+        # `python -m ProAgent.record_storage <src> <dst>` exports any recording to the directory layout.
+        C.record_storage = {
+            'backend': 'directory',
+            'queue_size': 1024,
+            'flush_interval': 1.0,
+            'prefetch_window': 8,
+        }
+
+        # runtime data shown in the prompts: data longer than max_chars characters is replaced by a summary
+        # (item count, the fields with their types and an example, and the first max_items items).
+        C.data_preview = {
+            'max_chars': 2000,
+            'max_items': 3,
+            'max_fields': 20,
+            'max_example_chars': 60,
+        }
+
+        # token budget of the ReACT prompts: context_size of the model minus default_completion_kwargs['max_tokens'].
+        # Function outputs and [Output Data Info] blocks above their limit are truncated first, then the
+        # history window (at most run.slide_window_size turns) is the largest one that fits.
+        C.context_window = {
+            'context_size': 32768,
+            'max_function_output_tokens': 2048,
+            'max_output_data_info_tokens': 1024,
+        }
+
         C.environment = ENVIRONMENT.Production
 
         return C
@@ -0,0 +1,110 @@
+"""Bounded-size previews of the runtime data shown to the model.
+
+Small data is shown as it is. Larger data, such as a sheet of thousands of rows, is summarized by:
+the number of items, the schema of the items (each field with its types, how many items have it,
+and an example value), and the first items.
+"""
+from ProAgent.config import CONFIG
+
+
+def get_item_fields(item):
+    """
+    Returns the fields of an item, `item["json"]` for the n8n items `{"json": {...}}`.
+    """
+    if type(item) == dict and type(item.get("json")) == dict:
+        return item["json"]
+    if type(item) == dict:
+        return item
+    return None
+
+def shorten(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars] + f"...({len(text) - max_chars} more chars)"
+
+def is_short(data, max_chars: int) -> bool:
+    """
+    Checks if the text of some data is at most `max_chars` long, without printing all the items of a long list.
+    """
+    if type(data) != list:
+        return len(str(data)) <= max_chars
+    length = 2
+    for item in data:
+        length += len(str(item)) + 2
+        if length > max_chars + 2:
+            return False
+    return True
+
+def infer_schema(items: list, max_fields: int) -> dict:
+    """
+    Infers the schema of a list of items.
+
+    Args:
+        items (list): The items, usually `[{"json": {...}}, ...]`.
+        max_fields (int): The number of fields described at most.
+
+    Returns:
+        dict: field name -> {"types": list of type names, "count": number of items with the field, "example": first non-empty value}.
+    """
+    schema = {}
+    for item in items:
+        fields = get_item_fields(item)
+        if fields == None:
+            continue
+        for key, value in fields.items():
+            if key not in schema.keys():
+                if len(schema) >= max_fields:
+                    continue
+                schema[key] = {"types": [], "count": 0, "example": None}
+            summary = schema[key]
+            type_name = type(value).__name__
+            if type_name not in summary["types"]:
+                summary["types"].append(type_name)
+            summary["count"] += 1
+            if summary["example"] == None and value not in [None, "", [], {}]:
+                summary["example"] = value
+    return schema
+
+def preview_data(data, max_chars: int = None, max_items: int = None, max_fields: int = None, max_example_chars: int = None) -> str:
+    """
+    Describes runtime data within about `max_chars` characters.
+
+    Args:
+        data (any): The input or output data of a node or workflow, usually `[{"json": {...}}, ...]`.
+        max_chars (int, optional): Data whose text is shorter is shown as it is. Defaults to `CONFIG.data_preview`.
+        max_items (int, optional): The number of first items shown in a summary.
+        max_fields (int, optional): The number of fields described in a summary.
+        max_example_chars (int, optional): The length of an example value in a summary.
+
+    Returns:
+        str: The data, or its summary.
+    """
+    preview_cfg = CONFIG.data_preview
+    max_chars = max_chars if max_chars != None else preview_cfg["max_chars"]
+    max_items = max_items if max_items != None else preview_cfg["max_items"]
+    max_fields = max_fields if max_fields != None else preview_cfg["max_fields"]
+    max_example_chars = max_example_chars if max_example_chars != None else preview_cfg["max_example_chars"]
+
+    if is_short(data, max_chars):
+        return str(data)
+    if type(data) != list:
+        return shorten(str(data), max_chars)
+
+    lines = [f"{len(data)} items (summarized, the full data is too long to show)."]
+    schema = infer_schema(data, max_fields)
+    if len(schema) > 0:
+        lines.append("Fields of the items:")
+        for key, summary in schema.items():
+            example = shorten(repr(summary["example"]), max_example_chars)
+            lines.append(f"  - {key} ({' | '.join(summary['types'])}, in {summary['count']}/{len(data)} items): e.g. {example}")
+        field_count = len(set(key for item in data if get_item_fields(item) != None for key in get_item_fields(item).keys()))
+        if field_count > len(schema):
+            lines.append(f"  ({field_count - len(schema)} more fields not shown)")
+
+    lines.append(f"The first {min(max_items, len(data))} items:")
+    item_chars = max(max_example_chars, max_chars // (2 * max(1, max_items)))
+    for item in data[:max_items]:
+        lines.append("  " + shorten(str(item), item_chars))
+    if len(data) > max_items:
+        lines.append(f"  ({len(data) - max_items} more items not shown)")
+    return "\n".join(lines)
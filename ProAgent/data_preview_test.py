@@ -0,0 +1,57 @@
+import unittest
+
+from ProAgent import utils
+from ProAgent.data_preview import preview_data, infer_schema
+
+
+class DataPreviewTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.rows = [{"json": {"name": f"flow {k}", "cost": k * 10, "sales": k * 15 if k % 2 == 0 else None}} for k in range(5000)]
+
+    def test_short_data_unchanged(self):
+        data = [{"json": {"name": "flow", "cost": 10}}]
+        self.assertEqual(preview_data(data), str(data))
+        self.assertEqual(preview_data(None), "None")
+
+    def test_summary(self):
+        """
+        A long list is described by its count, schema and first items, within a bounded size.
+        """
+        preview = preview_data(self.rows, max_chars=500, max_items=2)
+        self.assertLess(len(preview), 1000)
+        self.assertTrue(preview.startswith("5000 items"))
+        self.assertIn("  - name (str, in 5000/5000 items): e.g. 'flow 0'", preview)
+        self.assertIn("  - sales (int | NoneType, in 5000/5000 items): e.g. 0", preview)
+        self.assertIn(str(self.rows[1]), preview)
+        self.assertNotIn(str(self.rows[2]), preview)
+        self.assertIn("(4998 more items not shown)", preview)
+
+    def test_schema(self):
+        schema = infer_schema([{"json": {"a": 1}}, {"b": "x"}, "not an item"], max_fields=1)
+        self.assertEqual(schema, {"a": {"types": ["int"], "count": 1, "example": 1}})
+
+    def test_long_text(self):
+        self.assertEqual(preview_data("x" * 30, max_chars=10), "x" * 10 + "...(20 more chars)")
+
+    def test_cached_on_test_result(self):
+        """
+        The preview is computed once per assigned value.
+        """
+        result = utils.TestResult(output_data=self.rows)
+        preview = result.get_preview("output_data")
+        self.assertIs(result.get_preview("output_data"), preview)
+        self.assertIn(preview, result.to_str())
+        result.output_data = [{"json": {"name": "other"}}]
+        self.assertEqual(result.get_preview("output_data"), str(result.output_data))
+
+    def test_assigned_after_change_in_place(self):
+        """
+        Data changed in place and assigned again gets a new preview, even though it is the same list.
+        """
+        result = utils.TestResult(output_data=[{"json": {"name": "first"}}])
+        result.get_preview("output_data")
+        output_data = result.output_data
+        output_data.append({"json": {"name": "second"}})
+        result.output_data = output_data
+        self.assertEqual(result.get_preview("output_data"), str(output_data))
+        self.assertEqual(result.get_preview("input_data"), "[]")
@@ -0,0 +1,199 @@
+"""Keeps the ReACT prompts within the context of the model.
+
+- `TokenCounter` counts tokens with tiktoken, caching the count of every text it has seen. If the encoding
+  can't be loaded (for example offline), it falls back to an estimate of 4 characters per token.
+- `ContextWindowManager` first truncates the oversized function outputs and `[Output Data Info]` blocks,
+  then keeps the largest history window that fits the token budget.
+"""
+import re
+import json
+import threading
+from functools import lru_cache
+from typing import List, Dict
+
+import tiktoken
+
+from ProAgent.config import CONFIG
+from ProAgent.loggers.logs import logger
+
+# tokens added by the chat format, see https://github.com/openai/openai-cookbook (How to count tokens)
+tokens_per_message = 4
+tokens_per_reply = 3
+
+# the body of an "[Output Data Info]" block, up to the next context separator of the error stack
+output_data_info_pattern = re.compile(r"(\[Output Data Info\]\n)(.*?)(?=\n-{24}|\Z)", re.DOTALL)
+
+
+class TokenCounter():
+    """Counts the tokens of texts for a model."""
+
+    def __init__(self, model: str, cache_size: int = 4096):
+        """
+        Parameters:
+            model (str): The model name, such as "gpt-4-32k".
+            cache_size (int): The number of texts whose count is kept. Defaults to 4096.
+        """
+        self.model = model
+        try:
+            self.encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            self.encoding = self._get_encoding("cl100k_base")
+        except Exception as e:
+            logger.warn(f"can't load the tokenizer of {model}, token counts are estimated: {e}")
+            self.encoding = None
+        self.count = lru_cache(maxsize=cache_size)(self._count)
+
+    @staticmethod
+    def _get_encoding(name: str):
+        try:
+            return tiktoken.get_encoding(name)
+        except Exception as e:
+            logger.warn(f"can't load the tokenizer {name}, token counts are estimated: {e}")
+            return None
+
+    def _count(self, text: str) -> int:
+        if self.encoding == None:
+            return (len(text) + 3) // 4
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def count_message(self, message: Dict) -> int:
+        """
+        Counts the tokens of a chat message, including the tokens of the chat format.
+        """
+        tokens = tokens_per_message
+        for key, value in message.items():
+            if value == None:
+                continue
+            tokens += self.count(value if type(value) == str else json.dumps(value, ensure_ascii=False))
+        return tokens
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+        Keeps the beginning of a text, up to `max_tokens` tokens.
+
+        Args:
+            text (str): The text.
+            max_tokens (int): The number of tokens kept.
+
+        Returns:
+            str: The text, or its beginning followed by a note of the number of truncated tokens.
+        """
+        tokens = self.count(text)
+        if tokens <= max_tokens:
+            return text
+        if self.encoding == None:
+            head = text[:max_tokens * 4]
+        else:
+            head = self.encoding.decode(self.encoding.encode(text, disallowed_special=())[:max_tokens])
+        return head + f"\n... ({tokens - max_tokens} tokens truncated)"
+
+
+class ContextWindowManager():
+    """Fits the messages of a turn into a token budget."""
+
+    def __init__(self, counter: TokenCounter, token_budget: int, max_window: int,
+                 max_function_output_tokens: int, max_output_data_info_tokens: int):
+        """
+        Parameters:
+            counter (TokenCounter): The token counter of the model.
+            token_budget (int): The number of prompt tokens allowed, the completion excluded.
+            max_window (int): The number of last turns kept at most.
+            max_function_output_tokens (int): The size above which a function output is truncated.
+            max_output_data_info_tokens (int): The size above which the body of an `[Output Data Info]` block is truncated.
+        """
+        self.counter = counter
+        self.token_budget = token_budget
+        self.max_window = max_window
+        self.max_function_output_tokens = max_function_output_tokens
+        self.max_output_data_info_tokens = max_output_data_info_tokens
+        self.last_prompt_tokens = 0
+
+    def truncate_output_data_info(self, text: str) -> str:
+        """
+        Truncates the body of each `[Output Data Info]` block of a text.
+        """
+        if "[Output Data Info]" not in text:
+            return text
+        return output_data_info_pattern.sub(lambda match: match.group(1) + self.counter.truncate(match.group(2), self.max_output_data_info_tokens), text)
+
+    def shrink_message(self, message: Dict) -> Dict:
+        """
+        Truncates the runtime dumps of a message, and its content if it is an oversized function output.
+
+        Returns:
+            dict: The message itself if nothing is truncated, otherwise a truncated copy.
+        """
+        content = message.get("content")
+        if type(content) != str:
+            return message
+        new_content = self.truncate_output_data_info(content)
+        if message["role"] == "function":
+            new_content = self.counter.truncate(new_content, self.max_function_output_tokens)
+        if new_content is content:
+            return message
+        return dict(message, content=new_content)
+
+    def fit(self, prefix: List[Dict], history: List[tuple], user_message: Dict, functions: list = None) -> List[Dict]:
+        """
+        Builds the messages of a turn within the token budget.
+
+        Args:
+            prefix (list[dict]): The system messages, always kept.
+            history (list[tuple[dict, dict]]): The (assistant message, function message) of the turns, oldest first.
+            user_message (dict): The message of the turn, always kept.
+            functions (list, optional): The function schemas sent with the messages.
+
+        Returns:
+            list[dict]: The messages, with the largest history window (up to `max_window` turns) that fits.
+        """
+        prefix = [self.shrink_message(message) for message in prefix]
+        user_message = self.shrink_message(user_message)
+        used_tokens = tokens_per_reply + sum(self.counter.count_message(message) for message in prefix + [user_message])
+        if functions != None:
+            used_tokens += self.counter.count(json.dumps(functions, ensure_ascii=False))
+
+        window = []
+        for assistant_message, function_message in reversed(history[-self.max_window:] if self.max_window > 0 else []):
+            pair = [self.shrink_message(assistant_message), self.shrink_message(function_message)]
+            pair_tokens = sum(self.counter.count_message(message) for message in pair)
+            if used_tokens + pair_tokens > self.token_budget:
+                break
+            used_tokens += pair_tokens
+            window = pair + window
+
+        if used_tokens > self.token_budget:
+            logger.warn(f"the prompt needs {used_tokens} tokens without history, more than the budget of {self.token_budget} tokens")
+        self.last_prompt_tokens = used_tokens
+        return prefix + window + [user_message]
+
+
+def create_context_window_manager(max_window: int) -> ContextWindowManager:
+    """
+    Creates a manager configured by `CONFIG.context_window` and `CONFIG.default_completion_kwargs`.
+
+    Args:
+        max_window (int): The number of last turns kept at most, such as `cfg.run.slide_window_size`.
+
+    Returns:
+        ContextWindowManager: The manager.
+    """
+    window_cfg = CONFIG.context_window
+    completion_kwargs = CONFIG.default_completion_kwargs
+    return ContextWindowManager(counter=get_token_counter(completion_kwargs["model"]),
+                                token_budget=window_cfg["context_size"] - completion_kwargs["max_tokens"],
+                                max_window=max_window,
+                                max_function_output_tokens=window_cfg["max_function_output_tokens"],
+                                max_output_data_info_tokens=window_cfg["max_output_data_info_tokens"])
+
+
+_token_counters = {}
+_token_counter_lock = threading.Lock()
+
+def get_token_counter(model: str) -> TokenCounter:
+    """
+    Returns the process-wide token counter of a model, creating it on first use.
+    """
+    with _token_counter_lock:
+        if model not in _token_counters.keys():
+            _token_counters[model] = TokenCounter(model)
+        return _token_counters[model]
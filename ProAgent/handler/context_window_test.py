@@ -0,0 +1,69 @@
+import unittest
+
+from ProAgent.handler.context_window import TokenCounter, ContextWindowManager, tokens_per_message, tokens_per_reply
+
+
+class EstimatingTokenCounter(TokenCounter):
+    """Counts 4 characters per token, whether the tokenizer can be downloaded or not."""
+
+    def __init__(self):
+        super().__init__("gpt-4")
+        self.encoding = None
+
+
+class ContextWindowManagerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.counter = EstimatingTokenCounter()
+        self.prefix = [{"role": "system", "content": "s" * 400}]
+        self.user_message = {"role": "user", "content": "u" * 400}
+        # every turn is 2 * (4 + 100 tokens of content + role and name tokens)
+        self.history = [({"role": "assistant", "content": f"{k}" * 400}, {"role": "function", "name": "f", "content": f"{k}" * 400}) for k in range(5)]
+
+    def make_manager(self, token_budget, max_window=5):
+        return ContextWindowManager(self.counter, token_budget=token_budget, max_window=max_window,
+                                    max_function_output_tokens=150, max_output_data_info_tokens=10)
+
+    def turn_tokens(self, k):
+        return sum(self.counter.count_message(message) for message in self.history[k])
+
+    def test_largest_window(self):
+        """
+        The last turns are kept, as many as fit the budget.
+        """
+        fixed = tokens_per_reply + self.counter.count_message(self.prefix[0]) + self.counter.count_message(self.user_message)
+        manager = self.make_manager(token_budget=fixed + self.turn_tokens(4) + self.turn_tokens(3) + 1)
+        messages = manager.fit(self.prefix, self.history, self.user_message)
+        self.assertEqual([message["content"][0] for message in messages], ["s", "3", "3", "4", "4", "u"])
+        self.assertLessEqual(manager.last_prompt_tokens, manager.token_budget)
+
+        self.assertEqual(len(self.make_manager(token_budget=10 ** 6, max_window=2).fit(self.prefix, self.history, self.user_message)), 6)
+        self.assertEqual(len(self.make_manager(token_budget=10 ** 6, max_window=0).fit(self.prefix, self.history, self.user_message)), 2)
+        self.assertEqual(len(self.make_manager(token_budget=1).fit(self.prefix, self.history, self.user_message)), 2)
+
+    def test_short_history(self):
+        """
+        All the turns are kept when there are fewer than `max_window`.
+        """
+        messages = self.make_manager(token_budget=10 ** 6, max_window=3).fit(self.prefix, self.history[:2], self.user_message)
+        self.assertEqual([message["content"][0] for message in messages], ["s", "0", "0", "1", "1", "u"])
+        self.assertEqual(len(self.make_manager(token_budget=10 ** 6, max_window=3).fit(self.prefix, [], self.user_message)), 2)
+
+    def test_truncate_function_output(self):
+        history = [({"role": "assistant", "content": "a"}, {"role": "function", "name": "f", "content": "x" * 2000})]
+        messages = self.make_manager(token_budget=10 ** 6).fit(self.prefix, history, self.user_message)
+        self.assertTrue(messages[2]["content"].startswith("x" * 600))
+        self.assertTrue(messages[2]["content"].endswith("(350 tokens truncated)"))
+        self.assertEqual(len(history[0][1]["content"]), 2000)
+
+    def test_truncate_output_data_info(self):
+        """
+        Only the body of the block is truncated, up to the next context separator.
+        """
+        content = "error\n[Output Data Info]\n" + "d" * 400 + "\n------------------------\nIn Function: mainWorkflow"
+        user_message = {"role": "user", "content": content}
+        messages = self.make_manager(token_budget=10 ** 6).fit(self.prefix, [], user_message)
+        self.assertEqual(messages[-1]["content"], "error\n[Output Data Info]\n" + "d" * 40 + "\n... (90 tokens truncated)\n------------------------\nIn Function: mainWorkflow")
+        self.assertIs(self.make_manager(token_budget=10 ** 6).fit(self.prefix, [], self.user_message)[-1], self.user_message)
+
+    def test_count_message(self):
+        self.assertEqual(self.counter.count_message({"role": "user", "content": "abcdefgh"}), tokens_per_message + 1 + 2)
@@ -0,0 +1,101 @@
+import sys
+from typing import List, Dict
+
+from ProAgent.handler import react_prompt
+from ProAgent.utils import Action
+from ProAgent.frontend.highlight_code import highlight_code
+from ProAgent.handler.context_window import ContextWindowManager
+
+
+class ReACTPromptBuilder():
+    """Assembles the messages of the ReACT turns incrementally.
+
+    - the system messages are built once, and again only when the compiler invalidates its system prompt;
+    - each finished turn is turned into its assistant and function messages once, in `add_turn`;
+    - the user prompt template is split around the code once, the code itself is rendered by the code runner,
+      which only re-renders the nodes and workflows that changed;
+    - with a `ContextWindowManager`, the history window is the largest one within the token budget.
+
+    The returned messages share the dictionaries of the previous turns, they must not be modified.
+    """
+
+    def __init__(self, compiler, query, history_window: int = 3, context_manager: ContextWindowManager = None):
+        """
+        Parameters:
+            compiler (Compiler): The compiler, providing the system prompt and the code.
+            query (userQuery): The user query.
+            history_window (int): The number of last turns sent to the model, without a context manager. Defaults to 3.
+            context_manager (ContextWindowManager, optional): Chooses the history window and truncates the runtime dumps.
+        """
+        self.compiler = compiler
+        self.query = query
+        self.history_window = history_window
+        self.context_manager = context_manager
+
+        self.system_prompt = None
+        self.prefix = () # the frozen system messages
+        self.history: List[tuple] = [] # (assistant message, function message) of every turn
+
+        refine_prompt = ""
+        if len(query.refine_prompt) > 0:
+            refine_prompt = f"The user have some additional requirements to your work. Please refine your work based on the following requirements:\n ```\n{query.refine_prompt}```\n"
+        user_prompt = react_prompt.user_prompt.replace("{{refine_prompt}}", refine_prompt)
+        self.user_prompt_head, self.user_prompt_tail = user_prompt.split("{{now_codes}}")
+
+    def get_prefix(self) -> tuple:
+        """
+        Returns the system messages, rebuilt only if the system prompt of the compiler changed.
+        """
+        system_prompt = self.compiler.get_system_prompt(self.query.print_self())
+        if system_prompt is not self.system_prompt:
+            self.system_prompt = system_prompt
+            self.prefix = (
+                {"role":"system","content": react_prompt.system_prompt_1},
+                {"role":"system","content": react_prompt.system_prompt_2},
+                {"role":"system","content": system_prompt},
+            )
+        return self.prefix
+
+    def add_turn(self, assistant_message: Dict, action: Action):
+        """
+        Records a finished turn.
+
+        Args:
+            assistant_message (dict): The message of the model.
+            action (Action): The handled tool call of the message.
+
+        Returns:
+            None
+        """
+        self.history.append((assistant_message, {
+            "role":"function",
+            "name": action.tool_name,
+            "content": action.tool_output,
+        }))
+
+    def get_console_user_prompt(self) -> str:
+        """
+        Returns the user prompt with the clean code for the console, highlighted only if the console is a terminal.
+        """
+        clean_code = self.compiler.code_runner.print_clean_code(indent=4)
+        if sys.stdout.isatty():
+            clean_code = highlight_code(clean_code)
+        return self.user_prompt_head + clean_code + self.user_prompt_tail
+
+    def build(self, functions: list = None) -> List[Dict]:
+        """
+        Returns the messages of the next turn: the system messages, the last turns, and the user prompt with the current code.
+
+        Args:
+            functions (list, optional): The function schemas sent with the messages, counted in the token budget.
+        """
+        user_message = {"role":"user","content": self.user_prompt_head + self.compiler.code_runner.print_code() + self.user_prompt_tail}
+        if self.context_manager != None:
+            return self.context_manager.fit(list(self.get_prefix()), self.history, user_message, functions=functions)
+
+        messages = list(self.get_prefix())
+        for assistant_message, function_message in self.history[-self.history_window:] if self.history_window > 0 else []:
+            messages.append(assistant_message)
+            messages.append(function_message)
+        messages.append(user_message)
+        return messages
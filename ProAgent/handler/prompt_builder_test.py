@@ -0,0 +1,70 @@
+import unittest
+
+from ProAgent.utils import Action, userQuery
+from ProAgent.handler import react_prompt
+from ProAgent.handler.prompt_builder import ReACTPromptBuilder
+
+
+class StandInCodeRunner():
+    def __init__(self):
+        self.code = "def action_0(): pass"
+
+    def print_code(self):
+        return self.code
+
+    def print_clean_code(self, indent=0):
+        return " " * indent + self.code
+
+
+class StandInCompiler():
+    def __init__(self):
+        self.code_runner = StandInCodeRunner()
+        self.system_prompt_cache = {}
+
+    def get_system_prompt(self, user_query):
+        if user_query not in self.system_prompt_cache.keys():
+            self.system_prompt_cache[user_query] = f"system prompt of {user_query}"
+        return self.system_prompt_cache[user_query]
+
+
+class ReACTPromptBuilderTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.compiler = StandInCompiler()
+        self.query = userQuery(task="send a mail", additional_information=[], refine_prompt="use gmail")
+        self.builder = ReACTPromptBuilder(compiler=self.compiler, query=self.query, history_window=2)
+
+    def add_turn(self, k):
+        self.builder.add_turn({"role": "assistant", "content": f"thought {k}"}, Action(tool_name=f"tool_{k}", tool_output=f"output {k}"))
+
+    def test_messages(self):
+        """
+        The messages are the same as the ones the handler used to rebuild every turn.
+        """
+        for k in range(3):
+            self.add_turn(k)
+        messages = self.builder.build()
+        self.assertEqual([message["role"] for message in messages], ["system"] * 3 + ["assistant", "function"] * 2 + ["user"])
+        self.assertEqual(messages[0]["content"], react_prompt.system_prompt_1)
+        self.assertEqual(messages[2]["content"], self.compiler.get_system_prompt(self.query.print_self()))
+        self.assertEqual(messages[3]["content"], "thought 1")
+        self.assertEqual(messages[6], {"role": "function", "name": "tool_2", "content": "output 2"})
+        refine_prompt = f"The user have some additional requirements to your work. Please refine your work based on the following requirements:\n ```\nuse gmail```\n"
+        user_prompt = react_prompt.user_prompt.replace("{{refine_prompt}}", refine_prompt).replace("{{now_codes}}", "def action_0(): pass")
+        self.assertEqual(messages[-1], {"role": "user", "content": user_prompt})
+
+    def test_incremental(self):
+        """
+        The system messages are reused until the system prompt changes, only the code is rendered again.
+        """
+        first = self.builder.build()
+        self.compiler.code_runner.code = "def action_1(): pass"
+        second = self.builder.build()
+        self.assertIs(first[0], second[0])
+        self.assertIn("action_1", second[-1]["content"])
+
+        self.compiler.system_prompt_cache = {}
+        self.assertIsNot(self.builder.build()[2], second[2])
+
+    def test_console_not_highlighted(self):
+        # stdout is captured by the test runner, so it isn't a terminal
+        self.assertIn("    def action_0(): pass", self.builder.get_console_user_prompt())
@@ -75,8 +75,7 @@ class Logger(metaclass=Singleton):
             None
         """
         # create log directory if it doesn't exist
-        this_files_dir_path = os.path.dirname(__file__)
-        log_dir = os.path.join(this_files_dir_path, "../logs")
+        log_dir = self.get_log_directory()
         if not os.path.exists(log_dir):
             os.makedirs(log_dir)
 
@@ -302,8 +301,7 @@ class Logger(metaclass=Singleton):
             None: This function does not return anything.
         """
         # Define log directory
-        this_files_dir_path = os.path.dirname(__file__)
-        log_dir = os.path.join(this_files_dir_path, "../logs")
+        log_dir = self.get_log_directory()
 
         # Create a handler for JSON files
         json_file_path = os.path.join(log_dir, file_name)
@@ -317,13 +315,15 @@ class Logger(metaclass=Singleton):
 
     def get_log_directory(self):
         """
-        Returns the absolute path to the log directory.
+        Returns the absolute path to the log directory, $PROAGENT_LOG_DIR if set, else ProAgent/logs.
 
         Returns:
             str: The absolute path to the log directory.
         """
-        this_files_dir_path = os.path.dirname(__file__)
-        log_dir = os.path.join(this_files_dir_path, "../logs")
+        log_dir = os.environ.get("PROAGENT_LOG_DIR")
+        if log_dir == None:
+            this_files_dir_path = os.path.dirname(__file__)
+            log_dir = os.path.join(this_files_dir_path, "../logs")
         return os.path.abspath(log_dir)
 
 
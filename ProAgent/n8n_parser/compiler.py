@@ -10,10 +10,12 @@ from ProAgent.utils import NodeType, ToolCallStatus, Action, WorkflowType, TestR
 from ProAgent.n8n_parser.node import n8nPythonNode, n8nNodeMeta
 from ProAgent.n8n_parser.workflow import n8nPythonWorkflow
 from ProAgent.n8n_parser.param_parser import parse_properties
+from ProAgent.n8n_parser.node_catalog import NodeCatalog, resolve_integration, filter_integration_data, is_catalog_fresh, load_integrations
 from ProAgent.n8n_tester.run_code import n8nPythonCodeRunner
 from ProAgent.n8n_parser.intrinsic_functions import mainWorkflow_code
 from ProAgent.loggers.logs import print_action_base, print_action_tool
 from ProAgent.running_recorder import RunningRecoder
+from ProAgent.handler import react_prompt
 from ProAgent.config import CONFIG
 
 
@@ -44,6 +46,8 @@ class Compiler():
         self.mainWorkflow: n8nPythonWorkflow = n8nPythonWorkflow(
             implement_code = mainWorkflow_code
         )
+        self.flatten_tools_cache: str = None # the output of `print_flatten_tools`, until the next `resolve`
+        self.system_prompt_cache: Dict[str, str] = {} # user query -> system_prompt_3
         self.resolve()
 
         self.code_runner = n8nPythonCodeRunner()
@@ -55,6 +59,12 @@ class Compiler():
         self.update_runtime()
 
 
+    def close(self):
+        """
+        Releases the resources of the code runner, see `n8nPythonCodeRunner.close`.
+        """
+        self.code_runner.close()
+
     def resolve_integration(self, integration_json):
         """
         Generates a function comment for the given function body.
@@ -68,67 +78,30 @@ class Compiler():
         Raises:
             AssertionError: If the target resource name is not found in the integration data.
         """
-        integration_name = integration_json["name"].split(".")[-1]
-        integration_data = {}
-        no_resource = True
-        no_operation = True
-        for property in integration_json["properties"]:
-            if property["name"] == "resource":
-                for resource in property["options"]:
-                    integration_data[resource["value"]] = {}
-                no_resource = False
-                break
-
-        if no_resource:
-            integration_data["default"] = {}
-        
+        return resolve_integration(integration_json)
 
-        for property in integration_json["properties"]:
-            if property["name"] == "operation":
-                target_resource_name = "default"
-                if "displayOptions" in property.keys():
-                    assert "show" in property["displayOptions"].keys() and "resource" in property["displayOptions"]["show"].keys()
-                    assert len(property["displayOptions"]["show"]["resource"]) == 1
-                    target_resource_name = property["displayOptions"]["show"]["resource"][0]
-
-                    assert target_resource_name in integration_data.keys(), f"{target_resource_name} in {integration_data.keys()}"
-
-                target_resource = integration_data[target_resource_name]
-                for operation in property["options"]:
-                    operation_name = operation["value"]
-                    operation_description = ""
-                    if "description" in operation.keys():
-                        operation_description = operation["description"]
-                    node_type = NodeType.trigger if "trigger" in integration_name.lower() or "webhook" in integration_name.lower() else NodeType.action
-                    target_resource[operation_name] = n8nNodeMeta(
-                                                                node_type=node_type,
-                                                                integration_name=integration_name,
-                                                                resource_name=target_resource_name,
-                                                                operation_name=operation_name,
-                                                                operation_description=operation_description
-                                                            )
-                    no_operation = False
-
-        if no_operation:
-            assert no_resource
-            node_type = NodeType.trigger if "trigger" in integration_name.lower() or "webhook" in integration_name.lower() else NodeType.action
-            integration_data["default"]["default"] = n8nNodeMeta(
-                                                                node_type=node_type,
-                                                                integration_name=integration_name,
-                                                                resource_name="default",
-                                                                operation_name="default",
-                                                                operation_description=""
-                                                            )
-
-        return integration_data
+    def invalidate_prompt_cache(self):
+        """
+        Drops the cached tool list and system prompts, they are rebuilt on the next call.
+        Called by `resolve`, and to be called whenever `flattened_tools` or the knowledge changes.
+        """
+        self.flatten_tools_cache = None
+        self.system_prompt_cache = {}
 
     def print_flatten_tools(self):
         """
         Generates a function comment for the given function body in a markdown code block with the correct language syntax.
 
+        The output is cached until `invalidate_prompt_cache` is called.
+
         Returns:
             str: The function comment in markdown format.
         """
+        if self.flatten_tools_cache == None:
+            self.flatten_tools_cache = self._print_flatten_tools()
+        return self.flatten_tools_cache
+
+    def _print_flatten_tools(self):
         output_description_list = []
         for k1, integration_name in enumerate(list(self.flattened_tools.keys())):
             operation_counter = 1
@@ -147,6 +120,25 @@ class Compiler():
         
         return "\n".join(output_description_list)
 
+    def get_system_prompt(self, user_query: str) -> str:
+        """
+        Fills `system_prompt_3` with the user query and the tool list.
+
+        The output is cached until `invalidate_prompt_cache` is called.
+
+        Args:
+            user_query (str): The printed user query.
+
+        Returns:
+            str: The system prompt.
+        """
+        if user_query not in self.system_prompt_cache.keys():
+            specific_prompt = react_prompt.system_prompt_3
+            specific_prompt = specific_prompt.replace("{{user_query}}", user_query)
+            specific_prompt = specific_prompt.replace("{{flatten_tools}}", self.print_flatten_tools())
+            self.system_prompt_cache[user_query] = specific_prompt
+        return self.system_prompt_cache[user_query]
+
 
 
     def resolve(self):
@@ -161,12 +153,30 @@ class Compiler():
         Returns:
         None
         """
+        self.invalidate_prompt_cache()
         self.json_data = []
         self.flattened_tools = {}
         white_list = self.cfg.parser.nodes_whtie_list
         available_integrations = [item.split(".")[0] for item in self.cfg.parser.nodes_whtie_list]
-        with open(self.cfg.parser.nodes_json_path, "r", encoding="utf-8") as reader:
-            integrations = json.load(reader)
+        catalog_path = self.cfg.parser.get("node_catalog_path", None)
+        pseudo_nodes_dir = self.cfg.parser.get("pseudo_nodes_dir", None)
+        if is_catalog_fresh(catalog_path, self.cfg.parser.nodes_json_path, pseudo_nodes_dir):
+            # only the white listed rows are read, the node jsons are read when a node is defined
+            catalog = NodeCatalog(catalog_path)
+            integrations = []
+            for name in dict.fromkeys(available_integrations):
+                integration = catalog.get_integration(name)
+                if integration != None:
+                    integrations.append((integration["position"], name, integration))
+            for _, name, integration in sorted(integrations):
+                splits = white_list[available_integrations.index(name)].split(".")
+                integration_data = catalog.get_integration_data(name, *splits[1:])
+                node_json = catalog.get_lazy_node_json(name)
+                self.json_data.append(node_json)
+                self.add_flattened_tool(name, integration_data, integration["description"], node_json, integration["pseudoNode"])
+        else:
+            # the same integrations as the catalog, the pseudo nodes replacing those of nodes.json
+            integrations = load_integrations(self.cfg.parser.nodes_json_path, pseudo_nodes_dir)
             for integration_json in integrations:
                 name = integration_json["name"].split(".")[-1]
                 if name not in available_integrations:
@@ -174,32 +184,40 @@ class Compiler():
                 self.json_data.append(integration_json)
                 integration_data = self.resolve_integration(integration_json=integration_json)
                 index = available_integrations.index(name)
-                full_tool = white_list[index]
-                splits = full_tool.split(".")
-                if len(splits) > 1:
-                    for key in list(integration_data.keys()):
-                        if key != splits[1]:
-                            integration_data.pop(key)
-                    if len(splits) == 3:
-                        for action in list(integration_data[splits[1]].keys()):
-                            if action != splits[2]:
-                                integration_data[splits[1]].pop(action)
+                filter_integration_data(integration_data, white_list[index])
 
                 integration_description = integration_json["description"] if "description" in integration_json.keys() else ""
-                self.flattened_tools[name] = {
-                    "data": integration_data,
-                    "meta": {
-                        "description": integration_description,
-                        "node_json": integration_json,
-                    },
-                    "pseudoNode": integration_json['pseudoNode'] if "pseudoNode" in integration_json.keys() else False
-                }
-                if self.flattened_tools[name]['pseudoNode']:
-                    print(colored(f"load pseudoNode {name}", color='cyan'))
+                pseudo_node = integration_json['pseudoNode'] if "pseudoNode" in integration_json.keys() else False
+                self.add_flattened_tool(name, integration_data, integration_description, integration_json, pseudo_node)
         out = self.print_flatten_tools()
 
 
 
+    def add_flattened_tool(self, name, integration_data, integration_description, node_json, pseudo_node):
+        """
+        Adds a resolved integration to `flattened_tools`.
+
+        Args:
+            name (str): The integration name.
+            integration_data (dict): resource name -> operation name -> n8nNodeMeta.
+            integration_description (str): The description of the integration.
+            node_json (Mapping): The node json of the integration.
+            pseudo_node (bool): Whether the integration is a pseudoNode.
+
+        Returns:
+            None
+        """
+        self.flattened_tools[name] = {
+            "data": integration_data,
+            "meta": {
+                "description": integration_description,
+                "node_json": node_json,
+            },
+            "pseudoNode": pseudo_node
+        }
+        if pseudo_node:
+            print(colored(f"load pseudoNode {name}", color='cyan'))
+
     def update_runtime(self):
         """
         Updates the runtime by flashing the code and running it.
@@ -299,6 +317,7 @@ class Compiler():
         workflow_name = tool_input["workflow_name"]
         implement_code = tool_input["code"]
 
+        self.code_runner.mark_dirty(workflow_name)
         if workflow_name == "mainWorkflow":
             self.mainWorkflow.implement_code = implement_code
             return ToolCallStatus.ToolCallSuccess, json.dumps({"result": "mainWorkflow has been re-implemented","status": ToolCallStatus.ToolCallSuccess.name})
@@ -383,6 +402,7 @@ class Compiler():
 
                 node.note_todo = tool_input["TODO"]
                 node.node_comments = tool_input["comments"]
+                self.code_runner.mark_dirty(function_name)
                 return param_rewrite_status, output_str
         assert False
 
@@ -443,6 +463,7 @@ class Compiler():
             new_node.params = parse_properties(new_node)
             new_node.update_implement_info()
             self.nodes.append(new_node)
+            self.code_runner.mark_dirty(new_node.get_name())
 
             tool_call_status.append(ToolCallStatus.ToolCallSuccess)
             tool_call_result.append(f"function_{k} defined SUCCESS: {integration_name}->{resource_name}->{operation_name}")
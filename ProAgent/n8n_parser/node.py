@@ -174,9 +174,7 @@ class n8nPythonNode():
         Raises:
             TypeError: If the input parameter is not of type dict.
         """
-        new_params = deepcopy(self.params)
-        for key in new_params:
-            new_params[key].refresh()
+        new_params = {key: param.spawn() for key, param in self.params.items()}
 
         tool_call_result = []
 
@@ -0,0 +1,302 @@
+"""A precompiled catalog of the n8n integrations, built once from `nodes.json` and `pseudo_nodes_json/`.
+
+The catalog is a SQLite database with the resolved operations of every integration, keyed by
+(integration, resource, operation), and the node json of every integration stored aside.
+`Compiler.resolve` only reads the rows of the white listed tools, and a node json is only read
+when a node of that integration is defined.
+
+Build it with `python -m ProAgent.n8n_parser.node_catalog` (see `scripts/build_node_catalog.sh`).
+"""
+import os
+import json
+import sqlite3
+import argparse
+import threading
+from collections.abc import Mapping
+
+from ProAgent.utils import NodeType
+from ProAgent.n8n_parser.node import n8nNodeMeta
+
+CATALOG_FORMAT_VERSION = 1
+
+
+def resolve_integration(integration_json: dict) -> dict:
+    """
+    Resolves the resources and operations of an integration.
+
+    Args:
+        integration_json (dict): A dictionary containing information about the integration.
+
+    Returns:
+        dict: resource name -> operation name -> n8nNodeMeta.
+
+    Raises:
+        AssertionError: If the target resource name is not found in the integration data.
+    """
+    integration_name = integration_json["name"].split(".")[-1]
+    integration_data = {}
+    no_resource = True
+    no_operation = True
+    for property in integration_json["properties"]:
+        if property["name"] == "resource":
+            for resource in property["options"]:
+                integration_data[resource["value"]] = {}
+            no_resource = False
+            break
+
+    if no_resource:
+        integration_data["default"] = {}
+
+    node_type = NodeType.trigger if "trigger" in integration_name.lower() or "webhook" in integration_name.lower() else NodeType.action
+    for property in integration_json["properties"]:
+        if property["name"] == "operation":
+            target_resource_name = "default"
+            if "displayOptions" in property.keys():
+                assert "show" in property["displayOptions"].keys() and "resource" in property["displayOptions"]["show"].keys()
+                assert len(property["displayOptions"]["show"]["resource"]) == 1
+                target_resource_name = property["displayOptions"]["show"]["resource"][0]
+
+                assert target_resource_name in integration_data.keys(), f"{target_resource_name} in {integration_data.keys()}"
+
+            target_resource = integration_data[target_resource_name]
+            for operation in property["options"]:
+                operation_name = operation["value"]
+                operation_description = ""
+                if "description" in operation.keys():
+                    operation_description = operation["description"]
+                target_resource[operation_name] = n8nNodeMeta(
+                                                            node_type=node_type,
+                                                            integration_name=integration_name,
+                                                            resource_name=target_resource_name,
+                                                            operation_name=operation_name,
+                                                            operation_description=operation_description
+                                                        )
+                no_operation = False
+
+    if no_operation:
+        assert no_resource
+        integration_data["default"]["default"] = n8nNodeMeta(
+                                                            node_type=node_type,
+                                                            integration_name=integration_name,
+                                                            resource_name="default",
+                                                            operation_name="default",
+                                                            operation_description=""
+                                                        )
+
+    return integration_data
+
+def filter_integration_data(integration_data: dict, full_tool: str) -> dict:
+    """
+    Keeps the resource and operation named by a white list entry, such as "slack.message.post", in place.
+
+    Args:
+        integration_data (dict): The output of `resolve_integration`.
+        full_tool (str): "integration", "integration.resource" or "integration.resource.operation".
+
+    Returns:
+        dict: The same dictionary.
+    """
+    splits = full_tool.split(".")
+    if len(splits) > 1:
+        for key in list(integration_data.keys()):
+            if key != splits[1]:
+                integration_data.pop(key)
+        if len(splits) == 3:
+            for action in list(integration_data[splits[1]].keys()):
+                if action != splits[2]:
+                    integration_data[splits[1]].pop(action)
+    return integration_data
+
+def load_integrations(nodes_json_path: str, pseudo_nodes_dir: str = None) -> list:
+    """
+    Reads the integrations of `nodes.json`, where the pseudo nodes replace the integrations of the same name.
+
+    Args:
+        nodes_json_path (str): The path of `nodes.json`.
+        pseudo_nodes_dir (str, optional): The directory of the pseudo node json files.
+
+    Returns:
+        list[dict]: The integration jsons, the pseudo nodes last.
+    """
+    with open(nodes_json_path, "r", encoding="utf-8") as reader:
+        integrations = json.load(reader)
+    if pseudo_nodes_dir != None and os.path.isdir(pseudo_nodes_dir):
+        for file_name in sorted(os.listdir(pseudo_nodes_dir)):
+            if not file_name.endswith(".json"):
+                continue
+            with open(os.path.join(pseudo_nodes_dir, file_name), "r", encoding="utf-8") as reader:
+                pseudo_node_json = json.load(reader)
+            integrations = [integration_json for integration_json in integrations if integration_json["name"] != pseudo_node_json["name"]]
+            integrations.append(pseudo_node_json)
+    return integrations
+
+def build_node_catalog(nodes_json_path: str, catalog_path: str, pseudo_nodes_dir: str = None) -> int:
+    """
+    Builds the catalog, replacing an existing one.
+
+    Args:
+        nodes_json_path (str): The path of `nodes.json`.
+        catalog_path (str): The path of the catalog to write.
+        pseudo_nodes_dir (str, optional): The directory of the pseudo node json files.
+
+    Returns:
+        int: The number of integrations in the catalog.
+    """
+    integrations = load_integrations(nodes_json_path, pseudo_nodes_dir)
+    temp_path = catalog_path + ".tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    connection = sqlite3.connect(temp_path)
+    with connection:
+        connection.execute("CREATE TABLE integrations (name TEXT PRIMARY KEY, position INTEGER NOT NULL, description TEXT NOT NULL, pseudo_node INTEGER NOT NULL, node_json TEXT NOT NULL)")
+        connection.execute("CREATE TABLE operations (integration TEXT NOT NULL, resource TEXT NOT NULL, operation TEXT NOT NULL, position INTEGER NOT NULL, "
+                           "node_type TEXT NOT NULL, description TEXT NOT NULL, PRIMARY KEY (integration, resource, operation))")
+        for position, integration_json in enumerate(integrations):
+            name = integration_json["name"].split(".")[-1]
+            connection.execute("INSERT OR REPLACE INTO integrations VALUES (?, ?, ?, ?, ?)",
+                               (name, position, integration_json.get("description", ""), int(integration_json.get("pseudoNode", False)), json.dumps(integration_json, ensure_ascii=False)))
+            connection.execute("DELETE FROM operations WHERE integration = ?", (name,))
+            operation_position = 0
+            for resource_name, resource in resolve_integration(integration_json).items():
+                for operation_name, node_meta in resource.items():
+                    connection.execute("INSERT INTO operations VALUES (?, ?, ?, ?, ?, ?)",
+                                       (name, resource_name, operation_name, operation_position, node_meta.node_type.name, node_meta.operation_description))
+                    operation_position += 1
+        connection.execute(f"PRAGMA user_version = {CATALOG_FORMAT_VERSION}")
+    connection.close()
+    os.replace(temp_path, catalog_path)
+    return len(integrations)
+
+def get_source_paths(nodes_json_path: str, pseudo_nodes_dir: str = None) -> list:
+    """
+    Lists the files a catalog is built from, with the pseudo node directory itself, whose time changes when a file is added or removed.
+
+    Returns:
+        list[str]: The existing paths among `nodes.json`, the pseudo node directory and its json files.
+    """
+    paths = [nodes_json_path]
+    if pseudo_nodes_dir != None and os.path.isdir(pseudo_nodes_dir):
+        paths.append(pseudo_nodes_dir)
+        paths.extend(os.path.join(pseudo_nodes_dir, file_name) for file_name in sorted(os.listdir(pseudo_nodes_dir)) if file_name.endswith(".json"))
+    return [path for path in paths if os.path.exists(path)]
+
+def is_catalog_fresh(catalog_path: str, nodes_json_path: str, pseudo_nodes_dir: str = None) -> bool:
+    """
+    Checks that the catalog exists and is not older than any of its sources present, see `get_source_paths`.
+    """
+    if catalog_path == None or not os.path.exists(catalog_path):
+        return False
+    catalog_time = os.path.getmtime(catalog_path)
+    return all(catalog_time >= os.path.getmtime(path) for path in get_source_paths(nodes_json_path, pseudo_nodes_dir))
+
+
+class LazyNodeJson(Mapping):
+    """The node json of an integration, read from the catalog on the first access."""
+
+    def __init__(self, catalog: "NodeCatalog", name: str):
+        self.catalog = catalog
+        self.name = name
+        self.data = None
+
+    def _load(self) -> dict:
+        if self.data == None:
+            self.data = self.catalog.get_node_json(self.name)
+        return self.data
+
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def __deepcopy__(self, memo):
+        # read-only, shared by the nodes of the integration like the dictionary it replaces
+        return self
+
+
+class NodeCatalog():
+    """Read access to a catalog built by `build_node_catalog`."""
+
+    def __init__(self, catalog_path: str):
+        self.catalog_path = catalog_path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(f"file:{catalog_path}?mode=ro", uri=True, check_same_thread=False)
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != CATALOG_FORMAT_VERSION:
+            raise ValueError(f"{catalog_path} is a version {version} catalog, rebuild it with `python -m ProAgent.n8n_parser.node_catalog`")
+
+    def _query(self, sql: str, parameters: tuple = ()) -> list:
+        with self.lock:
+            return self.connection.execute(sql, parameters).fetchall()
+
+    def get_integration(self, name: str) -> dict:
+        """
+        Args:
+            name (str): The integration name, such as "slack".
+
+        Returns:
+            dict: {"position", "description", "pseudoNode"}, or None if the catalog has no such integration.
+        """
+        rows = self._query("SELECT position, description, pseudo_node FROM integrations WHERE name = ?", (name,))
+        if len(rows) == 0:
+            return None
+        return {"position": rows[0][0], "description": rows[0][1], "pseudoNode": bool(rows[0][2])}
+
+    def get_integration_data(self, name: str, resource_name: str = None, operation_name: str = None) -> dict:
+        """
+        Reads the resolved operations of an integration, the same as `resolve_integration` (then `filter_integration_data`).
+
+        Args:
+            name (str): The integration name.
+            resource_name (str, optional): Only read this resource.
+            operation_name (str, optional): Only read this operation of the resource.
+
+        Returns:
+            dict: resource name -> operation name -> n8nNodeMeta.
+        """
+        sql = "SELECT resource, operation, node_type, description FROM operations WHERE integration = ?"
+        parameters = [name]
+        if resource_name != None:
+            sql += " AND resource = ?"
+            parameters.append(resource_name)
+            if operation_name != None:
+                sql += " AND operation = ?"
+                parameters.append(operation_name)
+        integration_data = {}
+        for resource, operation, node_type, description in self._query(sql + " ORDER BY position", tuple(parameters)):
+            integration_data.setdefault(resource, {})[operation] = n8nNodeMeta(
+                                                                    node_type=NodeType[node_type],
+                                                                    integration_name=name,
+                                                                    resource_name=resource,
+                                                                    operation_name=operation,
+                                                                    operation_description=description
+                                                                )
+        return integration_data
+
+    def get_node_json(self, name: str) -> dict:
+        """
+        Reads the full node json of an integration.
+        """
+        rows = self._query("SELECT node_json FROM integrations WHERE name = ?", (name,))
+        if len(rows) == 0:
+            raise KeyError(name)
+        return json.loads(rows[0][0])
+
+    def get_lazy_node_json(self, name: str) -> LazyNodeJson:
+        return LazyNodeJson(self, name)
+
+    def close(self):
+        self.connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the node catalog read by the compiler from nodes.json and the pseudo nodes.")
+    parser.add_argument("--nodes_json_path", default="ProAgent/n8n_parser/nodes.json")
+    parser.add_argument("--pseudo_nodes_dir", default="ProAgent/n8n_parser/pseudo_nodes_json")
+    parser.add_argument("--catalog_path", default="ProAgent/n8n_parser/nodes_catalog.sqlite")
+    args = parser.parse_args()
+    count = build_node_catalog(args.nodes_json_path, args.catalog_path, pseudo_nodes_dir=args.pseudo_nodes_dir)
+    print(f"{args.catalog_path}: {count} integrations")
@@ -0,0 +1,109 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from copy import deepcopy
+
+import omegaconf
+
+from ProAgent.utils import NodeType
+from ProAgent.n8n_parser.compiler import Compiler
+from ProAgent.n8n_parser.node_catalog import NodeCatalog, build_node_catalog, resolve_integration, filter_integration_data, is_catalog_fresh
+
+pseudo_nodes_dir = os.path.join(os.path.dirname(__file__), "pseudo_nodes_json")
+
+slack_json = {
+    "name": "n8n-nodes-base.slack",
+    "description": "Consume Slack API",
+    "properties": [
+        {"name": "resource", "options": [{"value": "channel"}, {"value": "message"}]},
+        {"name": "operation", "displayOptions": {"show": {"resource": ["channel"]}}, "options": [{"value": "create"}]},
+        {"name": "operation", "displayOptions": {"show": {"resource": ["message"]}},
+         "options": [{"value": "post", "description": "Post a message"}, {"value": "update"}]},
+    ],
+}
+manual_trigger_json = {"name": "n8n-nodes-base.manualTrigger", "properties": []}
+stale_ai_json = {"name": "n8n-nodes-base.aiCompletion", "description": "replaced by the pseudo node", "properties": []}
+
+
+class NodeCatalogTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.base_dir = tempfile.mkdtemp()
+        self.nodes_json_path = os.path.join(self.base_dir, "nodes.json")
+        with open(self.nodes_json_path, "w", encoding="utf-8") as writer:
+            json.dump([slack_json, manual_trigger_json, stale_ai_json], writer)
+        self.catalog_path = os.path.join(self.base_dir, "nodes_catalog.sqlite")
+        self.assertEqual(build_node_catalog(self.nodes_json_path, self.catalog_path, pseudo_nodes_dir=pseudo_nodes_dir), 3)
+        self.catalog = NodeCatalog(self.catalog_path)
+
+    def tearDown(self) -> None:
+        self.catalog.close()
+        shutil.rmtree(self.base_dir)
+
+    def test_same_as_resolve(self):
+        """
+        The catalog gives the same operations as resolving and filtering the node json.
+        """
+        for full_tool in ["slack", "slack.message", "slack.message.post"]:
+            expected = filter_integration_data(resolve_integration(slack_json), full_tool)
+            self.assertEqual(self.catalog.get_integration_data(*full_tool.split(".")), expected)
+        self.assertEqual(self.catalog.get_integration_data("manualTrigger")["default"]["default"].node_type, NodeType.trigger)
+
+    def test_pseudo_node(self):
+        integration = self.catalog.get_integration("aiCompletion")
+        self.assertTrue(integration["pseudoNode"])
+        self.assertEqual(integration["position"], 2)
+        self.assertIsNone(self.catalog.get_integration("gmail"))
+
+    def test_lazy_node_json(self):
+        node_json = self.catalog.get_lazy_node_json("slack")
+        self.assertIsNone(node_json.data)
+        self.assertEqual(node_json["properties"], slack_json["properties"])
+        self.assertEqual(dict(node_json), slack_json)
+        self.assertIs(deepcopy(node_json), node_json)
+
+    def test_fresh(self):
+        self.assertTrue(is_catalog_fresh(self.catalog_path, self.nodes_json_path))
+        os.utime(self.nodes_json_path, (os.path.getmtime(self.catalog_path) + 10,) * 2)
+        self.assertFalse(is_catalog_fresh(self.catalog_path, self.nodes_json_path))
+        self.assertFalse(is_catalog_fresh(os.path.join(self.base_dir, "missing.sqlite"), self.nodes_json_path))
+
+    def test_fresh_pseudo_nodes(self):
+        """
+        Editing, adding or removing a pseudo node makes the catalog stale.
+        """
+        local_pseudo_nodes_dir = os.path.join(self.base_dir, "pseudo_nodes_json")
+        shutil.copytree(pseudo_nodes_dir, local_pseudo_nodes_dir)
+        build_node_catalog(self.nodes_json_path, self.catalog_path, pseudo_nodes_dir=local_pseudo_nodes_dir)
+        self.assertTrue(is_catalog_fresh(self.catalog_path, self.nodes_json_path, local_pseudo_nodes_dir))
+        later = (os.path.getmtime(self.catalog_path) + 10,) * 2
+
+        pseudo_node_path = os.path.join(local_pseudo_nodes_dir, "ai.json")
+        os.utime(pseudo_node_path, later)
+        self.assertFalse(is_catalog_fresh(self.catalog_path, self.nodes_json_path, local_pseudo_nodes_dir))
+        os.remove(pseudo_node_path)
+        os.utime(local_pseudo_nodes_dir, later)
+        self.assertFalse(is_catalog_fresh(self.catalog_path, self.nodes_json_path, local_pseudo_nodes_dir))
+
+    def test_compiler_fallback(self):
+        """
+        The compiler resolves the same tools from the catalog and, without a fresh catalog, from the json files.
+        """
+        def resolve(catalog_path):
+            compiler = Compiler.__new__(Compiler)
+            compiler.cfg = omegaconf.OmegaConf.create({"parser": {
+                "nodes_json_path": self.nodes_json_path,
+                "pseudo_nodes_dir": pseudo_nodes_dir,
+                "node_catalog_path": catalog_path,
+                "nodes_whtie_list": ["slack.message.post", "manualTrigger", "aiCompletion.default.default"],
+            }})
+            compiler.resolve()
+            return {name: (tool["data"], tool["meta"]["description"], tool["pseudoNode"], dict(tool["meta"]["node_json"]))
+                    for name, tool in compiler.flattened_tools.items()}
+
+        from_catalog = resolve(self.catalog_path)
+        from_json = resolve(None)
+        self.assertEqual(list(from_catalog.keys()), ["slack", "manualTrigger", "aiCompletion"])
+        self.assertEqual(from_json, from_catalog)
+        self.assertTrue(from_json["aiCompletion"][2])
@@ -1,3 +1,4 @@
+import threading
 from enum import Enum, unique
 
 from ProAgent.n8n_parser.node import n8nPythonNode
@@ -26,14 +27,66 @@ def parse_display_options(display_options, node: n8nPythonNode) -> bool:
         return False
     return True
 
+# (id of the node json, integration, resource, operation) -> (the node json, the parameter schemas of the operation, shared by all its nodes).
+# The node json is the node definition loaded by a Compiler, keeping it in the entry pins its id, which is never reused by another definition.
+_schema_cache = {}
+_schema_cache_lock = threading.Lock()
+
+# ((parameter name, schema id) of each parameter, max_depth) -> the param description lines
+_description_cache = {}
+_description_cache_lock = threading.Lock()
+
 def parse_properties(node: n8nPythonNode):
     """
     This function parses the properties of a given node and returns a dictionary with parameter descriptions for the model.
+
+    The parameter trees are built once per (node definition, integration, resource, operation) in the process and shared by the nodes:
+    they are the immutable schema, `n8nPythonNode.parse_parameters` fills spawned value nodes instead of changing them.
+    The node definition is `node.node_json`, by identity: the compilers loading other node definitions get their own schemas.
     Args:
         node (n8nPythonNode): The node object containing the properties to parse.
     Returns:
-        dict: A dictionary containing the parameter descriptions.
+        dict: A dictionary containing the parameter descriptions, a new dict for every node.
     """
+    key = (id(node.node_json), node.node_meta.integration_name, node.node_meta.resource_name, node.node_meta.operation_name)
+    with _schema_cache_lock:
+        if key not in _schema_cache.keys():
+            _schema_cache[key] = (node.node_json, _parse_properties(node))
+        return dict(_schema_cache[key][1])
+
+def clear_schema_cache():
+    """
+    Drops the cached parameter schemas, for example after the node definitions are rebuilt.
+    """
+    with _schema_cache_lock:
+        _schema_cache.clear()
+    with _description_cache_lock:
+        _description_cache.clear()
+
+def describe_parameters(params: dict, max_depth: int = 1) -> list:
+    """
+    Renders the param descriptions of a node, as shown in the prompt.
+
+    The descriptions only depend on the schema of the parameters, not on their values, so the lines are cached
+    by the schema ids of the parameters and shared by all the nodes of an operation, before and after their parameters are parsed.
+    Args:
+        params (dict): The parameters of the node, `n8nPythonNode.params`.
+        max_depth (int): The depth below which the optional collections are hidden. Defaults to 1.
+    Returns:
+        list[str]: The description lines, shared by the callers: they must not be modified.
+    """
+    key = (tuple((name, param.schema_id) for name, param in params.items()), max_depth)
+    with _description_cache_lock:
+        lines = _description_cache.get(key)
+    if lines == None:
+        lines = []
+        for k, (name, param) in enumerate(params.items()):
+            lines.extend(param.to_description(prefix_ids=f"{k}", indent=0, max_depth=max_depth))
+        with _description_cache_lock:
+            _description_cache[key] = lines
+    return lines
+
+def _parse_properties(node: n8nPythonNode):
     node_json = node.node_json
     parameter_descriptions = {}
 
@@ -0,0 +1,87 @@
+import unittest
+
+from ProAgent.utils import NodeType, ToolCallStatus
+from ProAgent.n8n_parser.node import n8nPythonNode, n8nNodeMeta
+from ProAgent.n8n_parser.param_parser import parse_properties, clear_schema_cache, describe_parameters
+from ProAgent.n8n_parser.parameters_test import properties_json
+
+node_json = {
+    "name": "n8n-nodes-base.slack",
+    "properties": [
+        {"name": "resource", "type": "options", "options": [{"name": "Message", "value": "message"}]},
+        {"name": "channel", "displayName": "Channel", "type": "string", "default": "",
+         "displayOptions": {"show": {"operation": ["update"]}}},
+    ] + [dict(content, displayOptions={"show": {"resource": ["message"], "operation": ["post"]}}) for content in properties_json],
+}
+
+
+def make_node(node_id, operation_name):
+    return n8nPythonNode(node_id=node_id, node_json=node_json,
+                         node_meta=n8nNodeMeta(node_type=NodeType.action, integration_name="slack", resource_name="message", operation_name=operation_name))
+
+
+class ParsePropertiesTest(unittest.TestCase):
+    def setUp(self) -> None:
+        clear_schema_cache()
+
+    def tearDown(self) -> None:
+        clear_schema_cache()
+
+    def test_shared_schema(self):
+        """
+        The nodes of an operation share the parameter trees, the nodes of another operation don't.
+        """
+        first, second = make_node(1, "post"), make_node(2, "post")
+        first.params = parse_properties(first)
+        second.params = parse_properties(second)
+        self.assertEqual(list(first.params.keys()), [content["name"] for content in properties_json])
+        self.assertIsNot(first.params, second.params)
+        for key in first.params.keys():
+            self.assertIs(first.params[key], second.params[key])
+
+        update = make_node(3, "update")
+        self.assertEqual(list(parse_properties(update).keys()), ["channel"])
+
+        clear_schema_cache()
+        self.assertIsNot(parse_properties(first)["text"], second.params["text"])
+
+    def test_other_node_definition(self):
+        """
+        The nodes loaded from another node definition (e.g. by another Compiler) don't get the cached schemas.
+        """
+        first = make_node(1, "update")
+        first.params = parse_properties(first)
+        other_node_json = dict(node_json, properties=[dict(node_json["properties"][1], name="channelId")])
+        second = n8nPythonNode(node_id=2, node_json=other_node_json, node_meta=first.node_meta)
+        self.assertEqual(list(parse_properties(second).keys()), ["channelId"])
+        self.assertEqual(list(parse_properties(make_node(3, "update")).keys()), ["channel"])
+
+    def test_values_not_shared(self):
+        first, second = make_node(1, "post"), make_node(2, "post")
+        first.params = parse_properties(first)
+        second.params = parse_properties(second)
+        self.assertEqual(first.parse_parameters({"text": "hello"})[0], ToolCallStatus.ToolCallSuccess)
+        self.assertEqual(first.params["text"].to_json(), "hello")
+        self.assertEqual(second.params["text"].to_json(), None)
+        self.assertEqual(parse_properties(make_node(3, "post"))["text"].to_json(), None)
+
+    def test_describe_parameters(self):
+        """
+        The descriptions are rendered once per schema and depth, whatever the values.
+        """
+        first, second = make_node(1, "post"), make_node(2, "post")
+        first.params = parse_properties(first)
+        second.params = parse_properties(second)
+        lines = describe_parameters(first.params)
+        expected = [line for k, param in enumerate(first.params.values()) for line in param.to_description(prefix_ids=f"{k}", indent=0, max_depth=1)]
+        self.assertEqual(lines, expected)
+        self.assertIn('0 params["text"]: string = "", Required: Text', lines)
+        self.assertIs(describe_parameters(second.params), lines)
+
+        self.assertEqual(first.parse_parameters({"text": "hello", "otherOptions": {"icon": "x"}})[0], ToolCallStatus.ToolCallSuccess)
+        self.assertIs(describe_parameters(first.params), lines)
+        self.assertIsNot(describe_parameters(first.params, max_depth=3), lines)
+
+        update = make_node(3, "update")
+        update.params = parse_properties(update)
+        self.assertEqual(describe_parameters(update.params), ['0 params["channel"]: string = "": Channel'])
@@ -1,8 +1,9 @@
+import sys
 from enum import Enum, unique
 from abc import abstractmethod
 from typing import Any
-from dataclasses import dataclass, field
-from copy import deepcopy
+from functools import lru_cache
+from itertools import count
 import json
 
 from ProAgent.utils import ToolCallStatus
@@ -30,12 +31,17 @@ class n8nParameterType(Enum):
     ERROR = "error" #不能有这个
 
 
-def visit_parameter(param_json: dict):
+def visit_parameter(param_json: dict, father: 'n8nParameter' = None, key: str = None):
     """
     Visits a parameter based on its type and returns the result.
+
+    The tree is built top-down: a node is placed under its father before its own children are visited,
+    so the qualified name and depth of every node are computed once from its father's.
     
     Parameters:
         param_json (dict): A dictionary representing the parameter in JSON format.
+        father (n8nParameter, optional): The parent node, None for a parameter of a node.
+        key (str, optional): The key of the parameter in `father.meta`.
         
     Returns:
         The result of visiting the parameter based on its type.
@@ -46,39 +52,71 @@ def visit_parameter(param_json: dict):
     # if param_type == n8nParameterType.NOTICE.value:
     #     return n8nNotice.visit(param_json)
     if param_type == n8nParameterType.BOOLEAN.value:
-        return n8nBoolean.visit(param_json)
+        return n8nBoolean.visit(param_json, father, key)
     elif param_type == n8nParameterType.NUMBER.value:
-        return n8nNumber.visit(param_json)
+        return n8nNumber.visit(param_json, father, key)
     elif param_type == n8nParameterType.STRING.value:
-        return n8nString.visit(param_json)
+        return n8nString.visit(param_json, father, key)
     elif param_type == n8nParameterType.OPTIONS.value:
-        return n8nOption.visit(param_json)
+        return n8nOption.visit(param_json, father, key)
     elif param_type == n8nParameterType.COLLECTION.value:
-        return n8nCollection.visit(param_json)
+        return n8nCollection.visit(param_json, father, key)
     elif param_type == n8nParameterType.FIXEDCOLLECTION.value:
-        return n8nFixedCollection.visit(param_json)
+        return n8nFixedCollection.visit(param_json, father, key)
     elif param_type == n8nParameterType.RESOURCELOCATOR.value:
-        return n8nResourceLocator.visit(param_json)
+        return n8nResourceLocator.visit(param_json, father, key)
     else:
         print(f"{param_json['name']}: {param_type} not parsed")
         # raise NotImplementedError
 
 
-@dataclass
+def intern_string(value):
+    """
+    Interns a string, so that the equal names and descriptions of all the parameter trees are stored once. Other values are returned as they are.
+    """
+    if type(value) == str:
+        return sys.intern(value)
+    return value
+
+# numbers the schema nodes, a spawned value node keeps the id of the node it is spawned from
+_schema_ids = count()
+
+@lru_cache(maxsize=None)
+def get_slot_names(cls) -> tuple:
+    """
+    Returns the names of all the `__slots__` of a parameter class, including the ones of its base classes.
+    """
+    return tuple(name for klass in reversed(cls.__mro__) for name in getattr(klass, "__slots__", ()))
+
+
 class n8nParameter():
-    father: 'n8nParameter' = None
-    param_type: n8nParameterType = n8nParameterType.ERROR 
+    """The base class of the parameter nodes.
+
+    Thousands of nodes are built for the large integrations, so the classes declare `__slots__` instead of having a `__dict__`
+    per instance, and the names and descriptions are interned.
+    """
+    __slots__ = ("father", "param_type", "name", "required", "default", "description", "no_data_expression",
+                 "display_string", "multiple_values", "use_expression", "data_is_set", "parameter_name", "depth", "schema_id")
+
+    father: 'n8nParameter'
+    param_type: n8nParameterType
 
-    name: str = ""
-    required: bool = False
-    default: Any = None
-    description: str = ""
-    no_data_expression: bool = False
-    display_string: str = ""
-    multiple_values: bool = False
+    name: str
+    required: bool
+    default: Any
+    description: str
+    no_data_expression: bool
+    display_string: str
+    multiple_values: bool
 
-    use_expression: bool = False
-    data_is_set: bool = False
+    use_expression: bool
+    data_is_set: bool
+
+    # computed by `set_father` when the tree is built
+    parameter_name: str
+    depth: int
+    # identifies the schema, shared by the value nodes spawned from it
+    schema_id: int
 
     def __init__(self, param_json):
         """
@@ -90,6 +128,19 @@ class n8nParameter():
         Returns:
             None
         """
+        self.father = None
+        self.param_type = n8nParameterType.ERROR
+        self.name = ""
+        self.required = False
+        self.default = None
+        self.description = ""
+        self.no_data_expression = False
+        self.display_string = ""
+        self.multiple_values = False
+        self.use_expression = False
+        self.data_is_set = False
+        self.schema_id = next(_schema_ids)
+
         if "type" in param_json.keys():
             self.param_type = n8nParameterType(param_json["type"])
         if "name" in param_json.keys():
@@ -121,6 +172,51 @@ class n8nParameter():
         if "typeOptions" in param_json.keys() and "multipleValues" in param_json["typeOptions"].keys():
             self.multiple_values = param_json["typeOptions"]["multipleValues"]
 
+        self.name = intern_string(self.name)
+        self.description = intern_string(self.description)
+        self.display_string = intern_string(self.display_string)
+        self.set_father(None)
+
+    def __copy__(self):
+        new_param = object.__new__(type(self))
+        for slot_name in get_slot_names(type(self)):
+            setattr(new_param, slot_name, getattr(self, slot_name))
+        return new_param
+
+    def __repr__(self):
+        return f"{type(self).__name__}(name={self.name!r}, param_type={self.param_type.name}, data_is_set={self.data_is_set})"
+
+    def set_father(self, father: 'n8nParameter', key: str = None):
+        """
+        Places the node under `father` in the tree, computing its qualified parameter name and depth.
+
+        `father` must already be placed, so the nodes are placed from the root down (see `visit_parameter`).
+
+        Args:
+            father (n8nParameter): The parent node, None for a parameter of a node.
+            key (str, optional): The key of the node in `father.meta`, the mode name under a resource locator.
+
+        Raises:
+            AssertionError: If the father is a `FIXEDCOLLECTION` with multiple values and the node isn't a `COLLECTION`.
+        """
+        self.father = father
+        if father == None:
+            self.depth = 1
+            self.parameter_name = f"params[\"{self.name}\"]"
+            return
+
+        self.depth = father.depth + 1
+        prefix_names = father.parameter_name
+        if father.param_type == n8nParameterType.COLLECTION and father.multiple_values:
+            self.parameter_name = prefix_names + "[0]" + f"[\"{self.name}\"]"
+        elif father.param_type == n8nParameterType.FIXEDCOLLECTION and father.multiple_values:
+            assert self.param_type == n8nParameterType.COLLECTION, f"{self.param_type.name}"
+            self.parameter_name = f"{prefix_names}[\"{self.name}\"]"
+        elif father.param_type == n8nParameterType.RESOURCELOCATOR:
+            self.parameter_name = f"{prefix_names}[\"value\"](when \"mode\"=\"{key if key != None else self.name}\")"
+        else:
+            self.parameter_name = prefix_names + f"[\"{self.name}\"]"
+
     def get_depth(self):
         """
         Returns the depth of the current node in the tree.
@@ -128,13 +224,11 @@ class n8nParameter():
         Returns:
             int: The depth of the current node in the tree.
         """
-        if self.father == None:
-            return 1
-        return self.father.get_depth() + 1
+        return self.depth
 
     @classmethod
     @abstractmethod
-    def visit(cls, param_json):
+    def visit(cls, param_json, father=None, key=None):
         pass
     
     @abstractmethod
@@ -150,47 +244,42 @@ class n8nParameter():
         Returns the parameter name for the current node in the n8n workflow.
 
         Returns:
-            str: The parameter name for the current node.
-
-        Raises:
-            AssertionError: If the parameter type is `FIXEDCOLLECTION` and the parent node has multiple values.
+            str: The parameter name for the current node, computed by `set_father`.
         """
-
-        if self.father == None:
-            return f"params[\"{self.name}\"]"
-
-        prefix_names = self.father.get_parameter_name()
-
-        if self.father.param_type == n8nParameterType.COLLECTION and self.father.multiple_values:
-            prefix_names += "[0]"
-            return prefix_names +f"[\"{self.name}\"]"
-        elif self.father.param_type == n8nParameterType.FIXEDCOLLECTION and self.father.multiple_values:
-            assert self.param_type == n8nParameterType.COLLECTION, f"{self.param_type.name}"
-            names = f"{prefix_names}[\"{self.name}\"]"
-            return names
-        elif self.father.param_type == n8nParameterType.RESOURCELOCATOR:
-            for key,value in self.father.meta.items():
-                if value == self:
-                    name = f"{prefix_names}[\"value\"](when \"mode\"=\"{key}\")"
-                    return name
-        else:
-            return prefix_names +f"[\"{self.name}\"]"
+        return self.parameter_name
     
     def refresh(self):
         """
-        Refreshes the data by setting the `data_is_set` attribute to False.
+        Clears the value of the parameter, setting the `data_is_set` attribute to False.
+
+        Only the attributes of this node are reassigned, so a value node never changes the schema (or the other value nodes) it shares attributes with.
         """
+        self.use_expression = False
         self.data_is_set = False
 
+    def spawn(self):
+        """
+        Creates an empty value node of the parameter.
+
+        The schema (type, description, options, display rules and the `meta` children) is shared with this node,
+        only the value is new. Parsing a value into the spawned node leaves this node unchanged.
+
+        Returns:
+            n8nParameter: The new node, with `data_is_set` False.
+        """
+        new_param = self.__copy__()
+        new_param.refresh()
+        return new_param
+
 def to_json(self):
     """
     Convert python_parameters to n8n_json recursively.
     """
     return None
 
-@dataclass
 class n8nNotice(n8nParameter):
-    notice: str = ""
+    __slots__ = ("notice",)
+    notice: str
 
     def __init__(self, param_json):
         """
@@ -203,37 +292,47 @@ class n8nNotice(n8nParameter):
             None
         """
         super().__init__(param_json)
+        self.notice = ""
 
     @staticmethod
-    def visit(param_json):
+    def visit(param_json, father=None, key=None):
         """
         Visit the given param_json and create an n8nNotice node.
 
         Args:
             param_json (dict): The JSON object containing the parameter data.
+            father (n8nParameter, optional): The parent node.
+            key (str, optional): The key of the node in `father.meta`.
 
         Returns:
             n8nNotice: The created n8nNotice node.
         """
         node = n8nNotice(param_json)
+        node.set_father(father, key)
 
-        node.notice = param_json["displayName"]
+        node.notice = intern_string(param_json["displayName"])
         return node
 
     def to_description(self, prefix_ids, indent=2, max_depth=1):
         return []
     
-@dataclass
 class n8nNumber(n8nParameter):
-    fixed_value: float = 0.0
-    var: str = ""
+    __slots__ = ("fixed_value", "var")
+    fixed_value: float
+    var: str
     def __init__(self, param_json):
         super().__init__(param_json)
         self.fixed_value = 0.0
         self.var = ""
+    def refresh(self):
+        super().refresh()
+        self.fixed_value = 0.0
+        self.var = ""
+
     @classmethod
-    def visit(cls, param_json):
+    def visit(cls, param_json, father=None, key=None):
         node = n8nNumber(param_json)
+        node.set_father(father, key)
         return node
 
     @abstractmethod
@@ -293,18 +392,24 @@ class n8nNumber(n8nParameter):
             return self.fixed_value
 
 
-@dataclass
 class n8nBoolean(n8nParameter):
-    fixed_value: bool = False
-    var: str = ""
+    __slots__ = ("fixed_value", "var")
+    fixed_value: bool
+    var: str
 
     def __init__(self, param_json):
         super().__init__(param_json)
         self.fixed_value = False
         self.var = ""
+    def refresh(self):
+        super().refresh()
+        self.fixed_value = False
+        self.var = ""
+
     @classmethod
-    def visit(cls, param_json):
+    def visit(cls, param_json, father=None, key=None):
         node = n8nBoolean(param_json)
+        node.set_father(father, key)
 
         return node
 
@@ -392,15 +497,20 @@ class n8nBoolean(n8nParameter):
         else:
             return self.fixed_value
 
-@dataclass
 class n8nString(n8nParameter):
-    value: str = ""
+    __slots__ = ("value",)
+    value: str
     def __init__(self, param_json):
         super().__init__(param_json)
         self.value = ""
+    def refresh(self):
+        super().refresh()
+        self.value = ""
+
     @classmethod
-    def visit(cls, param_json):
+    def visit(cls, param_json, father=None, key=None):
         node = n8nString(param_json)
+        node.set_father(father, key)
         #TODO: validation
         return node
 
@@ -484,36 +594,44 @@ class n8nString(n8nParameter):
             return None
         return self.value
 
-@dataclass
 class n8nOption(n8nParameter):
-    value: str = ""
+    __slots__ = ("value", "enum", "enum_descriptions")
+    value: str
 
-    enum: list = field(default_factory=list)
-    enum_descriptions: list = field(default_factory=list)
+    enum: list
+    enum_descriptions: list
 
     def __init__(self, param_json):
         super().__init__(param_json)
+        self.value = ""
         self.enum = []
         self.enum_descriptions = []
 
+    def refresh(self):
+        super().refresh()
+        self.value = ""
+
     @classmethod
-    def visit(cls, param_json):
+    def visit(cls, param_json, father=None, key=None):
         """
         Generates a node object from the provided JSON representation.
 
         :param param_json: The JSON representation of the node.
         :type param_json: dict
+        :param father: The parent node, None for a parameter of a node.
+        :param key: The key of the node in `father.meta`.
         :return: The generated node object.
         :rtype: n8nOption
         """
         node = n8nOption(param_json)
+        node.set_father(father, key)
         if "options" in param_json.keys():
             for cont in param_json["options"]:
-                node.enum.append(cont["value"])
+                node.enum.append(intern_string(cont["value"]))
                 enum_des = cont["name"]
                 if "description" in cont.keys():
                     enum_des += f". {cont['description']}"
-                node.enum_descriptions.append(enum_des)
+                node.enum_descriptions.append(intern_string(enum_des))
         else:
             pass
         return node
@@ -606,10 +724,10 @@ class n8nOption(n8nParameter):
             return None
         return self.value
 
-@dataclass
 class n8nCollection(n8nParameter):
-    meta: dict = field(default_factory=dict)
-    value: dict = field(default_factory=list)
+    __slots__ = ("meta", "value")
+    meta: dict
+    value: list
 
     def __init__(self, param_json):
         """
@@ -626,26 +744,28 @@ class n8nCollection(n8nParameter):
         self.value = []
 
     @classmethod
-    def visit(cls, param_json):
+    def visit(cls, param_json, father=None, key=None):
         """
         Generates the node object from the given JSON representation.
 
         Args:
             param_json (dict): The JSON representation of the node.
+            father (n8nParameter, optional): The parent node, None for a parameter of a node.
+            key (str, optional): The key of the node in `father.meta`.
 
         Returns:
             n8nCollection: The generated node object.
         """
         node = n8nCollection(param_json)
+        node.set_father(father, key)
         if type(node.default) == dict and node.multiple_values:
             node.default = [node.default]
         if "options" in param_json.keys():
             for instance in param_json["options"]:
                 name = instance["name"]
-                sub_param = visit_parameter(instance)
+                sub_param = visit_parameter(instance, father=node, key=name)
                 if sub_param != None:
                     node.meta[name] = sub_param
-                    node.meta[name].father = node
         else:
             assert False
             
@@ -678,7 +798,7 @@ class n8nCollection(n8nParameter):
                 else:
                     param_name = self.get_parameter_name()
                 return ToolCallStatus.UndefinedParam, f"Undefined property \"{key}\" for {param_name}, supported properties: {list(self.meta.keys())}", {}
-            right_value_subparam = deepcopy(self.meta[key])
+            right_value_subparam = self.meta[key].spawn()
             sub_param_status, sub_param_parse_result = right_value_subparam.parse_value(value[key])
             if sub_param_status != ToolCallStatus.ToolCallSuccess:
                 return sub_param_status, sub_param_parse_result, {}
@@ -786,8 +906,7 @@ class n8nCollection(n8nParameter):
         Refreshes the data in the object.
 
         Sets `data_is_set` to `False`.
-        Clears `value`.
-        Calls the `refresh` method on each key in `meta`.
+        Assigns a new empty `value`, the `meta` properties are the shared schema and stay unchanged.
 
         Parameters:
             None
@@ -795,10 +914,8 @@ class n8nCollection(n8nParameter):
         Returns:
             None
         """
-        self.data_is_set = False
-        self.value.clear()
-        for key in self.meta.keys():
-            self.meta[key].refresh()
+        super().refresh()
+        self.value = []
 
     def to_json(self):
         """
@@ -821,10 +938,10 @@ class n8nCollection(n8nParameter):
         return json_data
 
     
-@dataclass
 class n8nFixedCollection(n8nParameter):
-    meta: dict = field(default_factory=dict)
-    value: dict = field(default_factory=list)
+    __slots__ = ("meta", "value")
+    meta: dict
+    value: dict
 
     def __init__(self, param_json):
         """
@@ -841,12 +958,14 @@ class n8nFixedCollection(n8nParameter):
         self.value = {}
 
     @classmethod
-    def visit(cls, param_json):
+    def visit(cls, param_json, father=None, key=None):
         """
         Visits the given `param_json` and returns a `n8nFixedCollection` node.
 
         Args:
             param_json (dict): The JSON parameter to visit.
+            father (n8nParameter, optional): The parent node, None for a parameter of a node.
+            key (str, optional): The key of the node in `father.meta`.
 
         Returns:
             n8nFixedCollection: The visited `n8nFixedCollection` node.
@@ -856,6 +975,7 @@ class n8nFixedCollection(n8nParameter):
 
         """
         node = n8nFixedCollection(param_json)
+        node.set_father(father, key)
 
         if "options" in param_json.keys():
             for instance in param_json["options"]:
@@ -864,6 +984,7 @@ class n8nFixedCollection(n8nParameter):
                 sub_node = n8nCollection(instance)
                 sub_node.param_type = n8nParameterType.COLLECTION
                 sub_node.multiple_values = node.multiple_values
+                sub_node.set_father(node, name)
 
 
                 if type(sub_node.default) == dict and sub_node.multiple_values:
@@ -871,15 +992,13 @@ class n8nFixedCollection(n8nParameter):
                 if "values" in instance.keys():
                     for sub_instance in instance["values"]:
                         subparam_key_name = sub_instance["name"]
-                        sub_sub_param = visit_parameter(sub_instance)
+                        sub_sub_param = visit_parameter(sub_instance, father=sub_node, key=subparam_key_name)
                         if sub_sub_param != None:
                             sub_node.meta[subparam_key_name] = sub_sub_param
-                            sub_node.meta[subparam_key_name].father = sub_node
                 else:
                     assert False
                 
                 node.meta[name] = sub_node
-                node.meta[name].father = node
         else:
             assert False
             
@@ -925,7 +1044,7 @@ class n8nFixedCollection(n8nParameter):
             for key in value.keys():
                 if key not in self.meta.keys():
                     return ToolCallStatus.UndefinedParam, f"Undefined property \"{key}\" for {self.get_parameter_name()}, supported properties: {list(self.meta.keys())}"
-                new_param = deepcopy(self.meta[key])
+                new_param = self.meta[key].spawn()
                 subparam_status, subparam_data = new_param.parse_value(value=value[key])
                 if subparam_status != ToolCallStatus.ToolCallSuccess:
                     return subparam_status, subparam_data
@@ -945,9 +1064,8 @@ class n8nFixedCollection(n8nParameter):
         """
         Refreshes the data in the object.
 
-        This function sets the `data_is_set` attribute to `False`, clears the `value` attribute, 
-        and refreshes each key in the `meta` dictionary by calling the `refresh` method on each 
-        corresponding value.
+        This function sets the `data_is_set` attribute to `False` and assigns a new empty `value`.
+        The `meta` properties are the shared schema and stay unchanged.
 
         Parameters:
             None
@@ -955,10 +1073,8 @@ class n8nFixedCollection(n8nParameter):
         Returns:
             None
         """
-        self.data_is_set = False
-        self.value.clear()
-        for key in self.meta.keys():
-            self.meta[key].refresh()
+        super().refresh()
+        self.value = {}
 
     def to_description(self, prefix_ids, indent=2, max_depth=1):
         """
@@ -1012,11 +1128,11 @@ class n8nFixedCollection(n8nParameter):
 
 
     
-@dataclass
 class n8nResourceLocator(n8nParameter):
-    meta: dict = field(default_factory=dict)
-    mode: str = ""
-    value: any = None
+    __slots__ = ("meta", "mode", "value")
+    meta: dict
+    mode: str
+    value: any
 
     def __init__(self, param_json):
         """
@@ -1034,12 +1150,14 @@ class n8nResourceLocator(n8nParameter):
         self.value = None
 
     @classmethod
-    def visit(cls, param_json):
+    def visit(cls, param_json, father=None, key=None):
         """
         Visits a parameter JSON and creates a node object.
 
         Args:
             param_json (dict): The parameter JSON to be visited.
+            father (n8nParameter, optional): The parent node, None for a parameter of a node.
+            key (str, optional): The key of the node in `father.meta`, the mode name.
 
         Returns:
             Node: The created node object.
@@ -1049,18 +1167,20 @@ class n8nResourceLocator(n8nParameter):
 
         """
         node = n8nResourceLocator(param_json)
+        node.set_father(father, key)
         assert "modes" in param_json.keys()
         for instance in param_json["modes"]:
             name = instance["name"]
-            result_node = visit_parameter(instance)
+            result_node = visit_parameter(instance, father=node, key=name)
             if result_node != None:
                 node.meta[name] = result_node
-                node.meta[name].father = node
     
         return node
 
     def refresh(self):
-        self.data_is_set = False
+        super().refresh()
+        self.mode = ""
+        self.value = None
 
     def to_description(self, prefix_ids, indent=2, max_depth=1):
         """
@@ -1148,7 +1268,7 @@ class n8nResourceLocator(n8nParameter):
             if value["mode"] not in self.meta.keys():
                 return ToolCallStatus.UndefinedParam, f"Undefined mode \"{value['mode']}\" for {self.get_parameter_name()}, supported modes: {list(self.meta.keys())}"
             value_value = value["value"]
-            temp_value = deepcopy(self.meta[value["mode"]])
+            temp_value = self.meta[value["mode"]].spawn()
             subparam_status, subparam_data = temp_value.parse_value(value=value_value)
             if subparam_status != ToolCallStatus.ToolCallSuccess:
                 return subparam_status, subparam_data
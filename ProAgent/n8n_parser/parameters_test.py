@@ -0,0 +1,155 @@
+import sys
+import json
+import unittest
+
+from ProAgent.utils import NodeType, ToolCallStatus
+from ProAgent.n8n_parser.node import n8nPythonNode, n8nNodeMeta
+from ProAgent.n8n_parser.parameters import visit_parameter, get_slot_names
+
+# the properties of a node, one of each parsed parameter type
+properties_json = [
+    {"name": "text", "displayName": "Text", "type": "string", "default": "", "required": True},
+    {"name": "limit", "displayName": "Limit", "type": "number", "default": 50},
+    {"name": "asUser", "displayName": "As User", "type": "boolean", "default": False},
+    {"name": "format", "displayName": "Format", "type": "options", "default": "plain",
+     "options": [{"name": "Plain", "value": "plain"}, {"name": "Markdown", "value": "markdown", "description": "Rendered"}]},
+    {"name": "otherOptions", "displayName": "Other Options", "type": "collection", "default": {},
+     "options": [
+         {"name": "icon", "displayName": "Icon", "type": "string", "default": ""},
+         {"name": "unfurl", "displayName": "Unfurl", "type": "boolean", "default": True},
+     ]},
+    {"name": "attachments", "displayName": "Attachments", "type": "fixedCollection", "default": {},
+     "typeOptions": {"multipleValues": True},
+     "options": [
+         {"name": "fields", "displayName": "Fields", "values": [
+             {"name": "title", "displayName": "Title", "type": "string", "default": ""},
+             {"name": "short", "displayName": "Short", "type": "boolean", "default": False},
+         ]},
+     ]},
+    {"name": "channelId", "displayName": "Channel", "type": "resourceLocator", "default": {"mode": "url", "value": ""},
+     "modes": [
+         {"name": "url", "displayName": "By URL", "type": "string"},
+         {"name": "id", "displayName": "By ID", "type": "string"},
+     ]},
+]
+
+params_json = {
+    "text": "hello",
+    "limit": 10,
+    "asUser": "={{$json.user}}",
+    "format": "markdown",
+    "otherOptions": {"icon": ":robot:", "unfurl": False},
+    "attachments": {"fields": [{"title": "a", "short": True}, {"title": "b"}]},
+    "channelId": {"mode": "id", "value": "C123"},
+}
+
+
+def make_node():
+    node = n8nPythonNode(node_id=1, node_meta=n8nNodeMeta(node_type=NodeType.action, integration_name="slack", resource_name="message", operation_name="post"))
+    for content in properties_json:
+        param = visit_parameter(content)
+        if param != None:
+            node.params[content["name"]] = param
+    return node
+
+
+class ParseParametersTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.node = make_node()
+        self.schema = dict(self.node.params)
+
+    def parse(self, param_json):
+        status, output = self.node.parse_parameters(param_json)
+        return status, json.loads(output)
+
+    def test_parse(self):
+        status, output = self.parse(params_json)
+        self.assertEqual(status, ToolCallStatus.ToolCallSuccess, output)
+        self.assertIn('params["channelId"] parsed with "mode"=id', output["result"])
+        self.assertEqual(self.node.params["channelId"].value.get_parameter_name(), 'params["channelId"]["value"](when "mode"="id")')
+        self.assertEqual({key: value.to_json() for key, value in self.node.params.items() if key != "otherOptions"}, {
+            "text": "hello",
+            "limit": 10,
+            "asUser": "={{$json.user}}",
+            "format": "markdown",
+            "attachments": {"fields": [{"title": "a", "short": True}, {"title": "b"}]},
+            "channelId": {"mode": "id", "value": "C123"},
+        })
+        other_options = self.node.params["otherOptions"].value
+        self.assertEqual([{key: value.to_json() for key, value in item.items()} for item in other_options], [{"icon": ":robot:", "unfurl": False}])
+
+    def test_schema_shared_and_unchanged(self):
+        """
+        The parsed values are new nodes referencing the schema, which isn't modified.
+        """
+        self.assertEqual(self.parse(params_json)[0], ToolCallStatus.ToolCallSuccess)
+        for key, param in self.node.params.items():
+            self.assertIsNot(param, self.schema[key])
+            self.assertFalse(self.schema[key].data_is_set)
+            self.assertIs(param.description, self.schema[key].description)
+        self.assertIs(self.node.params["otherOptions"].meta, self.schema["otherOptions"].meta)
+        for sub_param in self.schema["otherOptions"].meta.values():
+            self.assertFalse(sub_param.data_is_set)
+        self.assertEqual(self.schema["attachments"].value, {})
+        self.assertEqual(self.schema["channelId"].to_json(), None)
+
+    def test_reparse(self):
+        """
+        A new parse starts from empty values, and a failed parse keeps the previous values.
+        """
+        self.parse(params_json)
+        parsed = self.node.params
+        self.assertEqual(self.parse({"text": "again"})[0], ToolCallStatus.ToolCallSuccess)
+        self.assertEqual(self.node.params["text"].to_json(), "again")
+        self.assertEqual(self.node.params["otherOptions"].to_json(), None)
+        self.assertEqual(parsed["text"].to_json(), "hello")
+        self.assertEqual(len(parsed["attachments"].value["fields"].value), 2)
+
+        before = self.node.params
+        status, output = self.parse({"format": "html"})
+        self.assertEqual(status, ToolCallStatus.ParamTypeError)
+        self.assertIn('params["format"] should in', output["error"])
+        self.assertIs(self.node.params, before)
+
+
+class CompactParameterTest(unittest.TestCase):
+    def test_slots(self):
+        node = make_node()
+        for param in node.params.values():
+            self.assertFalse(hasattr(param, "__dict__"))
+        option = node.params["format"]
+        self.assertIs(option.description, visit_parameter(properties_json[3]).description)
+        self.assertEqual(option.enum_descriptions, ["Plain", "Markdown. Rendered"])
+
+    def test_smaller_than_dict(self):
+        """
+        Each parameter node takes less memory than the same fields held in a `__dict__`.
+        """
+        class DictParameter():
+            pass
+
+        node = make_node()
+        for param in node.params.values():
+            baseline = DictParameter()
+            for name in get_slot_names(type(param)):
+                if hasattr(param, name):
+                    setattr(baseline, name, getattr(param, name))
+            self.assertLess(sys.getsizeof(param), sys.getsizeof(baseline) + sys.getsizeof(baseline.__dict__))
+
+
+class ParameterPathTest(unittest.TestCase):
+    def test_names_and_depths(self):
+        """
+        The qualified names and depths are computed when the tree is built.
+        """
+        node = make_node()
+        group = node.params["attachments"].meta["fields"]
+        mode = node.params["channelId"].meta["id"]
+        self.assertEqual([(param.get_parameter_name(), param.get_depth()) for param in [node.params["text"], group, group.meta["title"], node.params["otherOptions"].meta["icon"], mode]], [
+            ('params["text"]', 1),
+            ('params["attachments"]["fields"]', 2),
+            ('params["attachments"]["fields"][0]["title"]', 3),
+            ('params["otherOptions"]["icon"]', 2),
+            ('params["channelId"]["value"](when "mode"="id")', 2),
+        ])
+        self.assertIs(mode.spawn().get_parameter_name(), mode.get_parameter_name())
@@ -1,5 +1,6 @@
 import os
 import json
+import threading
 from typing import Dict, Any
 
 class Credentials():
@@ -15,6 +16,19 @@ class Credentials():
         Return:
             None
         """
+        self.base_file_path = base_file_path
+        self.loaded = False
+        self.lock = threading.Lock()
+
+    def load(self):
+        """
+        Reads the credentials and the workflow id from the files, at the first query.
+        """
+        with self.lock:
+            if not self.loaded:
+                self._load(self.base_file_path)
+
+    def _load(self, base_file_path: str):
         with open(os.path.join(base_file_path,"c.json"),"r", encoding="utf-8") as reader:
             credential_data = json.load(reader)
             self.credential_data: Dict[str,Any] = {}
@@ -32,13 +46,15 @@ class Credentials():
         with open(os.path.join(base_file_path,"w.json"),"r", encoding="utf-8") as reader:
             workflow_data = json.load(reader)
             self.workflow_id = workflow_data[0]["id"]
-                
+        self.loaded = True
+
     def get_workflow_id(self) -> str:
         """
         Get the workflow ID.
         :return: The workflow ID.
         :rtype: str
         """
+        self.load()
         return self.workflow_id
 
     def query(self, node_type):
@@ -51,6 +67,7 @@ class Credentials():
         Returns:
             The last element of the credential data associated with the given node type, or None if the node type is not found.
         """
+        self.load()
         if self.credential_data.get(node_type,-1) == -1:
             return None
         return self.credential_data[node_type][-1]
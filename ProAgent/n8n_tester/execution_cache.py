@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from ProAgent.config import CONFIG
+from ProAgent.n8n_parser.node import n8nPythonNode
+
+
+def is_cacheable(node: n8nPythonNode, uncached_integrations) -> bool:
+    """
+    Checks if the outputs of a node can be reused instead of executing it again, i.e. the node has no side effects
+    and its reads don't go stale. Shared by the node execution cache and the replay of the unchanged calls.
+
+    Args:
+        node (n8nPythonNode): The node.
+        uncached_integrations (Iterable[str]): Integrations (or "integration.resource.operation") never reused.
+
+    Returns:
+        bool: False if the node is in `uncached_integrations`.
+    """
+    meta = node.node_meta
+    full_name = f"{meta.integration_name}.{meta.resource_name}.{meta.operation_name}"
+    return meta.integration_name not in uncached_integrations and full_name not in uncached_integrations
+
+
+class NodeExecutionCache():
+    """Content-addressed store of node outputs on disk.
+    Each entry is a json file named by the sha256 of (node meta, type version, credential, params json, input data).
+    The least recently used entries are evicted once `max_entries` or `max_bytes` is exceeded.
+    """
+
+    def __init__(self, cache_dir: str, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024, ttl: float = None, uncached_integrations: list = None):
+        """
+        Initializes the cache and indexes the entries already on disk.
+
+        Parameters:
+            cache_dir (str): The directory of the entries.
+            max_entries (int): The maximum number of entries. Defaults to 1024.
+            max_bytes (int): The maximum total size of the entries. Defaults to 64MB.
+            ttl (float): Entries older than `ttl` seconds are ignored, None for no limit. Defaults to None.
+            uncached_integrations (list): Integrations (or "integration.resource.operation") never cached. Defaults to None.
+
+        Returns:
+            None
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.uncached_integrations = set(uncached_integrations) if uncached_integrations != None else set()
+
+        self.lock = threading.Lock()
+        self.entries = OrderedDict() # key -> file size, least recently used first
+        self.total_bytes = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        disk_entries = []
+        for file_name in os.listdir(self.cache_dir):
+            if not file_name.endswith(".json"):
+                continue
+            stat = os.stat(os.path.join(self.cache_dir, file_name))
+            disk_entries.append((stat.st_mtime, file_name[:-len(".json")], stat.st_size))
+        for _, key, size in sorted(disk_entries):
+            self.entries[key] = size
+            self.total_bytes += size
+        with self.lock:
+            self._evict()
+
+    def is_cacheable(self, node: n8nPythonNode) -> bool:
+        """
+        Checks if the outputs of the node can be reused, i.e. the node has no side effects.
+
+        Args:
+            node (n8nPythonNode): The node.
+
+        Returns:
+            bool: False if the node is in `uncached_integrations`.
+        """
+        return is_cacheable(node, self.uncached_integrations)
+
+    @staticmethod
+    def make_key(node: n8nPythonNode, input_data: list, credential: dict = None, type_version: int = None) -> str:
+        """
+        Computes a stable hash of everything that determines the output of a node execution.
+
+        Args:
+            node (n8nPythonNode): The node to be executed.
+            input_data (list): The input items.
+            credential (dict): The n8n credential the node is executed with, None if it has none. Defaults to None.
+            type_version (int): The typeVersion the node is executed with, None for the n8n default. Defaults to None.
+
+        Returns:
+            str: The hex digest.
+        """
+        param_json = {}
+        for key, value in node.params.items():
+            param = value.to_json()
+            if param != None:
+                param_json[key] = param
+        content = {
+            "node_meta": [node.node_meta.integration_name, node.node_meta.resource_name, node.node_meta.operation_name],
+            "type_version": type_version,
+            "credential": credential,
+            "params": param_json,
+            "input_data": input_data,
+        }
+        content = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> (bool, list):
+        """
+        Looks up an entry, marking it as recently used.
+
+        Args:
+            key (str): The key from `make_key`.
+
+        Returns:
+            tuple[bool, list]: Whether the entry is found, and the cached output data.
+        """
+        with self.lock:
+            if key not in self.entries.keys():
+                return False, None
+            file_path = os.path.join(self.cache_dir, f"{key}.json")
+            try:
+                with open(file_path, "r", encoding="utf-8") as reader:
+                    entry = json.load(reader)
+            except (OSError, ValueError):
+                self._remove(key)
+                return False, None
+            if self.ttl != None and time.time() - entry["created_at"] > self.ttl:
+                self._remove(key)
+                return False, None
+            self.entries.move_to_end(key)
+            os.utime(file_path)
+            return True, entry["output_data"]
+
+    def put(self, key: str, output_data: list):
+        """
+        Stores the output of a node execution.
+
+        Args:
+            key (str): The key from `make_key`.
+            output_data (list): The output items of the node.
+
+        Returns:
+            None
+        """
+        content = json.dumps({"created_at": time.time(), "output_data": output_data}, ensure_ascii=False)
+        with self.lock:
+            if key in self.entries.keys():
+                self._remove(key)
+            with open(os.path.join(self.cache_dir, f"{key}.json"), "w", encoding="utf-8") as writer:
+                writer.write(content)
+            size = len(content.encode("utf-8"))
+            self.entries[key] = size
+            self.total_bytes += size
+            self._evict()
+
+    def _remove(self, key: str):
+        self.total_bytes -= self.entries.pop(key)
+        try:
+            os.remove(os.path.join(self.cache_dir, f"{key}.json"))
+        except OSError:
+            pass
+
+    def _evict(self):
+        while len(self.entries) > 0 and (len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes):
+            self._remove(next(iter(self.entries)))
+
+
+_execution_cache = None
+_execution_cache_lock = threading.Lock()
+
+def get_execution_cache() -> NodeExecutionCache:
+    """
+    Returns the process-wide cache configured by `CONFIG.node_execution_cache`, creating it on first use.
+
+    Returns:
+        NodeExecutionCache: The shared cache, or None if the cache is disabled.
+    """
+    global _execution_cache
+    cache_cfg = CONFIG.node_execution_cache
+    if not cache_cfg["enable"]:
+        return None
+    with _execution_cache_lock:
+        if _execution_cache == None:
+            _execution_cache = NodeExecutionCache(cache_dir=cache_cfg["cache_dir"],
+                                                  max_entries=cache_cfg["max_entries"],
+                                                  max_bytes=cache_cfg["max_bytes"],
+                                                  ttl=cache_cfg["ttl"],
+                                                  uncached_integrations=cache_cfg["uncached_integrations"])
+        return _execution_cache
@@ -0,0 +1,112 @@
+import os
+import time
+import tempfile
+import unittest
+from unittest import mock
+
+from ProAgent.config import CONFIG
+from ProAgent.utils import NodeType, ToolCallStatus
+from ProAgent.n8n_parser.node import n8nPythonNode, n8nNodeMeta
+from ProAgent.n8n_parser.param_parser import parse_properties
+from ProAgent.n8n_tester import execution_cache
+from ProAgent.n8n_tester.execution_cache import NodeExecutionCache, get_execution_cache
+
+node_json = {
+    "name": "n8n-nodes-base.googleSheets",
+    "properties": [
+        {"name": "sheetName", "displayName": "Sheet", "type": "string", "default": "",
+         "displayOptions": {"show": {"resource": ["sheet"], "operation": ["read", "append"]}}},
+    ],
+}
+
+
+def make_node(integration_name="googleSheets", operation_name="read", sheet_name="first"):
+    node = n8nPythonNode(node_id=1, node_json=node_json,
+                         node_meta=n8nNodeMeta(node_type=NodeType.action, integration_name=integration_name, resource_name="sheet", operation_name=operation_name))
+    node.params = parse_properties(node)
+    assert node.parse_parameters({"sheetName": sheet_name})[0] == ToolCallStatus.ToolCallSuccess
+    return node
+
+
+class NodeExecutionCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.temp_dir.name, "cache")
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_make_key(self):
+        """
+        Everything that changes the output of the node changes the key.
+        """
+        input_data = [{"json": {"id": 1}}]
+        key = NodeExecutionCache.make_key(make_node(), input_data)
+        self.assertEqual(NodeExecutionCache.make_key(make_node(), [{"json": {"id": 1}}]), key)
+
+        other_keys = [
+            NodeExecutionCache.make_key(make_node(sheet_name="second"), input_data),
+            NodeExecutionCache.make_key(make_node(operation_name="append"), input_data),
+            NodeExecutionCache.make_key(make_node(), [{"json": {"id": 2}}]),
+            NodeExecutionCache.make_key(make_node(), input_data, credential={"id": "1", "name": "alice", "type": "googleSheetsOAuth2Api"}),
+            NodeExecutionCache.make_key(make_node(), input_data, type_version=4),
+        ]
+        self.assertEqual(len(set(other_keys + [key])), len(other_keys) + 1)
+        self.assertNotEqual(
+            NodeExecutionCache.make_key(make_node(), input_data, credential={"id": "1", "name": "alice", "type": "googleSheetsOAuth2Api"}),
+            NodeExecutionCache.make_key(make_node(), input_data, credential={"id": "2", "name": "bob", "type": "googleSheetsOAuth2Api"}))
+
+    def test_get_put(self):
+        cache = NodeExecutionCache(self.cache_dir)
+        self.assertEqual(cache.get("key"), (False, None))
+        cache.put("key", [{"json": {"a": 1}}])
+        self.assertEqual(cache.get("key"), (True, [{"json": {"a": 1}}]))
+
+        # the entries on disk are found by a new cache
+        self.assertEqual(NodeExecutionCache(self.cache_dir).get("key"), (True, [{"json": {"a": 1}}]))
+
+    def test_ttl(self):
+        cache = NodeExecutionCache(self.cache_dir, ttl=60)
+        cache.put("key", [])
+        with mock.patch("time.time", return_value=time.time() + 61):
+            self.assertEqual(cache.get("key"), (False, None))
+        self.assertFalse(os.path.exists(os.path.join(self.cache_dir, "key.json")))
+
+    def test_evict(self):
+        """
+        The least recently used entries are evicted first, by count and by size.
+        """
+        cache = NodeExecutionCache(self.cache_dir, max_entries=2)
+        cache.put("first", [1])
+        cache.put("second", [2])
+        cache.get("first")
+        cache.put("third", [3])
+        self.assertEqual(list(cache.entries.keys()), ["first", "third"])
+        self.assertEqual(sorted(os.listdir(self.cache_dir)), ["first.json", "third.json"])
+
+        cache = NodeExecutionCache(self.cache_dir, max_bytes=cache.entries["first"] + cache.entries["third"] - 1)
+        self.assertEqual(len(cache.entries), 1)
+        self.assertEqual(cache.total_bytes, sum(cache.entries.values()))
+
+    def test_unreadable_entry(self):
+        cache = NodeExecutionCache(self.cache_dir)
+        cache.put("key", [])
+        with open(os.path.join(self.cache_dir, "key.json"), "w", encoding="utf-8") as writer:
+            writer.write("{")
+        self.assertEqual(cache.get("key"), (False, None))
+        self.assertEqual(cache.total_bytes, 0)
+
+    def test_is_cacheable(self):
+        cache = NodeExecutionCache(self.cache_dir, uncached_integrations=["slack", "googleSheets.sheet.append"])
+        self.assertTrue(cache.is_cacheable(make_node()))
+        self.assertFalse(cache.is_cacheable(make_node(operation_name="append")))
+        self.assertFalse(cache.is_cacheable(make_node(integration_name="slack")))
+        self.assertTrue(NodeExecutionCache(self.cache_dir).is_cacheable(make_node(operation_name="append")))
+
+    def test_disabled_by_default(self):
+        with mock.patch.object(execution_cache, "_execution_cache", None):
+            self.assertEqual(get_execution_cache(), None)
+            with mock.patch.dict(CONFIG.node_execution_cache, {"enable": True, "cache_dir": self.cache_dir}):
+                cache = get_execution_cache()
+                self.assertIs(get_execution_cache(), cache)
+                self.assertEqual(cache.cache_dir, self.cache_dir)
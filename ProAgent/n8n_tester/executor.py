@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import tempfile
+import subprocess
+import threading
+from abc import ABC, abstractmethod
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ProAgent.config import CONFIG
+from ProAgent.n8n_tester.prompts import success_prompt, error_prompt
+
+
+class n8nExecutor(ABC):
+    """Runs n8n workflow json and answers in the same text format as `n8n execute`,
+    so that callers can parse the result with `success_prompt` / `error_prompt`.
+    At most `pool_size` workflows are executed at the same time.
+    """
+
+    def __init__(self, pool_size: int = 4, timeout: float = None):
+        """
+        Initializes the executor.
+
+        Parameters:
+            pool_size (int): The number of workflows allowed to run concurrently. Defaults to 4.
+            timeout (float): Seconds to wait for a single workflow, None for no limit. Defaults to None.
+
+        Returns:
+            None
+        """
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(pool_size)
+
+    def execute(self, workflow: dict) -> (str, str):
+        """
+        Executes a workflow once a slot of the pool is free.
+
+        Args:
+            workflow (dict): The n8n workflow json.
+
+        Returns:
+            tuple[str, str]: The stdout and stderr of the execution.
+        """
+        with self.slots:
+            return self._execute(workflow)
+
+    @abstractmethod
+    def _execute(self, workflow: dict) -> (str, str):
+        pass
+
+    def close(self):
+        pass
+
+
+class n8nCliExecutor(n8nExecutor):
+    """Starts a `n8n execute` process for each workflow, so every call pays the startup of n8n.
+    No process is kept warm, the pool only bounds the number of concurrent processes; use `n8nRestExecutor` to avoid the startup.
+    """
+
+    def _execute(self, workflow: dict) -> (str, str):
+        temp_file = tempfile.NamedTemporaryFile(delete=False, mode="w", suffix=".json")
+        try:
+            json.dump(workflow, temp_file)
+            temp_file.close()
+            result = subprocess.run(["n8n", "execute", "--file", temp_file.name], stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=self.timeout)
+        except subprocess.TimeoutExpired as e:
+            return f"{error_prompt}\nTimeoutExpired: the workflow didn't finish in {self.timeout} seconds", str(e)
+        finally:
+            os.remove(temp_file.name)
+        return result.stdout.decode('utf-8'), result.stderr.decode('utf-8')
+
+
+def unflatten(text: str):
+    """
+    Decodes the "flatted" json used by n8n for the execution data: a list of values in which
+    the objects, lists and strings are referenced by their index in the list, written as a string.
+
+    Args:
+        text (str): The flatted json.
+
+    Returns:
+        any: The decoded value.
+    """
+    values = json.loads(text)
+    revived = {}
+
+    def revive(index: int):
+        if index in revived.keys():
+            return revived[index]
+        value = values[index]
+        if isinstance(value, list):
+            result = []
+            revived[index] = result
+            result.extend(revive(int(item)) if isinstance(item, str) else item for item in value)
+        elif isinstance(value, dict):
+            result = {}
+            revived[index] = result
+            for key, item in value.items():
+                result[key] = revive(int(item)) if isinstance(item, str) else item
+        else:
+            result = value
+            revived[index] = result
+        return result
+
+    return revive(0)
+
+
+class n8nRestExecutor(n8nExecutor):
+    """Sends each workflow to a long-running n8n server, so nodejs is only started once.
+    The connections are kept alive and reused between calls.
+
+    n8n's public api (/api/v1) can't run a workflow json, so this executor uses the endpoints of the n8n editor,
+    as the editor does for a manual run:
+    - POST /rest/login with the email and password of an n8n user, which sets the session cookie (an api key is not accepted);
+    - POST /rest/workflows/run with {"workflowData": workflow}, which answers with the executionId;
+    - GET /rest/executions/<executionId> until the execution is finished, whose data is flatted json.
+    These endpoints are internal to n8n and may change between versions, they follow n8n 1.x.
+    """
+
+    def __init__(self, base_url: str, pool_size: int = 4, timeout: float = 120, email: str = None, password: str = None, poll_interval: float = 0.2):
+        """
+        Initializes the executor with a pooled http session.
+
+        Parameters:
+            base_url (str): The url of the n8n server, such as "http://localhost:5678".
+            pool_size (int): The number of kept-alive connections and concurrent workflows. Defaults to 4.
+            timeout (float): Seconds to wait for a single workflow. Defaults to 120.
+            email (str): The email of the n8n user to log in with, None if the server doesn't require a login. Defaults to None.
+            password (str): The password of the n8n user. Defaults to None.
+            poll_interval (float): Seconds between two polls of an unfinished execution. Defaults to 0.2.
+
+        Returns:
+            None
+        """
+        super().__init__(pool_size=pool_size, timeout=timeout)
+        self.base_url = base_url.rstrip("/")
+        self.email = email
+        self.password = password
+        self.poll_interval = poll_interval
+        self.login_lock = threading.Lock()
+        self.logged_in = False
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def login(self, force: bool = False):
+        """
+        Logs in once for all the threads, the session cookie is then sent with every request.
+
+        Raises:
+            requests.RequestException: If the login fails.
+        """
+        if self.email == None:
+            return
+        with self.login_lock:
+            if self.logged_in and not force:
+                return
+            response = self.session.post(f"{self.base_url}/rest/login", json={"email": self.email, "password": self.password}, timeout=self.timeout)
+            response.raise_for_status()
+            self.logged_in = True
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """
+        Sends a request with the session cookie, logging in again once if the session has expired.
+        """
+        self.login()
+        response = self.session.request(method, f"{self.base_url}{path}", timeout=self.timeout, **kwargs)
+        if response.status_code == 401 and self.email != None:
+            self.login(force=True)
+            response = self.session.request(method, f"{self.base_url}{path}", timeout=self.timeout, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def _execute(self, workflow: dict) -> (str, str):
+        """
+        Runs the workflow on the server, waits for the execution and renders its result like `n8n execute` does.
+
+        Args:
+            workflow (dict): The n8n workflow json.
+
+        Returns:
+            tuple[str, str]: The stdout and stderr of the execution.
+        """
+        deadline = time.monotonic() + self.timeout if self.timeout != None else None
+        try:
+            response = self.request("POST", "/rest/workflows/run", json={"workflowData": workflow})
+            execution_id = response.json()["data"]["executionId"]
+            while True:
+                execution = self.request("GET", f"/rest/executions/{execution_id}").json()["data"]
+                if execution.get("finished") or execution.get("stoppedAt") or execution.get("status") in ["success", "error", "crashed", "canceled"]:
+                    break
+                if deadline != None and time.monotonic() > deadline:
+                    return f"{error_prompt}\nTimeoutExpired: the execution {execution_id} didn't finish in {self.timeout} seconds", ""
+                time.sleep(self.poll_interval)
+        except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+            return f"{error_prompt}\n{type(e).__name__}: {e}", str(e)
+
+        execution_data = execution.get("data")
+        if isinstance(execution_data, str):
+            execution_data = unflatten(execution_data)
+        if not isinstance(execution_data, dict):
+            return f"{error_prompt}\nthe execution {execution_id} has no data", ""
+        run_error = execution_data.get("resultData", {}).get("error")
+        if run_error:
+            message = run_error.get("message", json.dumps(run_error)) if isinstance(run_error, dict) else str(run_error)
+            return f"{error_prompt}\n{message}", ""
+
+        return success_prompt + json.dumps({"data": execution_data}), ""
+
+    def close(self):
+        self.session.close()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor() -> n8nExecutor:
+    """
+    Returns the process-wide executor configured by `CONFIG.n8n_executor`, creating it on first use.
+
+    Returns:
+        n8nExecutor: The shared executor.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor == None:
+            executor_cfg = CONFIG.n8n_executor
+            if executor_cfg["backend"] == "rest":
+                _executor = n8nRestExecutor(base_url=executor_cfg["base_url"],
+                                            pool_size=executor_cfg["pool_size"],
+                                            timeout=executor_cfg["timeout"],
+                                            email=os.environ.get("N8N_EMAIL"),
+                                            password=os.environ.get("N8N_PASSWORD"))
+            elif executor_cfg["backend"] == "cli":
+                _executor = n8nCliExecutor(pool_size=executor_cfg["pool_size"], timeout=executor_cfg["timeout"])
+            else:
+                raise ValueError(f"unknown n8n executor backend {executor_cfg['backend']}")
+        return _executor
@@ -0,0 +1,181 @@
+import json
+import subprocess
+import threading
+import unittest
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ProAgent.config import CONFIG
+from ProAgent.n8n_tester import executor
+from ProAgent.n8n_tester.executor import n8nRestExecutor, n8nCliExecutor, unflatten, get_executor
+from ProAgent.n8n_tester.prompts import success_prompt, error_prompt
+
+
+def flatten(value) -> str:
+    """
+    Encodes a value like the `flatted` package of n8n does (without shared references), the inverse of `unflatten`.
+    """
+    values = []
+
+    def add(value) -> str:
+        index = len(values)
+        values.append(None)
+        if isinstance(value, list):
+            values[index] = [add(item) if isinstance(item, (list, dict, str)) else item for item in value]
+        elif isinstance(value, dict):
+            values[index] = {key: add(item) if isinstance(item, (list, dict, str)) else item for key, item in value.items()}
+        else:
+            values[index] = value
+        return str(index)
+
+    add(value)
+    return json.dumps(values)
+
+
+class StandInN8nHandler(BaseHTTPRequestHandler):
+    """Answers like the editor endpoints of a n8n 1.x server, with the node_var parameters as output.
+
+    - POST /rest/login sets the session cookie, the other endpoints answer 401 without it;
+    - POST /rest/workflows/run answers with an executionId;
+    - GET /rest/executions/<id> answers once with an unfinished execution, then with the finished one, as flatted json.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def send_json(self, status, content, headers={}):
+        payload = json.dumps(content).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def is_logged_in(self):
+        return "n8n-auth=valid" in self.headers.get("Cookie", "")
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.client_ports.add(self.client_address[1])
+        if self.path == "/rest/login":
+            self.server.logins += 1
+            if body != {"email": "user@example.com", "password": "secret"}:
+                return self.send_json(401, {"message": "Wrong username or password"})
+            return self.send_json(200, {"data": {}}, {"Set-Cookie": "n8n-auth=valid; Path=/"})
+        if not self.is_logged_in():
+            return self.send_json(401, {"message": "Unauthorized"})
+        node_var = body["workflowData"]["nodes"][-1]
+        if node_var["parameters"].get("fail"):
+            result_data = {"error": {"message": "node_var failed"}, "runData": {}}
+        else:
+            result_data = {"runData": {"node_var": [{"data": {"main": [[{"json": node_var["parameters"]}]]}}]}}
+        with self.server.lock:
+            execution_id = str(len(self.server.executions) + 1)
+            self.server.executions[execution_id] = {"polls": 0, "data": {"resultData": result_data}}
+        self.send_json(200, {"data": {"executionId": execution_id}})
+
+    def do_GET(self):
+        if not self.is_logged_in():
+            return self.send_json(401, {"message": "Unauthorized"})
+        execution = self.server.executions[self.path.split("/")[-1]]
+        execution["polls"] += 1
+        if execution["polls"] == 1:
+            return self.send_json(200, {"data": {"finished": False, "status": "running", "data": flatten({})}})
+        self.send_json(200, {"data": {"finished": True, "status": "success", "data": flatten(execution["data"])}})
+
+    def log_message(self, format, *args):
+        pass
+
+
+class n8nRestExecutorTest(unittest.TestCase):
+    def setUp(self) -> None:
+        """
+        Start a stand-in n8n server on a free local port and connect an executor to it.
+        """
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StandInN8nHandler)
+        self.server.client_ports = set()
+        self.server.executions = {}
+        self.server.logins = 0
+        self.server.lock = threading.Lock()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.executor = self.make_executor(password="secret")
+
+    def make_executor(self, password):
+        return n8nRestExecutor(base_url=f"http://127.0.0.1:{self.server.server_port}", pool_size=2, timeout=10,
+                               email="user@example.com", password=password, poll_interval=0.01)
+
+    def tearDown(self) -> None:
+        self.executor.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def make_workflow(self, parameters):
+        return {"nodes": [{"name": "node_var", "parameters": parameters}], "connections": {}}
+
+    def test_execute_success(self):
+        """
+        The output must be parsable the same way as the output of `n8n execute`.
+        """
+        output, error = self.executor.execute(self.make_workflow({"text": "hello"}))
+        self.assertEqual(error, "")
+        self.assertTrue(output.startswith(success_prompt))
+        output_data = json.loads(output.split(success_prompt)[-1])
+        node_output = output_data["data"]["resultData"]["runData"]["node_var"][0]["data"]["main"][0]
+        self.assertEqual(node_output, [{"json": {"text": "hello"}}])
+        self.assertEqual(self.server.executions["1"]["polls"], 2)
+
+    def test_execute_error(self):
+        output, _ = self.executor.execute(self.make_workflow({"fail": True}))
+        outputs = output.split(error_prompt)
+        self.assertEqual(len(outputs), 2)
+        self.assertEqual(outputs[1].strip(), "node_var failed")
+
+    def test_login(self):
+        """
+        The executor logs in once, and reports a failed login as an execution error.
+        """
+        for k in range(3):
+            self.assertTrue(self.executor.execute(self.make_workflow({"k": k}))[0].startswith(success_prompt))
+        self.assertEqual(self.server.logins, 1)
+
+        wrong_executor = self.make_executor(password="wrong")
+        output, error = wrong_executor.execute(self.make_workflow({}))
+        wrong_executor.close()
+        self.assertTrue(output.startswith(error_prompt))
+        self.assertIn("401", error)
+
+    def test_connection_reused(self):
+        """
+        Sequential executions must go through the same kept-alive connection.
+        """
+        for k in range(3):
+            self.executor.execute(self.make_workflow({"k": k}))
+        self.assertEqual(len(self.server.client_ports), 1)
+
+
+class ExecutorTest(unittest.TestCase):
+    def test_unflatten(self):
+        value = {"resultData": {"runData": {"node": [{"data": {"main": [[{"json": {"a": "x", "b": 1, "c": None}}]]}}]}}, "tags": ["x", "y"]}
+        self.assertEqual(unflatten(flatten(value)), value)
+        # shared references are decoded as the same object
+        shared = unflatten(json.dumps([{"a": "1", "b": "1"}, {"c": "2"}, "text"]))
+        self.assertIs(shared["a"], shared["b"])
+
+    def test_cli_timeout(self):
+        cli_executor = n8nCliExecutor(timeout=5)
+        with mock.patch("subprocess.run", side_effect=subprocess.TimeoutExpired(["n8n"], 5)):
+            output, error = cli_executor.execute({"nodes": []})
+        self.assertTrue(output.startswith(error_prompt))
+        self.assertIn("5 seconds", output)
+
+    def test_unknown_backend(self):
+        with mock.patch.object(executor, "_executor", None), mock.patch.dict(CONFIG.n8n_executor, {"backend": "unknown"}):
+            with self.assertRaises(ValueError):
+                get_executor()
+
+    def test_abstract_executor(self):
+        class IncompleteExecutor(executor.n8nExecutor):
+            pass
+
+        with self.assertRaises(TypeError):
+            IncompleteExecutor()
@@ -1,8 +1,10 @@
 
 import json
+import asyncio
 from ProAgent.config import CONFIG
 
-from ProAgent.agent.utils import _chat_completion_request
+from ProAgent.agent.llm_client import get_llm_client
+from ProAgent.agent.utils import _achat_completion_request
 
 
 def run_ai_completion(params_list:list) -> str:
@@ -15,18 +17,27 @@ def run_ai_completion(params_list:list) -> str:
     Returns:
         str: The function comment in markdown format.
     """
+    return get_llm_client().run(arun_ai_completion(params_list))
+
+async def arun_ai_completion(params_list:list) -> list:
+    """
+    The coroutine version of `run_ai_completion`. The completions of all the items are requested concurrently.
+    """
     return_list = []
     completion_kwargs = CONFIG.default_completion_kwargs
+    requests = []
     for params in params_list:
         messages = params['messages']
         if isinstance(messages, str):
             messages_json = json.loads(messages)
         elif isinstance(messages, list):
             messages_json = messages
-        result = _chat_completion_request(messages=messages_json,
+        requests.append(_achat_completion_request(messages=messages_json,
                                             functions=None,
                                             default_completion_kwargs=completion_kwargs,
-                                            recorder=None)
+                                            recorder=None))
+    results = await asyncio.gather(*requests)
+    for result in results:
         content = result["choices"][0]["message"]['content']
         return_list.append(
             {
@@ -0,0 +1,386 @@
+"""In-process evaluation of n8n string expressions, such as "=Hello {{$json["name"]}}, you are {{$json["age"] + 1}}".
+
+Only a small subset of java-script is supported: `$json` member access, literals, arithmetic,
+comparisons, logical operators and the ternary operator. Everything else raises
+`UnsupportedExpressionError`, and the caller should fall back to evaluating the expression with n8n.
+"""
+import re
+import math
+from functools import lru_cache
+
+
+class UnsupportedExpressionError(Exception):
+    """The expression can't be evaluated in python with the same result as n8n."""
+
+
+class _Undefined():
+    def __repr__(self):
+        return "undefined"
+
+UNDEFINED = _Undefined()
+
+# the same pattern as `format_expression`: only the blocks starting with "$" are substituted by n8n
+expression_pattern = re.compile(r'\{\{\s?\$(.*?)\s?\}\}')
+
+token_pattern = re.compile(r'''
+    (?P<space>\s+)
+  | (?P<number>\d+\.\d*|\.\d+|\d+)
+  | (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+  | (?P<name>[A-Za-z_$][A-Za-z0-9_$]*)
+  | (?P<op>===|!==|==|!=|<=|>=|&&|\|\||[-+*/%<>!?:.\[\]()])
+''', re.VERBOSE)
+
+string_escapes = {"n": "\n", "t": "\t", "r": "\r", "\\": "\\", "'": "'", "\"": "\""}
+
+binary_precedence = {
+    "||": 1,
+    "&&": 2,
+    "==": 3, "!=": 3, "===": 3, "!==": 3,
+    "<": 4, ">": 4, "<=": 4, ">=": 4,
+    "+": 5, "-": 5,
+    "*": 6, "/": 6, "%": 6,
+}
+
+constants = {"true": True, "false": False, "null": None, "undefined": UNDEFINED}
+
+
+def tokenize(source: str) -> list:
+    """
+    Splits a java-script expression into (kind, text) tokens.
+
+    Args:
+        source (str): The expression.
+
+    Returns:
+        list: The tokens.
+
+    Raises:
+        UnsupportedExpressionError: If the expression contains unknown characters.
+    """
+    tokens = []
+    position = 0
+    while position < len(source):
+        match = token_pattern.match(source, position)
+        if match == None:
+            raise UnsupportedExpressionError(f"unknown token at {source[position:]}")
+        position = match.end()
+        if match.lastgroup != "space":
+            tokens.append((match.lastgroup, match.group()))
+    return tokens
+
+
+class _Parser():
+    """Recursive descent parser producing tuple nodes:
+    ("const", value), ("var", name), ("member", object, key), ("unary", op, operand),
+    ("binary", op, left, right), ("ternary", condition, if_true, if_false)
+    """
+
+    def __init__(self, tokens: list):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return (None, None)
+
+    def take(self, text=None):
+        kind, token_text = self.peek()
+        if kind == None or (text != None and token_text != text):
+            raise UnsupportedExpressionError(f"expect {text}, got {token_text}")
+        self.position += 1
+        return kind, token_text
+
+    def parse(self):
+        node = self.parse_ternary()
+        if self.position != len(self.tokens):
+            raise UnsupportedExpressionError(f"unexpected token {self.peek()[1]}")
+        return node
+
+    def parse_ternary(self):
+        condition = self.parse_binary(1)
+        if self.peek()[1] == "?":
+            self.take("?")
+            if_true = self.parse_ternary()
+            self.take(":")
+            if_false = self.parse_ternary()
+            return ("ternary", condition, if_true, if_false)
+        return condition
+
+    def parse_binary(self, min_precedence):
+        left = self.parse_unary()
+        while True:
+            kind, op = self.peek()
+            if kind != "op" or binary_precedence.get(op, 0) < min_precedence:
+                return left
+            self.take()
+            right = self.parse_binary(binary_precedence[op] + 1)
+            left = ("binary", op, left, right)
+
+    def parse_unary(self):
+        kind, op = self.peek()
+        if kind == "op" and op in ["!", "-", "+"]:
+            self.take()
+            return ("unary", op, self.parse_unary())
+        return self.parse_member()
+
+    def parse_member(self):
+        node = self.parse_primary()
+        while True:
+            op = self.peek()[1]
+            if op == ".":
+                self.take(".")
+                kind, name = self.take()
+                if kind != "name":
+                    raise UnsupportedExpressionError(f"unexpected member {name}")
+                node = ("member", node, ("const", name))
+            elif op == "[":
+                self.take("[")
+                key = self.parse_ternary()
+                self.take("]")
+                node = ("member", node, key)
+            elif op == "(":
+                raise UnsupportedExpressionError("function calls are not supported")
+            else:
+                return node
+
+    def parse_primary(self):
+        kind, text = self.take()
+        if kind == "number":
+            value = float(text)
+            return ("const", int(value) if value.is_integer() and "." not in text else value)
+        if kind == "string":
+            return ("const", self.unescape(text[1:-1]))
+        if kind == "name":
+            if text in constants:
+                return ("const", constants[text])
+            if text != "$json":
+                raise UnsupportedExpressionError(f"unsupported variable {text}")
+            return ("var", text)
+        if text == "(":
+            node = self.parse_ternary()
+            self.take(")")
+            return node
+        raise UnsupportedExpressionError(f"unexpected token {text}")
+
+    @staticmethod
+    def unescape(text: str) -> str:
+        def replace_escape(match):
+            char = match.group(1)
+            if char not in string_escapes:
+                raise UnsupportedExpressionError(f"unsupported escape \\{char}")
+            return string_escapes[char]
+        return re.sub(r"\\(.)", replace_escape, text)
+
+
+def _is_number(value) -> bool:
+    return type(value) in [int, float]
+
+def _to_number(value):
+    if type(value) == bool:
+        return int(value)
+    if _is_number(value):
+        return value
+    raise UnsupportedExpressionError(f"implicit conversion of {type(value).__name__} to number")
+
+def _to_boolean(value) -> bool:
+    if value is UNDEFINED or value == None:
+        return False
+    if type(value) == float and math.isnan(value):
+        return False
+    if type(value) in [bool, int, float, str]:
+        return bool(value)
+    return True
+
+def to_js_string(value) -> str:
+    """
+    Converts a value to string the same way as a java-script template literal does.
+
+    Args:
+        value (any): A json compatible value.
+
+    Returns:
+        str: The string representation.
+    """
+    if type(value) == str:
+        return value
+    if type(value) == bool:
+        return "true" if value else "false"
+    if value is UNDEFINED:
+        return "undefined"
+    if value == None:
+        return "null"
+    if type(value) == int and abs(value) < 2**53:
+        return str(value)
+    if type(value) == float:
+        if math.isnan(value) or math.isinf(value) or (value != 0 and not 1e-6 <= abs(value) < 1e21):
+            raise UnsupportedExpressionError(f"number formatting of {value}")
+        if value.is_integer():
+            return str(int(value))
+        return repr(value)
+    if type(value) == list:
+        return ",".join("" if (item == None or item is UNDEFINED) else to_js_string(item) for item in value)
+    if type(value) == dict:
+        return "[object Object]"
+    raise UnsupportedExpressionError(f"string conversion of {type(value).__name__}")
+
+def _strict_equal(left, right) -> bool:
+    if (left is UNDEFINED) or (right is UNDEFINED):
+        return left is right
+    if type(left) == bool or type(right) == bool:
+        return type(left) == type(right) and left == right
+    if _is_number(left) and _is_number(right):
+        return left == right
+    if type(left) != type(right):
+        return False
+    if type(left) in [list, dict]:
+        # objects are compared by reference in java-script
+        raise UnsupportedExpressionError("comparison of objects")
+    return left == right
+
+def _loose_equal(left, right) -> bool:
+    if (left == None or left is UNDEFINED) and (right == None or right is UNDEFINED):
+        return True
+    if type(left) != type(right) and not (_is_number(left) and _is_number(right)):
+        raise UnsupportedExpressionError("loose comparison between different types")
+    return _strict_equal(left, right)
+
+def _member(obj, key):
+    if type(obj) == dict:
+        if type(key) not in [str, int]:
+            raise UnsupportedExpressionError(f"object key of type {type(key).__name__}")
+        return obj.get(str(key), UNDEFINED)
+    if type(obj) in [list, str]:
+        if key == "length":
+            return len(obj)
+        if type(key) == int and key >= 0:
+            return obj[key] if key < len(obj) else UNDEFINED
+    raise UnsupportedExpressionError(f"member access of {type(obj).__name__}")
+
+def _binary(op, left, right):
+    if op == "+":
+        if type(left) == str or type(right) == str:
+            return to_js_string(left) + to_js_string(right)
+        result = _to_number(left) + _to_number(right)
+    elif op in ["-", "*"]:
+        left, right = _to_number(left), _to_number(right)
+        result = left - right if op == "-" else left * right
+    elif op in ["/", "%"]:
+        left, right = _to_number(left), _to_number(right)
+        if right == 0:
+            raise UnsupportedExpressionError("division by zero")
+        if op == "/":
+            result = left / right
+        else:
+            result = math.fmod(left, right)
+            if type(left) == int and type(right) == int:
+                result = int(result)
+    elif op in ["===", "!=="]:
+        return _strict_equal(left, right) == (op == "===")
+    elif op in ["==", "!="]:
+        return _loose_equal(left, right) == (op == "==")
+    else:
+        if not ((_is_number(left) and _is_number(right)) or (type(left) == str and type(right) == str)):
+            raise UnsupportedExpressionError(f"{op} between {type(left).__name__} and {type(right).__name__}")
+        return {"<": left < right, ">": left > right, "<=": left <= right, ">=": left >= right}[op]
+    if type(result) == float and result.is_integer() and abs(result) < 2**53:
+        result = int(result)
+    return result
+
+def _evaluate(node, variables: dict):
+    node_type = node[0]
+    if node_type == "const":
+        return node[1]
+    if node_type == "var":
+        return variables[node[1]]
+    if node_type == "member":
+        obj = _evaluate(node[1], variables)
+        return _member(obj, _evaluate(node[2], variables))
+    if node_type == "unary":
+        operand = _evaluate(node[2], variables)
+        if node[1] == "!":
+            return not _to_boolean(operand)
+        operand = _to_number(operand)
+        return -operand if node[1] == "-" else operand
+    if node_type == "ternary":
+        if _to_boolean(_evaluate(node[1], variables)):
+            return _evaluate(node[2], variables)
+        return _evaluate(node[3], variables)
+
+    op, left = node[1], _evaluate(node[2], variables)
+    if op == "&&":
+        return _evaluate(node[3], variables) if _to_boolean(left) else left
+    if op == "||":
+        return left if _to_boolean(left) else _evaluate(node[3], variables)
+    return _binary(op, left, _evaluate(node[3], variables))
+
+
+@lru_cache(maxsize=4096)
+def compile_expression(expression: str):
+    """
+    Parses an expression (without the leading "=") into a list of literal strings and syntax trees.
+    The result is cached, so every expression is only parsed once per process.
+
+    Args:
+        expression (str): The expression, such as "Hello {{$json["name"]}}".
+
+    Returns:
+        tuple or None: The compiled parts, or None if the expression is not supported.
+    """
+    parts = []
+    position = 0
+    try:
+        for match in expression_pattern.finditer(expression):
+            parts.append(expression[position:match.start()])
+            parts.append(_Parser(tokenize("$" + match.group(1))).parse())
+            position = match.end()
+        parts.append(expression[position:])
+    except UnsupportedExpressionError:
+        return None
+
+    # n8n puts the literal text into a java-script template literal, which has its own escaping
+    for part in parts:
+        if type(part) == str and ("`" in part or "\\" in part or "${" in part):
+            return None
+    return tuple(parts)
+
+def get_item_json(data_item):
+    """
+    Returns the value of `$json` for a data item, normalizing it the same way as the n8n code node.
+
+    Args:
+        data_item (dict): The data item, such as {"json": {...}}.
+
+    Returns:
+        dict: The json field of the item.
+    """
+    if type(data_item) == dict and "json" in data_item.keys() and set(data_item.keys()) <= {"json", "binary", "pairedItem", "error"}:
+        return data_item["json"]
+    return data_item
+
+def evaluate_expression(data_item: dict, expression: str) -> str:
+    """
+    Evaluates an expression (without the leading "=") for a data item.
+
+    Args:
+        data_item (dict): The data item, such as {"json": {...}}.
+        expression (str): The expression, such as "Hello {{$json["name"]}}".
+
+    Returns:
+        str: The formatted string, the same as n8n's result.
+
+    Raises:
+        UnsupportedExpressionError: If the expression should be evaluated by n8n instead.
+    """
+    parts = compile_expression(expression)
+    if parts == None:
+        raise UnsupportedExpressionError(expression)
+
+    variables = {"$json": get_item_json(data_item)}
+    output = []
+    for part in parts:
+        if type(part) == str:
+            output.append(part)
+        else:
+            output.append(to_js_string(_evaluate(part, variables)))
+    return "".join(output)
@@ -0,0 +1,49 @@
+import unittest
+
+from ProAgent.n8n_tester.pseudo_node.expression import evaluate_expression, compile_expression, UnsupportedExpressionError
+
+
+class ExpressionTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.data_item = {
+            "json": {
+                "name": "Alice",
+                "age": 15,
+                "year": 2000,
+                "cost": 3.5,
+                "sales": 10,
+                "tags": ["a", "b"],
+            }
+        }
+
+    def test_prompt_examples(self):
+        """
+        The expression examples given to the agent in the system prompt.
+        """
+        self.assertEqual(evaluate_expression(self.data_item, "Hello {{$json[\"name\"]}}, you are {{$json[\"age\"]}} years old."), "Hello Alice, you are 15 years old.")
+        self.assertEqual(evaluate_expression(self.data_item, "{{$json[\"age\"] > 20}}"), "false")
+        self.assertEqual(evaluate_expression(self.data_item, "{{$json[\"year\"] + 10.5}}"), "2010.5")
+        self.assertEqual(evaluate_expression(self.data_item, "{ \"new_age\":{{$json[\"year\"] + 5}} }"), "{ \"new_age\":2005 }")
+
+    def test_js_semantics(self):
+        self.assertEqual(evaluate_expression(self.data_item, "{{$json.sales - $json.cost}}"), "6.5")
+        self.assertEqual(evaluate_expression(self.data_item, "{{$json.sales / 5}}"), "2")
+        self.assertEqual(evaluate_expression(self.data_item, "{{$json.name + 1}}"), "Alice1")
+        self.assertEqual(evaluate_expression(self.data_item, "{{$json.tags}} {{$json.missing}}"), "a,b undefined")
+        self.assertEqual(evaluate_expression(self.data_item, "{{$json.age >= 15 ? 'adult' : 'kid'}}"), "adult")
+        self.assertEqual(evaluate_expression(self.data_item, "{{$json.missing || $json.name}}"), "Alice")
+        self.assertEqual(evaluate_expression(self.data_item, "{{ 1 + 2 }}"), "{{ 1 + 2 }}")
+
+    def test_unsupported(self):
+        """
+        Constructs outside of the supported subset must be left to n8n.
+        """
+        for expression in ["{{$json.name.toUpperCase()}}", "{{$node[\"x\"].json}}", "`{{$json.name}}`", "{{$json.missing.field}}", "{{$json.name * 2}}"]:
+            with self.assertRaises(UnsupportedExpressionError):
+                evaluate_expression(self.data_item, expression)
+
+    def test_compile_cached(self):
+        compile_expression.cache_clear()
+        for _ in range(3):
+            evaluate_expression(self.data_item, "{{$json.age}}")
+        self.assertEqual(compile_expression.cache_info().misses, 1)
@@ -19,13 +19,16 @@ def run_pseudo_workflow(input_data: list, constant_workflow: n8nPythonWorkflow)
 
     Returns:
         str: The final return data of the pseudo workflow.
+
+    Note:
+        The n8n expressions of the parameters are evaluated for each input item (see `replace_exp`),
+        so the node runs once per item, like an n8n node.
     """
     # import pdb; pdb.set_trace()
     node_var:n8nPythonNode = constant_workflow['nodes'][-1]
     params_raw = node_var['parameters']
 
-    # params_list = replace_exp(input_data, params_raw)
-    params_list = [params_raw]
+    params_list = replace_exp(input_data, params_raw)
 
     if node_var['type'].split('.')[-1] == 'aiCompletion':
         return_list = run_ai_completion(params_list)
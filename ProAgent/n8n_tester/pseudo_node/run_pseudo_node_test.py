@@ -0,0 +1,21 @@
+import unittest
+from unittest import mock
+
+from ProAgent.n8n_tester.pseudo_node import run_pseudo_node
+
+
+class RunPseudoWorkflowTest(unittest.TestCase):
+    def test_ai_completion(self):
+        """
+        The parameters of the node are evaluated for each input item, and the node runs once per item.
+        """
+        constant_workflow = {"nodes": [{"name": "trigger"}, {
+            "name": "node_var",
+            "type": "n8n-nodes-base.aiCompletion",
+            "parameters": {"messages": [{"role": "user", "content": "=Say hello to {{$json.name}}"}], "resource": "default", "operation": "default"},
+        }]}
+        input_data = [{"json": {"name": "alice"}}, {"json": {"name": "bob"}}]
+        with mock.patch.object(run_pseudo_node, "run_ai_completion", return_value=[{"json": {"choices": [{"text": "hello"}]}}] * 2) as run_ai_completion:
+            run_pseudo_node.run_pseudo_workflow(input_data, constant_workflow)
+        params_list = run_ai_completion.call_args.args[0]
+        self.assertEqual([params["messages"][0]["content"] for params in params_list], ["Say hello to alice", "Say hello to bob"])
@@ -111,6 +111,49 @@ def format_replace_exp_workflow(data_item: dict, expression: str):
         "id": "ovm4ntEU37IYs7PI"
     }
     return replace_exp_workflow
+
+def format_replace_exp_batch_workflow(data_items: list, expressions: dict, item_paths: list):
+    """
+    Generates a workflow replacing many expressions for many data items in one execution.
+
+    Args:
+        data_items (list): The data items to be formatted.
+        expressions (dict): The formatted expressions (see `format_expression`), keyed by path.
+        item_paths (list): For each data item, the list of paths to be evaluated on it.
+
+    Returns:
+        dict: The generated workflow. node_var outputs one item per data item, whose
+            json["formatted"] maps each requested path to its formatted value.
+
+    This extends `format_replace_exp_workflow`: the node_var code node runs once for all items,
+    and evaluates every expression inside a scope where `$input.item` and `$json` point to the
+    current item, just like the runOnceForEachItem mode does.
+    """
+    formatter_lines = []
+    for path, expression in expressions.items():
+        formatter_lines.append(f"    {json.dumps(path)}: () => `{expression}`,")
+
+    js_code = "const paths = " + json.dumps(item_paths) + ";\n" + \
+        "return $input.all().map((item, index) => {\n" + \
+        "  const $input = { item };\n" + \
+        "  const $json = item.json;\n" + \
+        "  const formatters = {\n" + "\n".join(formatter_lines) + "\n  };\n" + \
+        "  const formatted = {};\n" + \
+        "  for (const path of paths[index]) {\n" + \
+        "    formatted[path] = formatters[path]();\n" + \
+        "  }\n" + \
+        "  return { json: { formatted } };\n" + \
+        "});"
+
+    replace_exp_workflow = format_replace_exp_workflow({}, "")
+    code_node, node_var = replace_exp_workflow["nodes"][1], replace_exp_workflow["nodes"][2]
+    code_node["parameters"]["jsCode"] = f"return {json.dumps(data_items)}"
+    node_var["parameters"] = {
+        "mode": "runOnceForAllItems",
+        "jsCode": js_code,
+    }
+    return replace_exp_workflow
+
 def format_return_data(return_list:list) -> str:
     """
     Generate the formatted return data for the given return list.
@@ -1,12 +1,12 @@
 
 import json
 import re
-import subprocess
-import tempfile
 
 from termcolor import colored
-from ProAgent.n8n_tester.pseudo_node.templates import format_replace_exp_workflow, format_return_data
+from ProAgent.n8n_tester.pseudo_node.templates import format_replace_exp_workflow, format_replace_exp_batch_workflow, format_return_data
 from ProAgent.n8n_tester.prompts import success_prompt, error_prompt
+from ProAgent.n8n_tester.executor import get_executor
+from ProAgent.n8n_tester.pseudo_node.expression import evaluate_expression, UnsupportedExpressionError
 
 def format_expression(expression):
     """
@@ -42,26 +42,26 @@ def replace_single_exp(data_item:dict, expression:str) -> str:
     - `BaseException`: If an error occurs during the execution of the expression substitution workflow.
 
     Description:
-    - If the `expression` starts with '=', it is formatted and then used to create a replace expression workflow.
-    - The workflow is written to a temporary JSON file and executed using the `n8n` command-line tool.
+    - If the `expression` starts with '=', it is first evaluated in-process by `evaluate_expression`.
+    - If the expression is not supported in-process, it is formatted and then used to create a replace expression workflow.
+    - The workflow is executed by the shared n8n executor (see `ProAgent.n8n_tester.executor`).
     - The output of the execution is parsed to extract the modified expression.
     - If the execution is successful and the modified expression is not empty, it is returned.
     - If the execution is not successful or the modified expression is empty, a `BaseException` is raised.
     - If the `expression` does not start with '=', it is returned as is.
     """
     if expression.startswith('='):
+        try:
+            return evaluate_expression(data_item, expression[1:])
+        except UnsupportedExpressionError:
+            pass
 
         expression = format_expression(expression[1:])
         
         # substitute workflow (data_item, expression)
         replace_exp_workflow = format_replace_exp_workflow(data_item, expression)
 
-        temp_file = tempfile.NamedTemporaryFile(delete=False, mode="w", suffix=".json")
-        json.dump(replace_exp_workflow, temp_file)
-        temp_file.close()
-        temp_file_path = temp_file.name
-        result = subprocess.run(["n8n", "execute", "--file", temp_file_path], stdout=subprocess.PIPE, stderr=subprocess.PIPE) 
-        output = result.stdout.decode('utf-8')
+        output, _ = get_executor().execute(replace_exp_workflow)
 
         print(colored(output, color='green'))
 
@@ -78,13 +78,17 @@ def replace_single_exp(data_item:dict, expression:str) -> str:
         
     return expression
 
-def replace_exp_recursive(data_item: dict, expression_dict: dict) -> dict:
+def replace_exp_recursive(data_item: dict, expression_dict: dict, pending_paths: list = None, path: tuple = ()) -> dict:
     """
     Recursively replaces expressions in a data_item dictionary with corresponding values.
 
     Args:
         data_item (dict): The dictionary containing the data items.
         expression_dict (dict): The dictionary containing the expressions to replace.
+        pending_paths (list, optional): If provided, expressions that can't be evaluated in-process are not
+            sent to n8n one by one. Their paths are appended to this list and the raw expressions are kept
+            in place, so that the caller can evaluate them in a batch. Defaults to None.
+        path (tuple, optional): The path of `expression_dict` in the top-level dictionary. Defaults to ().
 
     Returns:
         dict: A new dictionary with replaced expressions.
@@ -93,17 +97,69 @@ def replace_exp_recursive(data_item: dict, expression_dict: dict) -> dict:
 
     return_dict = {}
     for key in expression_dict.keys():
-            expression_value = expression_dict[key]                
-            if type(expression_value) == dict:
-                return_dict[key] = replace_exp_recursive(data_item, expression_value)
-            elif type(expression_value) == str:
-                output = replace_single_exp(data_item, expression_value)
-                return_dict[key] = output
+        return_dict[key] = replace_exp_value(data_item, expression_dict[key], pending_paths, path + (key,))
     return return_dict
 
+def replace_exp_value(data_item: dict, expression_value, pending_paths: list = None, path: tuple = ()):
+    """
+    Replaces the expressions of a parameter value, see `replace_exp_recursive`.
+    The strings are evaluated, the dicts and lists are walked (the list indexes are part of the paths),
+    and the other values are kept as they are.
+    """
+    if type(expression_value) == dict:
+        return replace_exp_recursive(data_item, expression_value, pending_paths, path)
+    elif type(expression_value) == list:
+        return [replace_exp_value(data_item, item, pending_paths, path + (index,)) for index, item in enumerate(expression_value)]
+    elif type(expression_value) == str:
+        if pending_paths != None and expression_value.startswith('='):
+            try:
+                return evaluate_expression(data_item, expression_value[1:])
+            except UnsupportedExpressionError:
+                pending_paths.append(path)
+                return expression_value
+        return replace_single_exp(data_item, expression_value)
+    return expression_value
+
+def replace_exp_batch(input_data: list, pending: list) -> list:
+    """
+    Evaluates the expressions that are not supported in-process with a single n8n execution.
+
+    Parameters:
+    - input_data (list): The list of input data.
+    - pending (list): The (item_index, path, expression) tuples to evaluate.
+
+    Returns:
+    - list: For each item of `input_data`, a dict mapping the path key (`json.dumps(list(path))`) to the formatted value.
+
+    Raises:
+    - `BaseException`: If the n8n execution fails.
+    """
+    expressions = {}
+    item_paths = [[] for _ in input_data]
+    for item_index, path, expression in pending:
+        path_key = json.dumps(list(path))
+        expressions[path_key] = format_expression(expression[1:])
+        item_paths[item_index].append(path_key)
+
+    replace_exp_workflow = format_replace_exp_batch_workflow(input_data, expressions, item_paths)
+    output, _ = get_executor().execute(replace_exp_workflow)
+
+    print(colored(output, color='green'))
+
+    if success_prompt in output:
+        output_data = output.split(success_prompt)[-1]
+        if output_data != "":
+            output_data = json.loads(output_data)
+            output_data = output_data["data"]["resultData"]["runData"]["node_var"][0]["data"]["main"][0]
+            return [item['json']['formatted'] for item in output_data]
+    raise BaseException()
+
 def replace_exp(input_data:list, expression_dict:dict) -> list:
     """
     Replace the json expressions in the input data.
+
+    Expressions are evaluated in-process when possible. All the other (item, expression) pairs
+    are gathered and evaluated by one n8n execution, instead of one execution for each pair.
     
     Parameters:
     - input_data (list): The list of input data.
@@ -113,9 +169,24 @@ def replace_exp(input_data:list, expression_dict:dict) -> list:
     - list: The list of results after replacing json expressions.
     """
     return_list = []
-    for data_item in input_data:
-        return_single_dict = replace_exp_recursive(data_item, expression_dict)
+    pending = []
+    for item_index, data_item in enumerate(input_data):
+        pending_paths = []
+        return_single_dict = replace_exp_recursive(data_item, expression_dict, pending_paths)
         return_list.append(return_single_dict)
+        for path in pending_paths:
+            target = expression_dict
+            for key in path:
+                target = target[key]
+            pending.append((item_index, path, target))
+
+    if len(pending) > 0:
+        formatted_list = replace_exp_batch(input_data, pending)
+        for item_index, path, _ in pending:
+            target = return_list[item_index]
+            for key in path[:-1]:
+                target = target[key]
+            target[path[-1]] = formatted_list[item_index][json.dumps(list(path))]
     return return_list
 
 def fill_return_data(output_data:list) -> str:
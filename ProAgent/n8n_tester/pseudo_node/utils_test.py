@@ -0,0 +1,94 @@
+import json
+import shutil
+import subprocess
+import unittest
+from unittest import mock
+
+from ProAgent.n8n_tester.prompts import success_prompt
+from ProAgent.n8n_tester.pseudo_node import utils
+from ProAgent.n8n_tester.pseudo_node.utils import replace_exp, replace_exp_recursive
+from ProAgent.n8n_tester.pseudo_node.templates import format_replace_exp_batch_workflow
+
+
+class NodeJsExecutor():
+    """Runs the code nodes of a replace expression workflow with nodejs, answering like `n8n execute`."""
+
+    def __init__(self):
+        self.workflows = []
+
+    def execute(self, workflow: dict) -> (str, str):
+        self.workflows.append(workflow)
+        code_node, node_var = workflow["nodes"][1], workflow["nodes"][2]
+        script = "const items = (() => {\n" + code_node["parameters"]["jsCode"] + "\n})();\n" + \
+            "const $input = { all: () => items };\n" + \
+            "const output = (() => {\n" + node_var["parameters"]["jsCode"] + "\n})();\n" + \
+            "console.log(JSON.stringify(output));"
+        result = subprocess.run(["node", "-e", script], stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=30)
+        if result.returncode != 0:
+            return "", result.stderr.decode("utf-8")
+        output = json.loads(result.stdout)
+        return success_prompt + json.dumps({"data": {"resultData": {"runData": {"node_var": [{"data": {"main": [output]}}]}}}}), ""
+
+
+class ReplaceExpTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.input_data = [{"json": {"name": "alice", "age": 15}}, {"json": {"name": "bob", "age": 20}}]
+        self.expression_dict = {
+            "text": "={{$json.name.toUpperCase()}} is {{$json.age}}",
+            "options": {"age": "={{$json.age + 1}}", "shout": "={{$json.name.toUpperCase()}}!"},
+            "plain": "hello",
+        }
+
+    def test_pending_paths(self):
+        """
+        The expressions that can't be evaluated in-process are left in place, and their paths are collected.
+        """
+        pending_paths = []
+        result = replace_exp_recursive(self.input_data[0], self.expression_dict, pending_paths)
+        self.assertEqual(pending_paths, [("text",), ("options", "shout")])
+        self.assertEqual(result, {
+            "text": "={{$json.name.toUpperCase()}} is {{$json.age}}",
+            "options": {"age": "16", "shout": "={{$json.name.toUpperCase()}}!"},
+            "plain": "hello",
+        })
+
+    def test_batch_workflow(self):
+        workflow = format_replace_exp_batch_workflow(self.input_data, {"[\"text\"]": "${$input.item.json.name}"}, [["[\"text\"]"], []])
+        code_node, node_var = workflow["nodes"][1], workflow["nodes"][2]
+        self.assertEqual(json.loads(code_node["parameters"]["jsCode"][len("return "):]), self.input_data)
+        self.assertEqual(node_var["name"], "node_var")
+        self.assertEqual(node_var["parameters"]["mode"], "runOnceForAllItems")
+
+    @unittest.skipIf(shutil.which("node") == None, "nodejs is not installed")
+    def test_replace_exp(self):
+        """
+        All the pending expressions of all the items are evaluated by a single execution.
+        """
+        executor = NodeJsExecutor()
+        with mock.patch.object(utils, "get_executor", return_value=executor):
+            result = replace_exp(self.input_data, self.expression_dict)
+        self.assertEqual(len(executor.workflows), 1)
+        self.assertEqual(result, [
+            {"text": "ALICE is 15", "options": {"age": "16", "shout": "ALICE!"}, "plain": "hello"},
+            {"text": "BOB is 20", "options": {"age": "21", "shout": "BOB!"}, "plain": "hello"},
+        ])
+
+    def test_replace_exp_in_process(self):
+        """
+        Nothing is sent to n8n when every expression is evaluated in-process.
+        """
+        with mock.patch.object(utils, "get_executor") as get_executor:
+            result = replace_exp(self.input_data, {"age": "={{$json.age}}"})
+        get_executor.assert_not_called()
+        self.assertEqual(result, [{"age": "15"}, {"age": "20"}])
+
+    def test_replace_exp_lists(self):
+        """
+        The expressions inside lists are replaced too, the values which are not strings are kept.
+        """
+        expression_dict = {"messages": [{"role": "user", "content": "=Hello {{$json.name}}"}], "temperature": 0.5}
+        with mock.patch.object(utils, "get_executor") as get_executor:
+            result = replace_exp(self.input_data, expression_dict)
+        get_executor.assert_not_called()
+        self.assertEqual(result[1], {"messages": [{"role": "user", "content": "Hello bob"}], "temperature": 0.5})
+        self.assertEqual(expression_dict["messages"][0]["content"], "=Hello {{$json.name}}")
@@ -1,23 +1,344 @@
 import traceback
 import sys
 import io
-from functools import partial
+import json
+import hashlib
+from functools import partial, lru_cache
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from copy import deepcopy
 from colorama import Fore, Style
 import termcolor
 
+from ProAgent.config import CONFIG
 from ProAgent.loggers.logs import logger
 from ProAgent.n8n_parser.workflow import n8nPythonWorkflow
 from ProAgent.n8n_parser.node import n8nPythonNode
+from ProAgent.n8n_parser.param_parser import describe_parameters
 from ProAgent.utils import TestResult, TestDataType, RunTimeStatus, NodeType
 
 from ProAgent.n8n_tester.mock_input import MockInput
+from ProAgent.n8n_tester.execution_cache import is_cacheable
 from ProAgent.n8n_tester.run_node import run_node, n8nRunningException, anonymous_class
 
+@lru_cache(maxsize=1024)
+def compile_source(source: str):
+    """
+    Compiles the source of a node or workflow function. The result is cached by the source text,
+    so a function is only compiled again after its params or implement_code are changed.
+
+    Args:
+        source (str): The python source defining the function.
+
+    Returns:
+        code: The compiled code object.
+    """
+    return compile(source, "<string>", "exec")
+
+def define_function(source: str, function_name: str, name_space: dict):
+    """
+    Executes the compiled source with `name_space` as globals and returns the defined function.
+
+    Args:
+        source (str): The python source defining the function.
+        function_name (str): The name of the function.
+        name_space (dict): The globals of the function.
+
+    Returns:
+        function: The defined function.
+    """
+    local_vars = {}
+    exec(compile_source(source), name_space, local_vars)
+    if function_name not in local_vars.keys():
+        raise NameError(f"name '{function_name}' is not defined")
+    return local_vars[function_name]
+
+def get_code_context(code: str, lineno: int, function_name: str) -> list:
+    """
+    Formats the line `lineno` of `code` with one line around it, for `n8nRunningException.add_context_stack`.
+
+    Returns:
+        list: The context lines, or None if `lineno` is not in the code.
+    """
+    code_split = code.split("\n")
+    if not 0 < lineno <= len(code_split):
+        return None
+    error_codes = ["--> "+code_split[lineno - 1]]
+    if lineno < len(code_split) and code_split[lineno].strip() != "":
+        error_codes.append( "    "+ code_split[lineno])
+    if lineno - 2 >= 0 and code_split[lineno - 2].strip() != "":
+        error_codes = ["    "+ code_split[lineno - 2]] + error_codes
+    return [f"In Function: {function_name}"] + error_codes
+
+
+class LazyOutput():
+    """The output of a node dispatched to the thread pool of a parallel run.
+    It stands for the output list, and waits for the node execution the first time it's used,
+    so independent node calls of a workflow run concurrently.
+
+    Note:
+        It's not a list subclass: C functions reading the storage of a list (such as `list.__add__`
+        or `json.dumps`) would see an empty list. They get the output list from `resolve()`,
+        or fail on the proxy instead of dropping the items. `resolve_lazy` replaces the proxies
+        before the data is handed to a node.
+    """
+
+    def __init__(self, future: Future, call_site: tuple = None):
+        """
+        Args:
+            future (Future): The future of the node execution.
+            call_site (tuple): (function name, line number) of the node call in the workflow code.
+        """
+        self.future = future
+        self.call_site = call_site
+
+    def resolve(self) -> list:
+        """
+        Waits for the node execution.
+
+        Returns:
+            list: The output list of the node, the same list at every call.
+
+        Raises:
+            n8nRunningException: If the node execution failed.
+        """
+        try:
+            return self.future.result()
+        except n8nRunningException as e:
+            if not hasattr(e, "call_site"):
+                e.call_site = self.call_site
+            raise
+
+    def __getattr__(self, name):
+        # list methods, such as `append` or `index`
+        if name in ["future", "call_site"]:
+            raise AttributeError(name)
+        return getattr(self.resolve(), name)
+
+    def __add__(self, other):
+        return self.resolve() + resolve_lazy(other)
+
+    def __radd__(self, other):
+        return resolve_lazy(other) + self.resolve()
+
+    def __iadd__(self, other):
+        output_data = self.resolve()
+        output_data += resolve_lazy(other)
+        return output_data
+
+    def __copy__(self):
+        return list(self.resolve())
+
+    def __deepcopy__(self, memo):
+        return deepcopy(self.resolve(), memo)
+
+    def __bool__(self):
+        return len(self.resolve()) > 0
+
+    __hash__ = None
+
+def _resolving(method_name: str):
+    def resolve_and_call(self, *args, **kwargs):
+        return getattr(self.resolve(), method_name)(*[resolve_lazy(arg) for arg in args], **kwargs)
+    resolve_and_call.__name__ = method_name
+    return resolve_and_call
+
+for _method_name in ["__getitem__", "__setitem__", "__delitem__", "__iter__", "__reversed__", "__len__", "__contains__",
+                     "__repr__", "__str__", "__eq__", "__ne__", "__lt__", "__le__", "__gt__", "__ge__",
+                     "__mul__", "__rmul__", "__imul__"]:
+    setattr(LazyOutput, _method_name, _resolving(_method_name))
+
+def resolve_lazy(data):
+    """
+    Waits for all the `LazyOutput`s in `data`, including the nested ones, and replaces them by their output lists.
+
+    Returns:
+        The data without `LazyOutput`s. Lists and dicts are updated in place.
+    """
+    if isinstance(data, LazyOutput):
+        data = data.resolve()
+    if isinstance(data, list):
+        for k, item in enumerate(data):
+            resolved = resolve_lazy(item)
+            if resolved is not item:
+                data[k] = resolved
+    elif isinstance(data, dict):
+        for key, value in data.items():
+            resolved = resolve_lazy(value)
+            if resolved is not value:
+                data[key] = resolved
+    return data
+
+
+class ExecutionTrace():
+    """Records the transparent node calls of a run in call order, so that the next run can
+    reuse the outputs of the unchanged prefix instead of executing those nodes again.
+    """
+
+    def __init__(self, enable: bool = True, uncached_integrations: list = None):
+        """
+        Initializes an empty trace.
+
+        Parameters:
+            enable (bool): Whether the calls are replayed, they are recorded anyway. Defaults to True.
+            uncached_integrations (list): Integrations (or "integration.resource.operation") never replayed,
+                see `is_cacheable`. Defaults to None.
+
+        Attributes:
+            calls (list): (node name, caller workflows, input hash, output data) of the last run, in call order.
+                The caller workflows are the dependencies of the call: editing any of them re-executes it.
+            dirty (set): Names of the nodes and workflows changed since the last run.
+        """
+        self.enable = enable
+        self.uncached_integrations = set(uncached_integrations) if uncached_integrations != None else set()
+        self.calls = []
+        self.dirty = set()
+        self.previous_calls = []
+        self.call_stack = []
+        self.prefix_intact = False
+        self.pending_calls = set()
+
+    def start(self):
+        """
+        Starts recording a new run, keeping the calls of the last run for replay.
+        """
+        self.previous_calls = self.calls
+        self.calls = []
+        self.call_stack = []
+        self.prefix_intact = True
+        self.pending_calls = set()
+
+    def finish(self):
+        """
+        Ends the run. The recorded calls reflect the current code, so nothing is dirty anymore.
+        Calls dispatched in parallel mode without an output (failed) end the trace, like a failed call does in serial mode.
+        """
+        if len(self.pending_calls) > 0:
+            self.calls = self.calls[:min(self.pending_calls)]
+            self.pending_calls = set()
+        self.previous_calls = []
+        self.dirty.clear()
+
+    def mark_dirty(self, name: str):
+        self.dirty.add(name)
+
+    def enter(self, name: str):
+        self.call_stack.append(name)
+
+    def exit(self):
+        self.call_stack.pop()
+
+    @staticmethod
+    def hash_data(data) -> str:
+        content = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+    def replay(self, node: n8nPythonNode, input_data) -> (bool, list):
+        """
+        Returns the output of the same call in the last run, if every call before it was replayed,
+        neither the node nor its calling workflows are dirty, and the input is unchanged.
+        Once a call can't be replayed, all the following calls of this run are executed.
+        Nothing is replayed if the trace is disabled, and the nodes of `uncached_integrations` are always executed.
+
+        Args:
+            node (n8nPythonNode): The called node.
+            input_data (list): The input of the call.
+
+        Returns:
+            tuple[bool, list]: Whether the call is replayed, and its output data.
+        """
+        if not self.enable or not self.prefix_intact:
+            return False, None
+        node_name = node.get_name()
+        if not is_cacheable(node, self.uncached_integrations):
+            self.prefix_intact = False
+            return False, None
+        index = len(self.calls)
+        if index < len(self.previous_calls):
+            previous_name, previous_stack, previous_input_hash, previous_output = self.previous_calls[index]
+            if previous_name == node_name and previous_stack == tuple(self.call_stack) \
+                and len(self.dirty.intersection(self.call_stack + [node_name])) == 0 \
+                and previous_input_hash == self.hash_data(input_data):
+                return True, deepcopy(previous_output)
+        self.prefix_intact = False
+        return False, None
+
+    def record(self, node_name: str, input_data, output_data):
+        self.calls.append((node_name, tuple(self.call_stack), self.hash_data(input_data), deepcopy(output_data)))
+
+    def reserve(self, node_name: str, input_data) -> int:
+        """
+        Records a call dispatched in parallel mode, whose output is set by `fill` once it's done.
+
+        Returns:
+            int: The index of the call.
+        """
+        self.calls.append((node_name, tuple(self.call_stack), self.hash_data(input_data), None))
+        self.pending_calls.add(len(self.calls) - 1)
+        return len(self.calls) - 1
+
+    def fill(self, index: int, output_data):
+        # called from the worker threads, list item assignment and set.discard are atomic
+        node_name, call_stack, input_hash, _ = self.calls[index]
+        self.calls[index] = (node_name, call_stack, input_hash, deepcopy(output_data))
+        self.pending_calls.discard(index)
+
+
+def get_output_data_info(name_space: dict) -> str:
+    """
+    Describes the last output of every node of the name space, added to the context of a failed workflow.
+
+    Args:
+        name_space (dict): The runners of the nodes and workflows, by name.
+
+    Returns:
+        str: The [Output Data Info] context.
+    """
+    local_var_info = "Note: if there is 'KeyError' in the error message, it may be due to the wrong usage of output data. The output data info may help you: \n[Output Data Info]\n"
+    for action_name in name_space.keys():
+        if action_name not in ['mainWorkflow', 'mainWorkflow_input_data', '__builtins__'] and 'input_data' not in action_name:
+            if name_space[action_name] and "node" in name_space[action_name].__dict__.keys():
+                if name_space[action_name].node and "last_runtime_info" in name_space[action_name].node.__dict__.keys():
+                    if name_space[action_name].node.last_runtime_info and "output_data" in name_space[action_name].node.last_runtime_info.__dict__.keys():
+                        action_output_data = name_space[action_name].node.last_runtime_info.get_preview("output_data")
+                # if action_output_data is not None and len(action_output_data[0].keys()) > 0:
+                        local_var_info += f"the output data of function `{action_name}` is: `{action_output_data}`\n"
+    return local_var_info
+
+
 class n8nNodeRunner():
-    def __init__(self, node: n8nPythonNode, name_space: dict):
+    def __init__(self, node: n8nPythonNode, name_space: dict, trace: ExecutionTrace = None, pool: ThreadPoolExecutor = None, pending: list = None):
+        """
+        Args:
+            node (n8nPythonNode): The node to run.
+            name_space (dict): The dictionary containing the namespace.
+            trace (ExecutionTrace, optional): The trace shared by all the runners of a run.
+            pool (ThreadPoolExecutor, optional): If provided, node calls are dispatched to the pool and return a `LazyOutput`.
+            pending (list, optional): The `LazyOutput`s dispatched in this run are appended to it.
+        """
         self.node = node
         self.name_space: dict = name_space
+        self.trace = trace if trace != None else ExecutionTrace()
+        self.pool = pool
+        self.pending = pending if pending != None else []
+        self.function = None
+        self.function_source = None
+
+    def get_source(self) -> str:
+        return "from typing import List, Dict\n"+"\n".join(self.node.print_self())
+
+    def get_function(self):
+        """
+        Defines the node function at the first call, and reuses it afterwards.
+        A runner only lives for one run, so the node can't be changed in between.
+        The function gets its own globals on top of the name space, since `transparent_<node type>`
+        is bound to this node, while the other nodes of the same type share the name.
+        """
+        if self.function == None:
+            function_globals = dict(self.name_space)
+            function_globals[f"transparent_{self.node.node_meta.node_type.name}"] = partial(anonymous_class,node=self.node)
+            self.function_source = self.get_source()
+            self.function = define_function(self.function_source, self.node.get_name(), function_globals)
+        return self.function
 
     def __call__(self, input_data):
         """
@@ -32,29 +353,52 @@ class n8nNodeRunner():
         Raises:
             n8nRunningException: If an error occurs during the function execution.
         """
+        input_data = resolve_lazy(input_data)
         self.node.last_runtime_info.visit_times += 1
         self.node.last_runtime_info.TestDataType = TestDataType.ActionInput
         self.node.last_runtime_info.input_data = input_data
         # print(f"we are in {self.node.get_name()} for {self.node.last_runtime_info.visit_times}'s time")
 
+        replayed, output_data = self.trace.replay(self.node, input_data)
+        if replayed:
+            print(termcolor.colored(f"{self.node.get_name()} is unchanged, reuse the output of the last run", color="green"))
+            self.trace.record(self.node.get_name(), input_data, output_data)
+            self.node.last_runtime_info.output_data = deepcopy(output_data)
+            self.node.last_runtime_info.runtime_status = RunTimeStatus.FunctionExecuteSuccess
+            return output_data
+
+        if self.pool != None:
+            trace_index = self.trace.reserve(self.node.get_name(), input_data)
+            caller = sys._getframe(1)
+            call_site = (caller.f_code.co_name, caller.f_lineno) if caller.f_code.co_filename == "<string>" else None
+            output_data = LazyOutput(self.pool.submit(self.execute, input_data, trace_index), call_site=call_site)
+            self.pending.append(output_data)
+            return output_data
+        return self.execute(input_data)
+
+    def execute(self, input_data, trace_index: int = None):
+        """
+        Executes the node function, recording the call into the trace.
+
+        Args:
+            input_data: The input data of the node.
+            trace_index (int, optional): The index reserved in the trace for a call dispatched in parallel mode.
 
-        input_data_var_name = f"{self.node.get_name()}_input_data"
-        output_data_var_name = f"{self.node.get_name()}_output_data"
-        self.name_space[input_data_var_name] = input_data
-        self.name_space[f"transparent_{self.node.node_meta.node_type.name}"] = partial(anonymous_class,node=self.node)
-        node_code = "from typing import List, Dict\n"+"\n".join(self.node.print_self()) + f"\n{output_data_var_name}={self.node.get_name()}({input_data_var_name})"
+        Returns:
+            The output data generated by the function.
 
+        Raises:
+            n8nRunningException: If an error occurs during the function execution.
+        """
         error = None
         tb = None
 
-        # local_vars = {}
-        # exec(node_code, self.name_space, local_vars)
-        # return local_vars[output_data_var_name]
-
         try:
-            local_vars = {}
-            exec(node_code, self.name_space, local_vars)
-            output_data = local_vars[output_data_var_name]
+            output_data = self.get_function()(input_data)
+            if trace_index == None:
+                self.trace.record(self.node.get_name(), input_data, output_data)
+            else:
+                self.trace.fill(trace_index, output_data)
             self.node.last_runtime_info.output_data = deepcopy(output_data)
             self.node.last_runtime_info.runtime_status = RunTimeStatus.FunctionExecuteSuccess
             return output_data
@@ -68,25 +412,19 @@ class n8nNodeRunner():
             self.node.last_runtime_info.runtime_status = RunTimeStatus.ErrorRaisedHere
 
         assert error != None
+        node_code = self.function_source if self.function_source != None else self.get_source()
         code_split = node_code.split("\n")
         for k, line in enumerate(code_split):
             if ".run" in line:
                 line_no = k + 1
                 break
 
-        error_codes = ["--> "+code_split[line_no - 1]]
-        if line_no < len(code_split) and code_split[line_no].strip() != "":
-            error_codes.append( "    "+ code_split[line_no])
-        if line_no - 2 >= 0 and code_split[line_no - 2].strip() != "":
-            error_codes = ["    "+ code_split[line_no - 2]] + error_codes
-
-        error_codes = [f"In Function: transparent_{self.node.node_meta.node_type.name}"] + error_codes
-        error.add_context_stack(error_codes)
+        error.add_context_stack(get_code_context(node_code, line_no, f"transparent_{self.node.node_meta.node_type.name}"))
 
         raise error
 
 class n8nWorkflowRunner():
-    def __init__(self, workflow_name: str,  workflow: n8nPythonWorkflow, name_space: dict):
+    def __init__(self, workflow_name: str,  workflow: n8nPythonWorkflow, name_space: dict, trace: ExecutionTrace = None):
         """
         Initializes a new instance of the class.
 
@@ -94,6 +432,7 @@ class n8nWorkflowRunner():
             workflow_name (str): The name of the workflow.
             workflow (n8nPythonWorkflow): The n8nPythonWorkflow object.
             name_space (dict): The dictionary containing the namespace.
+            trace (ExecutionTrace, optional): The trace shared by all the runners of a run.
 
         Returns:
             None
@@ -101,7 +440,16 @@ class n8nWorkflowRunner():
         self.workflow = workflow
         self.workflow_name = workflow_name
         self.name_space: dict = name_space
+        self.trace = trace if trace != None else ExecutionTrace()
+        self.function = None
 
+    def get_function(self):
+        """
+        Defines the workflow function in the name space at the first call, and reuses it afterwards.
+        """
+        if self.function == None:
+            self.function = define_function(self.workflow.implement_code, self.workflow_name, self.name_space)
+        return self.function
 
     def __call__(self, input_data):
         """
@@ -116,29 +464,19 @@ class n8nWorkflowRunner():
         Raises:
             n8nRunningException: If an error occurs during the execution of the workflow.
         """
+        input_data = resolve_lazy(input_data)
         self.workflow.last_runtime_info.visit_times += 1
         self.workflow.last_runtime_info.TestDataType = TestDataType.ActionInput
         self.workflow.last_runtime_info.input_data = input_data
         # print(f"we are in {self.workflow_name} for {self.workflow.last_runtime_info.visit_times}'s time")
 
         workflow_code = self.workflow.implement_code
-
-        input_data_var_name = f"{self.workflow_name}_input_data"
-        output_data_var_name = f"{self.workflow_name}_output_data"
-        self.name_space[input_data_var_name] = input_data
-        workflow_code = workflow_code + f"\n{output_data_var_name}={self.workflow_name}({input_data_var_name})"
         error = None
         tb = None
-        # print(self.name_space.keys())
-
-        # local_vars = {}
-        # exec(workflow_code, self.name_space, local_vars)
-        # return local_vars[output_data_var_name]
 
+        self.trace.enter(self.workflow_name)
         try:
-            local_vars = {}
-            exec(workflow_code, self.name_space, local_vars)
-            output_data = local_vars[output_data_var_name]
+            output_data = self.get_function()(input_data)
             self.workflow.last_runtime_info.output_data = deepcopy(output_data)
             self.workflow.last_runtime_info.runtime_status = RunTimeStatus.FunctionExecuteSuccess
             return output_data
@@ -153,42 +491,27 @@ class n8nWorkflowRunner():
                 error = n8nRunningException(e)
                 error.error_message = f"{type(e).__name__}: " + str(e)
                 self.workflow.last_runtime_info.runtime_status = RunTimeStatus.ErrorRaisedHere
+        finally:
+            self.trace.exit()
 
         assert error != None
-        code_split = workflow_code.split("\n")
-        frame = tb[-1]
-        counter = 2
+        # the workflow function is called directly, so the first frame of the compiled code is the workflow body
+        lineno, function_name = 0, self.workflow_name
         for cont in tb:
             if cont.filename == "<string>":
-                # frame = cont
-                counter -= 1
-            if counter == 0:
-                frame = cont
+                lineno, function_name = cont.lineno, cont.name
                 break
-        # print(f"frame.lineno: {frame.lineno}, len(code_split): {len(code_split)}")
-
-        if frame.lineno > 0:
-            error_codes = ["--> "+code_split[frame.lineno - 1]]
-            if frame.lineno < len(code_split) and code_split[frame.lineno].strip() != "":
-                error_codes.append( "    "+ code_split[frame.lineno])
-            if frame.lineno - 2 >= 0 and code_split[frame.lineno - 2].strip() != "":
-                error_codes = ["    "+ code_split[frame.lineno - 2]] + error_codes
-            error_codes = [f"In Function: {frame.name}"] + error_codes
+        if lineno == 0 and isinstance(error.args[0], SyntaxError):
+            lineno = error.args[0].lineno or 0
+        # a node dispatched in parallel mode fails where its output is read, point to the node call instead
+        call_site = getattr(error, "call_site", None)
+        if call_site != None and call_site[0] == function_name:
+            lineno = call_site[1]
+        error_codes = get_code_context(workflow_code, lineno, function_name)
+        if error_codes != None:
             error.add_context_stack(error_codes)
         
-        # import pdb; pdb.set_trace()
-        # add local_var info
-        local_var_info = "Note: if there is 'KeyError' in the error message, it may be due to the wrong usage of output data. The output data info may help you: \n[Output Data Info]\n"
-        for action_name in self.name_space.keys():
-            if action_name not in ['mainWorkflow', 'mainWorkflow_input_data', '__builtins__'] and 'input_data' not in action_name:
-                if self.name_space[action_name] and "node" in self.name_space[action_name].__dict__.keys():
-                    if self.name_space[action_name].node and "last_runtime_info" in self.name_space[action_name].node.__dict__.keys():
-                        if self.name_space[action_name].node.last_runtime_info and "output_data" in self.name_space[action_name].node.last_runtime_info.__dict__.keys():
-                            action_output_data = self.name_space[action_name].node.last_runtime_info.output_data
-                    # if action_output_data is not None and len(action_output_data[0].keys()) > 0:
-                            local_var_info += f"the output data of function `{action_name}` is: `{action_output_data}`\n"
-            
-        error.add_context_stack([local_var_info])
+        error.add_context_stack([get_output_data_info(self.name_space)])
         raise error
 
 
@@ -198,6 +521,59 @@ class n8nPythonCodeRunner():
         self.mock_interface = MockInput(
             
         )
+        self.trace = ExecutionTrace(enable=CONFIG.incremental_execution["enable"],
+                                    uncached_integrations=CONFIG.node_execution_cache["uncached_integrations"])
+        self.parallel = CONFIG.parallel_execution["enable"]
+        self.pool = ThreadPoolExecutor(max_workers=CONFIG.parallel_execution["max_workers"]) if self.parallel else None
+        self.code_sections = {} # name -> (node or workflow, param description lines, code lines), until `mark_dirty`
+
+    def close(self):
+        """
+        Shuts down the pool of the parallel node calls, once the calls in flight are done.
+        The runner can't run code in parallel mode afterwards.
+        """
+        if self.pool != None:
+            self.pool.shutdown(wait=True)
+
+    def mark_dirty(self, name: str):
+        """
+        Marks a node or workflow as changed, so that it and everything running after it is executed again in the next run,
+        and its code is printed again.
+
+        Parameters:
+            name (str): The name of the node or workflow.
+
+        Returns:
+            None
+        """
+        self.trace.mark_dirty(name)
+        self.code_sections.pop(name, None)
+
+    def get_code_section(self, name: str, item) -> (list, list):
+        """
+        Renders the parts of a node or workflow which only change with its code, cached until `mark_dirty(name)`.
+
+        Parameters:
+            name (str): The name of the node or workflow.
+            item (n8nPythonNode | n8nPythonWorkflow): The node or workflow.
+
+        Returns:
+            tuple[list, list]: The lines of the param descriptions (empty for a workflow), and the lines of the code.
+        """
+        section = self.code_sections.get(name)
+        if section == None or section[0] is not item:
+            description_lines = []
+            if isinstance(item, n8nPythonNode):
+                if len(item.params) > 0:
+                    description_lines = describe_parameters(item.params, max_depth=1)
+                else:
+                    description_lines.append("This function doesn't need params")
+                code_lines = item.print_self()
+            else:
+                code_lines = [item.print_self()]
+            section = (item, description_lines, code_lines)
+            self.code_sections[name] = section
+        return section[1], section[2]
 
     def flash(self, main_workflow: n8nPythonWorkflow,workflows: dict[str, n8nPythonWorkflow], nodes: [n8nPythonNode]):
         """
@@ -224,6 +600,7 @@ class n8nPythonCodeRunner():
         """
         1. Initialize the runtime information for all functions.
         2. Execute the current code and modify the information of all accessed nodes.
+           Node calls of the unchanged prefix of the last run are replayed from `self.trace`.
         """
 
         for workflow_name, workflow in self.workflows.items():
@@ -251,27 +628,68 @@ class n8nPythonCodeRunner():
         if trigger_input == None:
             pass
 
+        pending = []
+
         name_space = {}
         for node in self.nodes:
             
-            name_space[node.get_name()] = n8nNodeRunner(node=node, name_space={})
+            name_space[node.get_name()] = n8nNodeRunner(node=node, name_space={}, trace=self.trace, pool=self.pool, pending=pending)
         for workflow_name, workflow in self.workflows.items():
-            name_space[workflow_name] = n8nWorkflowRunner(workflow_name=workflow_name, workflow=workflow, name_space={})
+            name_space[workflow_name] = n8nWorkflowRunner(workflow_name=workflow_name, workflow=workflow, name_space={}, trace=self.trace)
         for key in name_space.keys():
             name_space[key].name_space = name_space
         
 
         self.error_stack_str = []
         self.std_output = ""
+        self.trace.start()
+        workflow_returned = False
         try:
             name_space["mainWorkflow"](trigger_input)
+            workflow_returned = True
+            self.join_pending(pending)
         except n8nRunningException as e:
+            if workflow_returned:
+                # a call whose output was never read failed after the workflows returned: fail them as in serial mode
+                failed_workflows = ["mainWorkflow"]
+                if getattr(e, "call_site", None) != None and e.call_site[0] in self.workflows.keys():
+                    failed_workflows.append(e.call_site[0])
+                for workflow_name in failed_workflows:
+                    self.workflows[workflow_name].last_runtime_info.runtime_status = RunTimeStatus.ErrorRaisedInner
+                e.add_context_stack([get_output_data_info(name_space)])
             for code_lines in reversed(e.code_stack):
                 self.error_stack_str.extend(code_lines)
                 self.error_stack_str.append("------------------------")
             self.error_stack_str.append(e.error_message)
+        finally:
+            # the pool is kept for the next run, which must not start before the calls of this one are done
+            wait([lazy_output.future for lazy_output in pending])
+            self.trace.finish()
         self.error_stack_str = "\n".join(self.error_stack_str)
 
+    def join_pending(self, pending: list):
+        """
+        Waits for the node calls dispatched in parallel mode whose output was never read,
+        so that their errors are reported the same way as in serial mode.
+
+        Parameters:
+            pending (list[LazyOutput]): The dispatched node calls, in call order.
+
+        Raises:
+            n8nRunningException: The error of the first failed node call, with the workflow line of the call.
+        """
+        wait([lazy_output.future for lazy_output in pending])
+        for lazy_output in pending:
+            try:
+                lazy_output.resolve()
+            except n8nRunningException as e:
+                if lazy_output.call_site != None and lazy_output.call_site[0] in self.workflows.keys():
+                    function_name, lineno = lazy_output.call_site
+                    error_codes = get_code_context(self.workflows[function_name].implement_code, lineno, function_name)
+                    if error_codes != None:
+                        e.add_context_stack(error_codes)
+                raise e
+
 
     def print_clean_code(self, indent = 0):
         '''
@@ -279,11 +697,11 @@ class n8nPythonCodeRunner():
         '''
         lines = []
         for node in self.nodes:
-            lines.extend(node.print_self())
+            lines.extend(self.get_code_section(node.get_name(), node)[1])
             lines.append("\n\n")
         
         for workflow_name, workflow in self.workflows.items():
-            lines.append(workflow.print_self())
+            lines.extend(self.get_code_section(workflow_name, workflow)[1])
             lines.append("\n\n")
 
         lines = [" "*indent + line for line in lines]
@@ -294,13 +712,9 @@ class n8nPythonCodeRunner():
         """
         lines = []
         for node in self.nodes:
+            description_lines, code_lines = self.get_code_section(node.get_name(), node)
             lines.append("\"\"\"Function param descriptions: ")
-            if len(node.params) > 0:
-                for k, (key, value) in enumerate(node.params.items()):
-                    param_des_lines = value.to_description(prefix_ids=f"{k}", indent=0, max_depth=1)
-                    lines.extend(param_des_lines)
-            else:
-                lines.append("This function doesn't need params")
+            lines.extend(description_lines)
             lines.append(node.last_runtime_info.to_str())
 
             # lines.append("Avaliable example inputs for this function")
@@ -308,7 +722,7 @@ class n8nPythonCodeRunner():
             # for k, data in enumerate(example_inout_pair):
             #     pass
             lines.append("\"\"\"")
-            lines.extend(node.print_self())
+            lines.extend(code_lines)
             lines.append("\n\n")
         
         
@@ -317,7 +731,7 @@ class n8nPythonCodeRunner():
             lines.append(workflow.last_runtime_info.to_str())
             lines.append("\"\"\"")
 
-            lines.append(workflow.print_self())
+            lines.extend(self.get_code_section(workflow_name, workflow)[1])
             lines.append("\n\n")
 
 
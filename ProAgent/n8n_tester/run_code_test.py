@@ -0,0 +1,247 @@
+import threading
+import unittest
+from unittest import mock
+
+from ProAgent.config import CONFIG
+from ProAgent.utils import NodeType, RunTimeStatus
+from ProAgent.n8n_parser.node import n8nPythonNode, n8nNodeMeta
+from ProAgent.n8n_parser.workflow import n8nPythonWorkflow
+from ProAgent.n8n_tester import run_node
+from ProAgent.n8n_tester.run_code import n8nPythonCodeRunner
+
+main_code = '''
+def mainWorkflow(trigger_input: [{...}]):
+  a = action_0(trigger_input)
+  b = action_1(a)
+  c = action_2(trigger_input)
+  return subworkflow_0(b)
+'''
+
+sub_code = '''
+def subworkflow_0(father_workflow_input: [{...}]):
+  return action_2(father_workflow_input)
+'''
+
+
+class RunCodeTestCase(unittest.TestCase):
+    """Runs workflows over action nodes whose execution is recorded instead of sent to n8n."""
+
+    def setUp(self) -> None:
+        self.calls = []
+        patcher = mock.patch.object(run_node, "run_node", side_effect=self.fake_run_node)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fake_run_node(self, node: n8nPythonNode, input_data: list = [{}]) -> (list, str):
+        self.calls.append(node.get_name())
+        return [{"json": {"from": node.get_name(), "input": len(input_data)}}], ""
+
+    def make_runner(self, main_code: str = main_code, sub_code: str = sub_code, action_count: int = 3) -> n8nPythonCodeRunner:
+        self.nodes = [n8nPythonNode(node_id=0, implemented=True, node_comments="trigger",
+                                    node_meta=n8nNodeMeta(node_type=NodeType.trigger, integration_name="manualTrigger", resource_name="default", operation_name="default"))]
+        for k in range(action_count):
+            self.nodes.append(n8nPythonNode(node_id=k, implemented=True, node_comments="action",
+                                            node_meta=n8nNodeMeta(node_type=NodeType.action, integration_name=f"integration{k}", resource_name="default", operation_name="default")))
+        self.main = n8nPythonWorkflow(implement_code=main_code)
+        self.sub = n8nPythonWorkflow(workflow_name="subworkflow_0", implement_code=sub_code)
+        runner = n8nPythonCodeRunner()
+        self.addCleanup(runner.close)
+        runner.flash(main_workflow=self.main, workflows={"subworkflow_0": self.sub}, nodes=self.nodes)
+        return runner
+
+    def run_calls(self, runner: n8nPythonCodeRunner) -> list:
+        """
+        Runs the code and returns the names of the nodes executed (not replayed) by the run.
+        """
+        self.calls = []
+        runner.run_code()
+        self.assertEqual(runner.error_stack_str, "")
+        return self.calls
+
+
+class IncrementalRunTest(RunCodeTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        patcher = mock.patch.dict(CONFIG.incremental_execution, {"enable": True})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_disabled(self):
+        with mock.patch.dict(CONFIG.incremental_execution, {"enable": False}):
+            runner = self.make_runner()
+        self.run_calls(runner)
+        self.assertEqual(self.run_calls(runner), ["action_0", "action_1", "action_2", "action_2"])
+
+    def test_uncached_integration(self):
+        """
+        The calls of the integrations with side effects are executed again, with everything after them.
+        """
+        with mock.patch.dict(CONFIG.node_execution_cache, {"uncached_integrations": ["integration1"]}):
+            runner = self.make_runner()
+        self.run_calls(runner)
+        self.assertEqual(self.run_calls(runner), ["action_1", "action_2", "action_2"])
+
+    def test_unchanged(self):
+        runner = self.make_runner()
+        self.assertEqual(self.run_calls(runner), ["action_0", "action_1", "action_2", "action_2"])
+        self.assertEqual(self.run_calls(runner), [])
+        # the replayed calls still fill the runtime info
+        self.assertEqual(self.nodes[2].last_runtime_info.runtime_status, RunTimeStatus.FunctionExecuteSuccess)
+        self.assertEqual(self.main.last_runtime_info.output_data, [{"json": {"from": "action_2", "input": 1}}])
+
+    def test_edit_node(self):
+        """
+        An edited node is executed again with everything after it, the calls before it are replayed.
+        """
+        runner = self.make_runner()
+        self.run_calls(runner)
+        runner.mark_dirty("action_1")
+        self.assertEqual(self.run_calls(runner), ["action_1", "action_2", "action_2"])
+        runner.mark_dirty("action_2")
+        self.assertEqual(self.run_calls(runner), ["action_2", "action_2"])
+
+    def test_edit_workflow(self):
+        """
+        Editing a workflow executes again the calls made from it, and everything after them.
+        """
+        runner = self.make_runner()
+        self.run_calls(runner)
+        self.sub.implement_code = sub_code.replace("father_workflow_input)", "father_workflow_input + father_workflow_input)")
+        runner.mark_dirty("subworkflow_0")
+        self.assertEqual(self.run_calls(runner), ["action_2"])
+        self.assertEqual(self.main.last_runtime_info.output_data, [{"json": {"from": "action_2", "input": 2}}])
+
+        self.main.implement_code = main_code.replace("c = action_2(trigger_input)", "c = action_2(a)")
+        runner.mark_dirty("mainWorkflow")
+        self.assertEqual(self.run_calls(runner), ["action_0", "action_1", "action_2", "action_2"])
+
+    def test_changed_input(self):
+        """
+        A call whose input differs from the last run is executed again, even if nothing is marked dirty.
+        """
+        runner = self.make_runner()
+        self.run_calls(runner)
+        with mock.patch.object(runner.mock_interface, "get_node_example_input", return_value=[{"json": {"changed": True}}, {}]):
+            self.assertEqual(self.run_calls(runner), ["action_0", "action_1", "action_2", "action_2"])
+
+
+class NodeRunnerTest(RunCodeTestCase):
+    def test_alternate_calls(self):
+        """
+        Nodes of the same type called alternately each run their own integration.
+        """
+        runner = self.make_runner(main_code='''
+def mainWorkflow(trigger_input: [{...}]):
+  outputs = []
+  for k in range(2):
+    outputs += action_0(trigger_input)
+    outputs += action_1(trigger_input)
+  return outputs
+''', action_count=2)
+        self.assertEqual(self.run_calls(runner), ["action_0", "action_1", "action_0", "action_1"])
+        self.assertEqual([item["json"]["from"] for item in self.main.last_runtime_info.output_data], ["action_0", "action_1", "action_0", "action_1"])
+
+
+class ParallelRunTest(RunCodeTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        patcher = mock.patch.dict(CONFIG.parallel_execution, {"enable": True, "max_workers": 4})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.failing_node = None
+        self.started = threading.Barrier(2, timeout=5)
+
+    def fake_run_node(self, node: n8nPythonNode, input_data: list = [{}]) -> (list, str):
+        if node.get_name() in ["action_0", "action_1"]:
+            # both independent calls must be running at the same time to pass the barrier
+            self.started.wait()
+        output_data, _ = super().fake_run_node(node, input_data)
+        if node.get_name() == self.failing_node:
+            return [], f"{node.get_name()} failed"
+        return output_data, ""
+
+    def test_concurrent_calls(self):
+        runner = self.make_runner(main_code='''
+def mainWorkflow(trigger_input: [{...}]):
+  a = action_0(trigger_input)
+  b = action_1(trigger_input)
+  return subworkflow_0(a + b)
+''')
+        self.assertEqual(sorted(self.run_calls(runner)), ["action_0", "action_1", "action_2"])
+        self.assertEqual(self.nodes[3].last_runtime_info.input_data, [{"json": {"from": "action_0", "input": 1}}, {"json": {"from": "action_1", "input": 1}}])
+        self.assertEqual(self.main.last_runtime_info.output_data, [{"json": {"from": "action_2", "input": 2}}])
+
+    def test_concatenation(self):
+        """
+        The outputs still pending are concatenated with all their items, whatever the operand order.
+        """
+        self.started = threading.Barrier(1)
+        runner = self.make_runner(main_code='''
+def mainWorkflow(trigger_input: [{...}]):
+  a, b, c, d = action_0(trigger_input), action_1(trigger_input), action_2(trigger_input), action_3(trigger_input)
+  items = a + b + c + d
+  items = [] + items + (c + []) + ([] + d)
+  merged = []
+  merged += a
+  merged.extend(b)
+  return [{"json": {"count": len(items), "merged": len(merged), "first": a[0]["json"]["from"], "sorted": sorted(item["json"]["from"] for item in items)}}]
+''', action_count=4)
+        self.run_calls(runner)
+        self.assertEqual(self.main.last_runtime_info.output_data, [{"json": {
+            "count": 6, "merged": 2, "first": "action_0",
+            "sorted": ["action_0", "action_1", "action_2", "action_2", "action_3", "action_3"],
+        }}])
+
+    def test_error(self):
+        """
+        A failed call is reported with the line of the call, even if its output is never read.
+        """
+        self.failing_node = "action_1"
+        runner = self.make_runner(main_code='''
+def mainWorkflow(trigger_input: [{...}]):
+  a = action_0(trigger_input)
+  action_1(trigger_input)
+  return a
+''')
+        runner.run_code()
+        self.assertIn("--> " + "  action_1(trigger_input)", runner.error_stack_str)
+        self.assertIn("action_1 failed", runner.error_stack_str)
+        self.assertEqual([call[0] for call in runner.trace.calls], ["action_0"])
+
+    def test_error_like_serial(self):
+        """
+        A failed call whose output is never read fails the workflow with the same status and context as in serial mode.
+        """
+        self.failing_node = "action_1"
+        self.started = threading.Barrier(1)
+        results = []
+        for enable in [False, True]:
+            with mock.patch.dict(CONFIG.parallel_execution, {"enable": enable}):
+                runner = self.make_runner(main_code='''
+def mainWorkflow(trigger_input: [{...}]):
+  a = action_0(trigger_input)
+  action_1(trigger_input)
+  return a
+''')
+            runner.run_code()
+            results.append((self.main.last_runtime_info.runtime_status, runner.error_stack_str))
+        self.assertEqual(results[1][0], RunTimeStatus.ErrorRaisedInner)
+        self.assertIn("[Output Data Info]", results[1][1])
+        self.assertEqual(results[1], results[0])
+
+    def test_pool_reused(self):
+        runner = self.make_runner()
+        pool = runner.pool
+        self.started = threading.Barrier(1)
+        self.run_calls(runner)
+        runner.mark_dirty("action_0")
+        self.run_calls(runner)
+        self.assertIs(runner.pool, pool)
+
+    def test_close(self):
+        runner = self.make_runner()
+        self.started = threading.Barrier(1)
+        self.run_calls(runner)
+        runner.close()
+        with self.assertRaises(RuntimeError):
+            runner.pool.submit(print)
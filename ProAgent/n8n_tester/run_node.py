@@ -1,5 +1,3 @@
-import subprocess
-import tempfile
 import json
 import traceback
 from typing import Optional
@@ -10,6 +8,8 @@ from termcolor import colored
 from ProAgent.n8n_tester.credential_loader import credentials
 from ProAgent.n8n_parser.node import n8nPythonNode, n8nNodeMeta
 from ProAgent.n8n_tester.pseudo_node.run_pseudo_node import run_pseudo_workflow
+from ProAgent.n8n_tester.executor import get_executor
+from ProAgent.n8n_tester.execution_cache import get_execution_cache
 from ProAgent.utils import NodeType
 from ProAgent.n8n_tester.prompts import success_prompt, error_prompt
 
@@ -55,15 +55,45 @@ class anonymous_class():
 
         Raises:
             n8nRunningException: If there is an error while running the function.
+
+        Note:
+            Successful outputs of nodes without side effects are memoized by the node execution cache,
+            so unchanged nodes are not sent to n8n again when the whole workflow is re-run.
         """
+        cache = get_execution_cache()
+        cache_key = None
+        if cache != None and cache.is_cacheable(self.node):
+            cache_key = cache.make_key(self.node, input_data,
+                                       credential=credentials.query(self.node.node_meta.integration_name),
+                                       type_version=get_type_version(self.node))
+            found, output_data = cache.get(cache_key)
+            if found:
+                print(colored(f"{self.node.get_name()}: reuse the cached execution result", color="green"))
+                return output_data
 
         output_data, error = run_node(node=self.node, input_data=input_data)
         if error != "":
             my_error = n8nRunningException(error)
             raise my_error
         else:
+            if cache_key != None:
+                cache.put(cache_key, output_data)
             return output_data
 
+def get_type_version(node: n8nPythonNode) -> Optional[int]:
+    """
+    Returns the typeVersion the node is executed with.
+
+    Args:
+        node (n8nPythonNode): The node.
+
+    Returns:
+        Optional[int]: The typeVersion, or None to let n8n use the default version of the node.
+    """
+    if node.node_meta.integration_name == 'googleSheets':
+        return 4
+    return None
+
 def _get_constant_workflow(input_data):
     """
     Generates a constant workflow based on the provided input data.
@@ -161,7 +191,6 @@ def run_node(node: n8nPythonNode, input_data: list[dict] = [{}]) -> tuple[str, s
     Returns:
         tuple[str, str]: A tuple containing two strings. The first string represents the status of the node execution (e.g., "success", "failure"), and the second string provides additional information or error messages related to the execution.
     """
-    # problem: execute parallelly
     constant_workflow = _get_constant_workflow(input_data=input_data)
 
     constant_workflow["id"] = credentials.get_workflow_id()
@@ -198,7 +227,7 @@ def run_node(node: n8nPythonNode, input_data: list[dict] = [{}]) -> tuple[str, s
         
     if node.node_meta.integration_name == 'googleSheets':
         node_var["parameters"]["operation"] = node.node_meta.operation_name
-        node_var["typeVersion"] = 4
+        node_var["typeVersion"] = get_type_version(node)
         node_var["parameters"]["columns"] = {
                     "mappingMode": "autoMapInputData",
                     "value": {},
@@ -219,15 +248,7 @@ def run_node(node: n8nPythonNode, input_data: list[dict] = [{}]) -> tuple[str, s
             print(e)
             raise e
     else:
-        temp_file = tempfile.NamedTemporaryFile(delete=False, mode="w", suffix=".json")
-        json.dump(constant_workflow, temp_file)
-        temp_file.close()
-        temp_file_path = temp_file.name
-        # import pdb; pdb.set_trace()
-        result = subprocess.run(["n8n", "execute", "--file", temp_file_path], stdout=subprocess.PIPE, stderr=subprocess.PIPE) 
-        # Get the standard output
-        output = result.stdout.decode('utf-8')
-        error = result.stderr.decode('utf-8')
+        output, error = get_executor().execute(constant_workflow)
 
     print(colored("###OUTPUT###", color="green"))
     print(colored(output, color="green"))
@@ -247,7 +268,7 @@ def run_node(node: n8nPythonNode, input_data: list[dict] = [{}]) -> tuple[str, s
     if success_prompt in output:
         output_data = output.split(success_prompt)[-1]
     else:
-        assert error_prompt in output_data
+        assert error_prompt in output
         outputs = output.split(error_prompt)
         assert len(outputs) == 2
         output_data = outputs[0]
@@ -0,0 +1,739 @@
+"""Storage backends of the session recordings written by `RunningRecoder`.
+
+- `DirectoryStorage`: one json file per llm call and two files per tool call, the layout of `apa_case`.
+  Also used as the export format of the other backends.
+- `JsonlStorage`: a single append-only `session.jsonl` file.
+- `SqliteStorage`: a single `session.sqlite` database in WAL mode.
+
+The two single-file backends buffer the writes, and write them in batches when `flush` is called,
+either explicitly or every `flush_interval` seconds by a background thread.
+
+`RecordWriter` moves all the writes of a storage to a writer thread, behind a bounded queue.
+"""
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import sqlite3
+import hashlib
+import argparse
+import threading
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+from ProAgent.loggers.logs import logger
+
+
+def get_blob_key(content) -> str:
+    """
+    Computes the content address of a json value.
+
+    Args:
+        content (any): A json compatible value, such as a message.
+
+    Returns:
+        str: The sha256 hex digest of the canonical json.
+    """
+    return hashlib.sha256(json.dumps(content, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def is_blob_ref(item) -> bool:
+    """
+    Checks if a recorded message is a reference {"role": ..., "blob": ...} instead of the message itself.
+    """
+    return type(item) == dict and set(item.keys()) == {"role", "blob"}
+
+
+class BlobStore():
+    """Content-addressed storage of json values under a directory, one `<sha256>.json` file per unique value.
+    Records hold the keys instead of the values, so values repeated across records (system prompts,
+    the earlier turns of a conversation, the function list) are only stored once.
+    """
+
+    def __init__(self, blob_dir: str, cache_size: int = 1024):
+        """
+        Parameters:
+            blob_dir (str): The directory of the blobs, created on the first write.
+            cache_size (int): The number of values kept in memory after being read. Defaults to 1024.
+        """
+        self.blob_dir = blob_dir
+        self.lock = threading.Lock()
+        self.known_keys = set(file_name[:-len(".json")] for file_name in os.listdir(blob_dir)) if os.path.isdir(blob_dir) else set()
+        self.get_blob = lru_cache(maxsize=cache_size)(self._get_blob)
+
+    def put_blob(self, content) -> str:
+        """
+        Stores a value, unless a value with the same content is already stored.
+
+        Args:
+            content (any): A json compatible value.
+
+        Returns:
+            str: The key of the value.
+        """
+        key = get_blob_key(content)
+        with self.lock:
+            if key not in self.known_keys:
+                os.makedirs(self.blob_dir, exist_ok=True)
+                with open(os.path.join(self.blob_dir, f"{key}.json"), "w", encoding="utf-8") as writer:
+                    json.dump(content, writer, ensure_ascii=False)
+                self.known_keys.add(key)
+        return key
+
+    def _get_blob(self, key: str):
+        with open(os.path.join(self.blob_dir, f"{key}.json"), "r", encoding="utf-8") as reader:
+            return json.load(reader)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.known_keys
+
+
+class RecordStorage(ABC):
+    """The interface of the storage backends. Written data may be buffered until `flush` is called."""
+
+    def __init__(self, record_dir: str, flush_interval: float = None):
+        """
+        Parameters:
+            record_dir (str): The record directory.
+            flush_interval (float): If provided, a background thread flushes the buffered writes every `flush_interval` seconds. Defaults to None.
+        """
+        self.record_dir = record_dir
+        self.lock = threading.RLock()
+        self.closed = False
+        self.flush_interval = flush_interval
+        self.stop_event = threading.Event()
+        self.flush_thread = None
+        if flush_interval != None:
+            self.flush_thread = threading.Thread(target=self._flush_periodically, name="record-flush", daemon=True)
+            self.flush_thread.start()
+            atexit.register(self.close)
+
+    def _flush_periodically(self):
+        while not self.stop_event.wait(self.flush_interval):
+            self.flush()
+
+    @abstractmethod
+    def put_blob(self, content) -> str:
+        pass
+
+    @abstractmethod
+    def get_blob(self, key: str):
+        pass
+
+    @abstractmethod
+    def append_llm_record(self, llm_pair: dict):
+        pass
+
+    @abstractmethod
+    def append_tool_call(self, tool_call_id: int, tool_call_log: dict, code: str):
+        pass
+
+    @abstractmethod
+    def put_meta(self, meta: dict):
+        pass
+
+    @abstractmethod
+    def load_llm_records(self) -> list:
+        pass
+
+    def count_llm_records(self) -> int:
+        """
+        Returns the number of llm records, without reading them if the backend allows it.
+        """
+        return len(self.load_llm_records())
+
+    def load_llm_record(self, position: int) -> dict:
+        """
+        Reads a single llm record, without reading the others if the backend allows it.
+
+        Args:
+            position (int): The position of the record, counted from 0.
+
+        Returns:
+            dict: The record.
+        """
+        return self.load_llm_records()[position]
+
+    @abstractmethod
+    def load_tool_calls(self) -> list:
+        """
+        Returns:
+            list[tuple[int, dict, str]]: (tool call id, tool call log, code) of the recorded tool calls, in order.
+        """
+        pass
+
+    @abstractmethod
+    def load_meta(self) -> dict:
+        pass
+
+    @abstractmethod
+    def load_blobs(self) -> dict:
+        """
+        Returns:
+            dict: All the blobs, by key.
+        """
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        """
+        Flushes the buffered writes and stops the flush thread. The storage can't be written afterwards.
+        """
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+        self.stop_event.set()
+        if self.flush_thread != None and self.flush_thread is not threading.current_thread():
+            self.flush_thread.join()
+        self.flush()
+
+
+class DirectoryStorage(RecordStorage):
+    """The directory layout: `LLM_inout_pair/NNNNN.json`, `tool_call_logs/NNNNN_tool.json` and `NNNNN_code.py`,
+    `blobs/<sha256>.json` and `meta.meta`. Every write goes to its own file at once.
+    """
+
+    def __init__(self, record_dir: str):
+        super().__init__(record_dir)
+        self.blob_store = BlobStore(os.path.join(record_dir, "blobs"))
+        self.llm_record_names = [] # file names of the llm records, listed by `count_llm_records`
+
+    def ensure_dirs(self):
+        for subdir_name in ["LLM_inout_pair","tool_call_logs"]:
+            os.makedirs(os.path.join(self.record_dir,subdir_name),exist_ok=True)
+
+    def put_blob(self, content) -> str:
+        return self.blob_store.put_blob(content)
+
+    def get_blob(self, key: str):
+        return self.blob_store.get_blob(key)
+
+    def append_llm_record(self, llm_pair: dict):
+        self.ensure_dirs()
+        with open(os.path.join(self.record_dir, "LLM_inout_pair", f"{llm_pair['llm_interface_id']:05d}.json"), "w", encoding="utf-8") as writer:
+            json.dump(llm_pair,writer,indent=2, ensure_ascii=False)
+
+    def append_tool_call(self, tool_call_id: int, tool_call_log: dict, code: str):
+        self.ensure_dirs()
+        with open(os.path.join(self.record_dir, "tool_call_logs", f"{tool_call_id:05d}_tool.json"), "w", encoding="utf-8") as writer:
+            json.dump(tool_call_log,writer,indent=2, ensure_ascii=False)
+        with open(os.path.join(self.record_dir, "tool_call_logs", f"{tool_call_id:05d}_code.py"), "w", encoding="utf-8") as writer:
+            writer.write(code)
+
+    def put_meta(self, meta: dict):
+        with open(os.path.join(self.record_dir, "meta.meta"), "w", encoding="utf-8") as writer:
+            json.dump(meta,writer,indent=2, ensure_ascii=False)
+
+    def _list_llm_records(self) -> list:
+        pair_dir = os.path.join(self.record_dir, "LLM_inout_pair")
+        if not os.path.isdir(pair_dir):
+            return []
+        return sorted(os.listdir(pair_dir))
+
+    def load_llm_records(self) -> list:
+        return [self._load_llm_record_file(file_name) for file_name in self._list_llm_records()]
+
+    def count_llm_records(self) -> int:
+        self.llm_record_names = self._list_llm_records()
+        return len(self.llm_record_names)
+
+    def load_llm_record(self, position: int) -> dict:
+        if position >= len(self.llm_record_names):
+            self.count_llm_records()
+        return self._load_llm_record_file(self.llm_record_names[position])
+
+    def _load_llm_record_file(self, file_name: str) -> dict:
+        with open(os.path.join(self.record_dir, "LLM_inout_pair", file_name), "r", encoding="utf-8") as reader:
+            return json.load(reader)
+
+    def load_tool_calls(self) -> list:
+        log_dir = os.path.join(self.record_dir, "tool_call_logs")
+        if not os.path.isdir(log_dir):
+            return []
+        tool_calls = []
+        for file_name in sorted(os.listdir(log_dir)):
+            if not file_name.endswith("_tool.json"):
+                continue
+            tool_call_id = int(file_name[:-len("_tool.json")])
+            with open(os.path.join(log_dir, file_name), "r", encoding="utf-8") as reader:
+                tool_call_log = json.load(reader)
+            code_path = os.path.join(log_dir, f"{tool_call_id:05d}_code.py")
+            code = ""
+            if os.path.exists(code_path):
+                with open(code_path, "r", encoding="utf-8") as reader:
+                    code = reader.read()
+            tool_calls.append((tool_call_id, tool_call_log, code))
+        return tool_calls
+
+    def load_meta(self) -> dict:
+        meta_path = os.path.join(self.record_dir, "meta.meta")
+        if not os.path.exists(meta_path):
+            return {}
+        with open(meta_path, "r", encoding="utf-8") as reader:
+            return json.load(reader)
+
+    def load_blobs(self) -> dict:
+        return {key: self.get_blob(key) for key in self.blob_store.known_keys}
+
+
+class JsonlStorage(RecordStorage):
+    """A single append-only `session.jsonl`. Each line is {"kind": "llm" | "tool" | "blob" | "meta", ...},
+    the last "meta" line wins. A line cut by a crash is ignored on load.
+    """
+    file_name = "session.jsonl"
+
+    def __init__(self, record_dir: str, flush_interval: float = None):
+        self.file_path = os.path.join(record_dir, self.file_name)
+        self.buffer = []
+        self.blobs = {}
+        self.known_keys = set()
+        self.loaded = False
+        self.llm_record_offsets = [] # byte offsets of the "llm" lines, listed by `count_llm_records`
+        super().__init__(record_dir, flush_interval=flush_interval)
+
+    def _append(self, line: dict):
+        # serialized at once, so that a value which isn't json fails its own write only
+        content = json.dumps(line, ensure_ascii=False) + "\n"
+        with self.lock:
+            self.buffer.append(content)
+
+    def put_blob(self, content) -> str:
+        key = get_blob_key(content)
+        with self.lock:
+            self._load()
+            if key not in self.known_keys:
+                self.buffer.append(json.dumps({"kind": "blob", "key": key, "content": content}, ensure_ascii=False) + "\n")
+                self.known_keys.add(key)
+                self.blobs[key] = content
+        return key
+
+    def get_blob(self, key: str):
+        with self.lock:
+            self._load()
+            return self.blobs[key]
+
+    def append_llm_record(self, llm_pair: dict):
+        self._append({"kind": "llm", "record": llm_pair})
+
+    def append_tool_call(self, tool_call_id: int, tool_call_log: dict, code: str):
+        self._append({"kind": "tool", "tool_call_id": tool_call_id, "tool_call_log": tool_call_log, "code": code})
+
+    def put_meta(self, meta: dict):
+        self._append({"kind": "meta", "meta": meta})
+
+    def flush(self):
+        """
+        Appends the buffered lines to the file with a single write.
+        """
+        with self.lock:
+            if len(self.buffer) == 0:
+                return
+            content = "".join(self.buffer)
+            self.buffer = []
+            os.makedirs(self.record_dir, exist_ok=True)
+            with open(self.file_path, "a", encoding="utf-8") as writer:
+                writer.write(content)
+                writer.flush()
+                os.fsync(writer.fileno())
+
+    def _read_lines(self):
+        self.flush()
+        if not os.path.exists(self.file_path):
+            return
+        with open(self.file_path, "r", encoding="utf-8") as reader:
+            for line in reader:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+    def _load(self):
+        # blobs of an existing file, so that they are neither written twice nor missing on read
+        if self.loaded:
+            return
+        self.loaded = True
+        for line in self._read_lines():
+            if line["kind"] == "blob":
+                self.blobs[line["key"]] = line["content"]
+                self.known_keys.add(line["key"])
+
+    def load_llm_records(self) -> list:
+        with self.lock:
+            return [line["record"] for line in self._read_lines() if line["kind"] == "llm"]
+
+    def count_llm_records(self) -> int:
+        """
+        Lists the offsets of the llm records by their prefix, the lines aren't parsed.
+        """
+        llm_line_prefix = json.dumps({"kind": "llm"})[:-1].encode("utf-8")
+        offsets = []
+        with self.lock:
+            self.flush()
+            if os.path.exists(self.file_path):
+                with open(self.file_path, "rb") as reader:
+                    offset = 0
+                    for line in reader:
+                        if line.startswith(llm_line_prefix) and line.endswith(b"\n"):
+                            offsets.append(offset)
+                        offset += len(line)
+            self.llm_record_offsets = offsets
+        return len(offsets)
+
+    def load_llm_record(self, position: int) -> dict:
+        if position >= len(self.llm_record_offsets):
+            self.count_llm_records()
+        with open(self.file_path, "rb") as reader:
+            reader.seek(self.llm_record_offsets[position])
+            return json.loads(reader.readline())["record"]
+
+    def load_tool_calls(self) -> list:
+        with self.lock:
+            return [(line["tool_call_id"], line["tool_call_log"], line["code"]) for line in self._read_lines() if line["kind"] == "tool"]
+
+    def load_meta(self) -> dict:
+        meta = {}
+        with self.lock:
+            for line in self._read_lines():
+                if line["kind"] == "meta":
+                    meta = line["meta"]
+        return meta
+
+    def load_blobs(self) -> dict:
+        with self.lock:
+            self._load()
+            return dict(self.blobs)
+
+
+class SqliteStorage(RecordStorage):
+    """A single `session.sqlite` database in WAL mode, the buffered writes of a flush are one transaction."""
+    file_name = "session.sqlite"
+
+    def __init__(self, record_dir: str, flush_interval: float = None):
+        os.makedirs(record_dir, exist_ok=True)
+        self.file_path = os.path.join(record_dir, self.file_name)
+        self.connection = sqlite3.connect(self.file_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS llm_records (position INTEGER PRIMARY KEY AUTOINCREMENT, record TEXT NOT NULL)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS tool_calls (tool_call_id INTEGER PRIMARY KEY, tool_call_log TEXT NOT NULL, code TEXT NOT NULL)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS blobs (key TEXT PRIMARY KEY, content TEXT NOT NULL)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS meta (id INTEGER PRIMARY KEY CHECK (id = 0), meta TEXT NOT NULL)")
+        self.connection.commit()
+        self.pending = [] # (sql, parameters)
+        self.known_keys = set(row[0] for row in self.connection.execute("SELECT key FROM blobs"))
+        super().__init__(record_dir, flush_interval=flush_interval)
+        self.cached_get_blob = lru_cache(maxsize=1024)(self._get_blob)
+
+    def _append(self, sql: str, parameters: tuple):
+        with self.lock:
+            self.pending.append((sql, parameters))
+
+    def put_blob(self, content) -> str:
+        key = get_blob_key(content)
+        with self.lock:
+            if key not in self.known_keys:
+                self.known_keys.add(key)
+                self.pending.append(("INSERT OR IGNORE INTO blobs (key, content) VALUES (?, ?)", (key, json.dumps(content, ensure_ascii=False))))
+        return key
+
+    def get_blob(self, key: str):
+        return self.cached_get_blob(key)
+
+    def _get_blob(self, key: str):
+        with self.lock:
+            self.flush()
+            row = self.connection.execute("SELECT content FROM blobs WHERE key = ?", (key,)).fetchone()
+        if row == None:
+            raise KeyError(key)
+        return json.loads(row[0])
+
+    def append_llm_record(self, llm_pair: dict):
+        self._append("INSERT INTO llm_records (record) VALUES (?)", (json.dumps(llm_pair, ensure_ascii=False),))
+
+    def append_tool_call(self, tool_call_id: int, tool_call_log: dict, code: str):
+        self._append("INSERT OR REPLACE INTO tool_calls (tool_call_id, tool_call_log, code) VALUES (?, ?, ?)", (tool_call_id, json.dumps(tool_call_log, ensure_ascii=False), code))
+
+    def put_meta(self, meta: dict):
+        self._append("INSERT OR REPLACE INTO meta (id, meta) VALUES (0, ?)", (json.dumps(meta, ensure_ascii=False),))
+
+    def flush(self):
+        """
+        Writes the buffered rows in one transaction.
+        """
+        with self.lock:
+            if len(self.pending) == 0:
+                return
+            pending, self.pending = self.pending, []
+            with self.connection:
+                for sql, parameters in pending:
+                    self.connection.execute(sql, parameters)
+
+    def _query(self, sql: str) -> list:
+        with self.lock:
+            self.flush()
+            return self.connection.execute(sql).fetchall()
+
+    def load_llm_records(self) -> list:
+        return [json.loads(row[0]) for row in self._query("SELECT record FROM llm_records ORDER BY position")]
+
+    def count_llm_records(self) -> int:
+        return self._query("SELECT COUNT(*) FROM llm_records")[0][0]
+
+    def load_llm_record(self, position: int) -> dict:
+        with self.lock:
+            self.flush()
+            row = self.connection.execute("SELECT record FROM llm_records ORDER BY position LIMIT 1 OFFSET ?", (position,)).fetchone()
+        if row == None:
+            raise IndexError(position)
+        return json.loads(row[0])
+
+    def load_tool_calls(self) -> list:
+        return [(row[0], json.loads(row[1]), row[2]) for row in self._query("SELECT tool_call_id, tool_call_log, code FROM tool_calls ORDER BY tool_call_id")]
+
+    def load_meta(self) -> dict:
+        rows = self._query("SELECT meta FROM meta")
+        return json.loads(rows[0][0]) if len(rows) > 0 else {}
+
+    def load_blobs(self) -> dict:
+        return {row[0]: json.loads(row[1]) for row in self._query("SELECT key, content FROM blobs")}
+
+    def close(self):
+        super().close()
+        self.connection.close()
+
+
+class RecordWriter():
+    """Applies the writes of a storage on a writer thread, so that the caller never waits on the disk,
+    unless `queue_size` writes are already waiting (then it blocks until there is room).
+
+    The writes are applied in order. The storage is flushed when the queue has been empty for
+    `flush_interval` seconds, and when `flush` or `close` is called. The writes left at exit are drained.
+    A failed write doesn't stop the writer thread, it is logged and raised by the next `flush` or `close`,
+    never by a write: the writes are made on the way of other work (e.g. an LLM request) which must not fail for it.
+    """
+
+    def __init__(self, storage: RecordStorage, queue_size: int = 1024, flush_interval: float = 1.0):
+        """
+        Parameters:
+            storage (RecordStorage): The storage to write, without its own flush thread.
+            queue_size (int): The number of writes waiting at most. Defaults to 1024.
+            flush_interval (float): The idle time before the storage is flushed, in seconds. Defaults to 1.0.
+        """
+        self.storage = storage
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stats_lock = threading.Lock()
+        self.write_count = 0
+        self.error_count = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.max_queue_depth = 0
+        self.write_error = None
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="record-writer", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def _submit(self, method_name: str, *args):
+        if self.closed:
+            raise RuntimeError("the record writer is closed")
+        self.queue.put((method_name, args, time.monotonic()))
+        with self.stats_lock:
+            self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+
+    def _run(self):
+        flushed_at = time.monotonic()
+        while True:
+            try:
+                method_name, args, submitted_at = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._apply("flush")
+                flushed_at = time.monotonic()
+                continue
+            if method_name == None:
+                self.queue.task_done()
+                return
+            self._apply(method_name, *args)
+            if method_name == "flush":
+                flushed_at = time.monotonic()
+            else:
+                with self.stats_lock:
+                    latency = time.monotonic() - submitted_at
+                    self.write_count += 1
+                    self.total_latency += latency
+                    self.max_latency = max(self.max_latency, latency)
+                # also flush from time to time under a steady stream of writes
+                if time.monotonic() - flushed_at >= self.flush_interval:
+                    self._apply("flush")
+                    flushed_at = time.monotonic()
+            self.queue.task_done()
+
+    def _apply(self, method_name: str, *args):
+        try:
+            getattr(self.storage, method_name)(*args)
+        except Exception as e:
+            # a failed write must not stop the writer, the caller gets it at its next flush or close
+            with self.stats_lock:
+                self.error_count += 1
+                if self.write_error == None:
+                    self.write_error = (method_name, e)
+            logger.error("record write failed", f"{method_name}: {e}")
+
+    def _raise_write_error(self):
+        """
+        Raises the first write failed since the last call, if any.
+
+        Raises:
+            RuntimeError: If a write failed, with the storage error as its cause.
+        """
+        with self.stats_lock:
+            write_error, self.write_error = self.write_error, None
+        if write_error != None:
+            method_name, e = write_error
+            raise RuntimeError(f"record write failed: {method_name}: {e}") from e
+
+    def put_blob(self, content) -> str:
+        """
+        Stores a value in the background.
+
+        Returns:
+            str: The key of the value, computed at once.
+        """
+        self._submit("put_blob", content)
+        return get_blob_key(content)
+
+    def append_llm_record(self, llm_pair: dict):
+        self._submit("append_llm_record", llm_pair)
+
+    def append_tool_call(self, tool_call_id: int, tool_call_log: dict, code: str):
+        self._submit("append_tool_call", tool_call_id, tool_call_log, code)
+
+    def put_meta(self, meta: dict):
+        self._submit("put_meta", meta)
+
+    def flush(self):
+        """
+        Waits until the writes submitted so far are applied, then flushes the storage.
+
+        Raises:
+            RuntimeError: If a write failed since the last call.
+        """
+        if not self.closed:
+            self.queue.put(("flush", (), time.monotonic()))
+        self.queue.join()
+        self._raise_write_error()
+
+    def close(self):
+        """
+        Drains the queue, then closes the storage. Writes are rejected afterwards.
+
+        Raises:
+            RuntimeError: If a write failed since the last call, once the storage is closed.
+        """
+        if self.closed:
+            return
+        self.queue.put(("flush", (), time.monotonic()))
+        self.closed = True
+        self.queue.put((None, (), time.monotonic()))
+        self.thread.join()
+        self.storage.close()
+        self._raise_write_error()
+
+    def get_stats(self) -> dict:
+        """
+        Returns the monitoring figures of the writer.
+
+        Returns:
+            dict: queue_depth and max_queue_depth (writes waiting), writes and errors (applied writes),
+                mean_latency and max_latency (seconds from submission to the end of the write).
+        """
+        with self.stats_lock:
+            return {
+                "queue_depth": self.queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "writes": self.write_count,
+                "errors": self.error_count,
+                "mean_latency": self.total_latency / self.write_count if self.write_count > 0 else 0.0,
+                "max_latency": self.max_latency,
+            }
+
+
+storage_backends = {
+    "directory": DirectoryStorage,
+    "jsonl": JsonlStorage,
+    "sqlite": SqliteStorage,
+}
+
+def create_record_storage(record_dir: str, backend: str, flush_interval: float = None) -> RecordStorage:
+    """
+    Creates the storage of a new recording.
+
+    Args:
+        record_dir (str): The record directory.
+        backend (str): "directory", "jsonl" or "sqlite".
+        flush_interval (float, optional): The period of the background flush of the single-file backends.
+
+    Returns:
+        RecordStorage: The storage.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    if backend not in storage_backends.keys():
+        raise ValueError(f"unknown record storage backend {backend}")
+    if backend == "directory":
+        return DirectoryStorage(record_dir)
+    return storage_backends[backend](record_dir, flush_interval=flush_interval)
+
+def open_record_storage(record_dir: str) -> RecordStorage:
+    """
+    Opens an existing recording, detecting its backend from the files in the directory.
+
+    Args:
+        record_dir (str): The record directory.
+
+    Returns:
+        RecordStorage: The storage.
+    """
+    if os.path.exists(os.path.join(record_dir, SqliteStorage.file_name)):
+        return SqliteStorage(record_dir)
+    if os.path.exists(os.path.join(record_dir, JsonlStorage.file_name)):
+        return JsonlStorage(record_dir)
+    return DirectoryStorage(record_dir)
+
+def export_record_storage(source: RecordStorage, target: RecordStorage):
+    """
+    Copies a whole recording from a storage to another, for example to the directory layout.
+
+    Args:
+        source (RecordStorage): The storage to read.
+        target (RecordStorage): The storage to write.
+
+    Returns:
+        None
+    """
+    for content in source.load_blobs().values():
+        target.put_blob(content)
+    for llm_pair in source.load_llm_records():
+        target.append_llm_record(llm_pair)
+    for tool_call_id, tool_call_log, code in source.load_tool_calls():
+        target.append_tool_call(tool_call_id, tool_call_log, code)
+    meta = source.load_meta()
+    if len(meta) > 0:
+        target.put_meta(meta)
+    target.flush()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copy a recording into another storage backend, by default the directory layout.")
+    parser.add_argument("source_dir", help="the record directory to read")
+    parser.add_argument("target_dir", help="the record directory to write")
+    parser.add_argument("--backend", default="directory", choices=list(storage_backends.keys()))
+    args = parser.parse_args()
+    target = create_record_storage(args.target_dir, args.backend)
+    export_record_storage(open_record_storage(args.source_dir), target)
+    target.close()
@@ -0,0 +1,199 @@
+import os
+import time
+import shutil
+import logging
+import tempfile
+import unittest
+from unittest import mock
+
+from ProAgent.loggers.logs import logger
+from ProAgent.record_storage import RecordStorage, get_blob_key, DirectoryStorage, JsonlStorage, SqliteStorage, RecordWriter, create_record_storage, open_record_storage, export_record_storage
+
+
+class RecordStorageTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.base_dir = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.base_dir)
+
+    def write_session(self, storage):
+        key = storage.put_blob({"role": "user", "content": "hello"})
+        self.assertEqual(storage.put_blob({"content": "hello", "role": "user"}), key)
+        for k in range(3):
+            storage.append_llm_record({"input": {"messages": [{"role": "user", "blob": key}]}, "output": f"answer {k}", "llm_interface_id": k})
+            storage.append_tool_call(k, {"action": k}, f"print({k})")
+            storage.put_meta({"tool_call_id": k + 1, "llm_inference_id": k + 1})
+        return key
+
+    def check_session(self, storage, key):
+        self.assertEqual([llm_pair["output"] for llm_pair in storage.load_llm_records()], ["answer 0", "answer 1", "answer 2"])
+        self.assertEqual(storage.load_tool_calls()[2], (2, {"action": 2}, "print(2)"))
+        self.assertEqual(storage.load_meta(), {"tool_call_id": 3, "llm_inference_id": 3})
+        self.assertEqual(storage.get_blob(key), {"role": "user", "content": "hello"})
+        self.assertEqual(len(storage.load_blobs()), 1)
+
+    def test_round_trip(self):
+        """
+        Each backend reads back what it wrote, also after being reopened from the directory.
+        """
+        for backend in ["directory", "jsonl", "sqlite"]:
+            record_dir = os.path.join(self.base_dir, backend)
+            storage = create_record_storage(record_dir, backend)
+            key = self.write_session(storage)
+            self.check_session(storage, key)
+            storage.close()
+            reopened = open_record_storage(record_dir)
+            self.assertEqual(type(reopened), type(storage))
+            self.check_session(reopened, key)
+            reopened.close()
+
+    def test_abstract_storage(self):
+        class IncompleteStorage(RecordStorage):
+            def put_blob(self, content) -> str:
+                return get_blob_key(content)
+
+        with self.assertRaises(TypeError):
+            IncompleteStorage(self.base_dir)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            create_record_storage(os.path.join(self.base_dir, "unknown"), "unknown")
+
+    def test_batched_writes(self):
+        """
+        Nothing reaches the file before a flush, then everything in one append.
+        """
+        record_dir = os.path.join(self.base_dir, "jsonl")
+        storage = JsonlStorage(record_dir)
+        self.write_session(storage)
+        self.assertFalse(os.path.exists(storage.file_path))
+        storage.flush()
+        with open(storage.file_path, "r", encoding="utf-8") as reader:
+            self.assertEqual(len(reader.readlines()), 10)
+        storage.close()
+
+    def test_background_flush(self):
+        storage = SqliteStorage(os.path.join(self.base_dir, "sqlite"), flush_interval=0.05)
+        storage.append_llm_record({"output": "answer", "llm_interface_id": 0})
+        storage.stop_event.wait(0.3)
+        self.assertEqual(len(storage.pending), 0)
+        storage.close()
+
+    def test_truncated_line(self):
+        """
+        A line cut by a crash is skipped, the earlier records are kept.
+        """
+        storage = JsonlStorage(os.path.join(self.base_dir, "jsonl"))
+        key = self.write_session(storage)
+        storage.close()
+        with open(storage.file_path, "a", encoding="utf-8") as writer:
+            writer.write('{"kind": "llm", "record": {"outp')
+        self.check_session(JsonlStorage(storage.record_dir), key)
+
+    def test_export(self):
+        source = SqliteStorage(os.path.join(self.base_dir, "sqlite"))
+        key = self.write_session(source)
+        target_dir = os.path.join(self.base_dir, "exported")
+        target = DirectoryStorage(target_dir)
+        export_record_storage(source, target)
+        source.close()
+        self.assertEqual(sorted(os.listdir(target_dir)), ["LLM_inout_pair", "blobs", "meta.meta", "tool_call_logs"])
+        self.assertEqual(sorted(os.listdir(os.path.join(target_dir, "tool_call_logs")))[:2], ["00000_code.py", "00000_tool.json"])
+        self.check_session(open_record_storage(target_dir), key)
+
+
+class SlowStorage(JsonlStorage):
+    def append_llm_record(self, llm_pair: dict):
+        time.sleep(0.05)
+        super().append_llm_record(llm_pair)
+
+
+class RecordWriterTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.base_dir = tempfile.mkdtemp()
+        # the failed writes are logged to a temporary file instead of ProAgent/logs
+        self.log_handler = logging.FileHandler(os.path.join(tempfile.mkdtemp(dir=self.base_dir), "error.log"), delay=True)
+        patcher = mock.patch.object(logger.logger, "handlers", [self.log_handler])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self) -> None:
+        self.log_handler.close()
+        shutil.rmtree(self.base_dir)
+
+    def read_log(self) -> str:
+        self.log_handler.flush()
+        if not os.path.exists(self.log_handler.baseFilename):
+            return ""
+        with open(self.log_handler.baseFilename, "r", encoding="utf-8") as reader:
+            return reader.read()
+
+    def test_writes_off_the_caller_thread(self):
+        """
+        The caller returns before the slow writes are done, and close drains them in order.
+        """
+        storage = SlowStorage(self.base_dir)
+        writer = RecordWriter(storage, queue_size=16, flush_interval=10)
+        start = time.monotonic()
+        for k in range(5):
+            writer.append_llm_record({"output": f"answer {k}", "llm_interface_id": k})
+        self.assertLess(time.monotonic() - start, 0.05)
+        self.assertGreater(writer.get_stats()["max_queue_depth"], 0)
+
+        writer.close()
+        stats = writer.get_stats()
+        self.assertEqual((stats["queue_depth"], stats["writes"], stats["errors"]), (0, 5, 0))
+        self.assertGreaterEqual(stats["max_latency"], 0.05)
+        self.assertEqual([llm_pair["llm_interface_id"] for llm_pair in JsonlStorage(self.base_dir).load_llm_records()], list(range(5)))
+        with self.assertRaises(RuntimeError):
+            writer.put_meta({})
+
+    def test_flush(self):
+        writer = RecordWriter(JsonlStorage(self.base_dir), flush_interval=10)
+        key = writer.put_blob({"role": "user", "content": "hello"})
+        writer.flush()
+        self.assertEqual(JsonlStorage(self.base_dir).get_blob(key), {"role": "user", "content": "hello"})
+        writer.close()
+
+    def test_failed_write(self):
+        """
+        A failed write is raised by the next flush, and the following writes still go through.
+        """
+        writer = RecordWriter(JsonlStorage(self.base_dir), flush_interval=10)
+        writer.append_tool_call(0, {"action": object()}, "")
+        with self.assertRaises(RuntimeError) as context:
+            writer.flush()
+        self.assertIsInstance(context.exception.__cause__, TypeError)
+        self.assertIn("append_tool_call", str(context.exception))
+        writer.put_meta({"tool_call_id": 1})
+        writer.close()
+        self.assertEqual(writer.get_stats()["errors"], 1)
+        self.assertEqual(JsonlStorage(self.base_dir).load_meta(), {"tool_call_id": 1})
+        self.assertIn("append_tool_call: Object of type object is not JSON serializable", self.read_log())
+
+    def test_failed_write_not_raised_by_next_write(self):
+        """
+        The writes never raise a failed write, it is kept for the next flush.
+        """
+        writer = RecordWriter(JsonlStorage(self.base_dir), flush_interval=10)
+        writer.append_tool_call(0, {"action": object()}, "")
+        writer.queue.join()
+        writer.put_meta({"tool_call_id": 1})
+        with self.assertRaises(RuntimeError):
+            writer.flush()
+        # the error is raised once
+        writer.put_meta({"tool_call_id": 2})
+        writer.close()
+        self.assertEqual(JsonlStorage(self.base_dir).load_meta(), {"tool_call_id": 2})
+
+    def test_failed_write_raised_by_close(self):
+        writer = RecordWriter(JsonlStorage(self.base_dir), flush_interval=10)
+        writer.put_meta({"tool_call_id": 1})
+        writer.append_tool_call(0, {"action": object()}, "")
+        with self.assertRaises(RuntimeError):
+            writer.close()
+        self.assertTrue(writer.closed)
+        self.assertEqual(JsonlStorage(self.base_dir).load_meta(), {"tool_call_id": 1})
+        # closing again is a no-op
+        writer.close()
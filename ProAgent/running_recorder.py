@@ -1,12 +1,20 @@
 
 import os
+import sys
+import argparse
+import threading
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
 
 import time
 import json
+import hashlib
+from copy import deepcopy
 from colorama import Fore
 from termcolor import colored
 
 from ProAgent.config import CONFIG
+from ProAgent.record_storage import BlobStore, RecordStorage, RecordWriter, get_blob_key, is_blob_ref, create_record_storage, open_record_storage
 
 from ProAgent.router.utils import ENVIRONMENT
 from ProAgent.utils import Action
@@ -33,19 +41,185 @@ def dump_common_things(object):
     if callable(method):
         return method()
 
+# version 2: base_kwargs only hold the completion kwargs, the messages and functions are stored once beside them
+# version 3: the messages and functions are references to the blob store of the record directory
+LLM_RECORD_FORMAT_VERSION = 3
+request_input_keys = ["messages", "functions", "function_call", "stop"]
+
+def compact_llm_record(llm_pair: dict) -> dict:
+    """
+    Converts a record to the current format, in place. Legacy records stored the whole request
+    (messages included) again under base_kwargs, since the shared default kwargs used to be mutated.
+
+    Args:
+        llm_pair (dict): A record of `LLM_inout_pair`.
+
+    Returns:
+        dict: The same record.
+    """
+    if llm_pair.get("format_version", 1) >= 2:
+        return llm_pair
+    record_input = llm_pair["input"]
+    if isinstance(record_input.get("base_kwargs"), dict):
+        duplicated_keys = set(request_input_keys)
+        if isinstance(record_input.get("other_args"), dict):
+            duplicated_keys.update(record_input["other_args"].keys())
+        record_input["base_kwargs"] = {key: value for key, value in record_input["base_kwargs"].items() if key not in duplicated_keys}
+    llm_pair["format_version"] = 2
+    return llm_pair
+
+def store_llm_record_blobs(llm_pair: dict, blob_store) -> dict:
+    """
+    Moves the messages and functions of a version 2 record into the blob store, in place.
+
+    Args:
+        llm_pair (dict): A record of `LLM_inout_pair`.
+        blob_store (BlobStore | RecordStorage): The blob store of the record.
+
+    Returns:
+        dict: The same record.
+    """
+    if llm_pair.get("format_version", 1) >= 3:
+        return llm_pair
+    record_input = compact_llm_record(llm_pair)["input"]
+    record_input["messages"] = [{"role": message["role"], "blob": blob_store.put_blob(message)} for message in record_input["messages"]]
+    if record_input.get("functions") != None:
+        record_input["functions"] = {"role": "functions", "blob": blob_store.put_blob(record_input["functions"])}
+    llm_pair["format_version"] = 3
+    return llm_pair
+
+def load_llm_record_blobs(llm_pair: dict, blob_store) -> dict:
+    """
+    Rebuilds the input of a record with the full messages and functions.
+
+    Args:
+        llm_pair (dict): A record of `LLM_inout_pair`, in any format.
+        blob_store (BlobStore | RecordStorage): The blob store of the record.
+
+    Returns:
+        dict: A copy of the input of the record.
+    """
+    record_input = dict(compact_llm_record(llm_pair)["input"])
+    record_input["messages"] = [deepcopy(blob_store.get_blob(item["blob"])) if is_blob_ref(item) else item for item in record_input["messages"]]
+    if is_blob_ref(record_input.get("functions")):
+        record_input["functions"] = deepcopy(blob_store.get_blob(record_input["functions"]["blob"]))
+    return record_input
+
+def migrate_record_dir(record_dir: str) -> (int, int):
+    """
+    Rewrites the legacy llm records of a record directory in the current format.
+
+    Args:
+        record_dir (str): The record directory, containing `LLM_inout_pair`.
+
+    Returns:
+        tuple[int, int]: The total size of the records before and after the migration, in bytes.
+    """
+    pair_dir = os.path.join(record_dir, "LLM_inout_pair")
+    blob_store = BlobStore(os.path.join(record_dir, "blobs"))
+    blob_size_before = sum(os.path.getsize(os.path.join(blob_store.blob_dir, f"{key}.json")) for key in blob_store.known_keys)
+    size_before, size_after = blob_size_before, 0
+    for file_name in sorted(os.listdir(pair_dir)):
+        file_path = os.path.join(pair_dir, file_name)
+        size_before += os.path.getsize(file_path)
+        with open(file_path, "r", encoding="utf-8") as reader:
+            llm_pair = json.load(reader)
+        if llm_pair.get("format_version", 1) < LLM_RECORD_FORMAT_VERSION:
+            with open(file_path, "w", encoding="utf-8") as writer:
+                json.dump(store_llm_record_blobs(llm_pair, blob_store), writer, indent=2, ensure_ascii=False)
+        size_after += os.path.getsize(file_path)
+    size_after += sum(os.path.getsize(os.path.join(blob_store.blob_dir, f"{key}.json")) for key in blob_store.known_keys)
+    return size_before, size_after
+
+def get_user_messages_key(messages: list) -> str:
+    """
+    Computes a canonical hash of the user messages, which identify a llm call in `ENVIRONMENT.Refine` mode.
+
+    The key only depends on the blob keys of the messages, so it's computed without reading the blobs of a recorded call.
+
+    Args:
+        messages (list): The messages of a llm call (already processed by `dump_common_things`), or their blob references.
+
+    Returns:
+        str: The hex digest.
+    """
+    blob_keys = [item["blob"] if is_blob_ref(item) else get_blob_key(item) for item in messages if item['role'] == 'user']
+    content = json.dumps(blob_keys)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+class LLMRecordReader(Sequence):
+    """The llm records of a storage, read on demand instead of all at startup.
+
+    Records are converted to the current format when read. Replays read the records in order, so reading a
+    record also reads the next `prefetch_window` ones in the background. Only the records around the last
+    read are kept in memory.
+    """
+
+    def __init__(self, storage: RecordStorage, prefetch_window: int = 8):
+        """
+        Parameters:
+            storage (RecordStorage): The storage of the record.
+            prefetch_window (int): The number of records read ahead, 0 to disable. Defaults to 8.
+        """
+        self.storage = storage
+        self.prefetch_window = prefetch_window
+        self.length = storage.count_llm_records()
+        self.lock = threading.Lock()
+        self.records = {} # position -> future of the record
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="record-prefetch") if prefetch_window > 0 else None
+
+    def __len__(self) -> int:
+        return self.length
+
+    def _load(self, position: int) -> dict:
+        return compact_llm_record(self.storage.load_llm_record(position))
+
+    def __getitem__(self, position: int) -> dict:
+        if isinstance(position, slice):
+            return [self[k] for k in range(*position.indices(self.length))]
+        if position < 0:
+            position += self.length
+        if not 0 <= position < self.length:
+            raise IndexError(position)
+        if self.executor == None:
+            return self._load(position)
+
+        with self.lock:
+            # keep the window around the position only
+            for cached_position in [cached_position for cached_position in self.records.keys()
+                                    if not position - self.prefetch_window <= cached_position <= position + self.prefetch_window]:
+                self.records.pop(cached_position)
+            for next_position in range(position, min(self.length, position + self.prefetch_window + 1)):
+                if next_position not in self.records.keys():
+                    self.records[next_position] = self.executor.submit(self._load, next_position)
+            future = self.records[position]
+        return future.result()
+
+    def __iter__(self):
+        for position in range(self.length):
+            yield self[position]
+
+    def close(self):
+        if self.executor != None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
 class RunningRecoder():
-    def __init__(self, record_base_dir = "./records"):
+    def __init__(self, record_base_dir = "./records", storage_backend = None):
         """
         Initializes the object with the given record base directory.
 
         Parameters:
             record_base_dir (str): The base directory for the records. Defaults to "./records".
+            storage_backend (str): "directory", "jsonl" or "sqlite". Defaults to `CONFIG.record_storage["backend"]`.
 
         Returns:
             None
         """
 
-        self.llm_record_cache = [] # Get cached records
+        self.llm_record_cache = [] # Get cached records, a `LLMRecordReader` once loaded
+        self.llm_record_index = {} # user messages key -> positions in llm_record_cache, of the records indexed so far
+        self.llm_record_indexed = 0 # the records before this position are in llm_record_index
 
         self.llm_interface_id = 0
         self.llm_server_cache = [] # Runtime records
@@ -62,17 +236,21 @@ class RunningRecoder():
 
         print(colored(f"Recorder Mode: {CONFIG.environment.name}", color='yellow'))
 
-        for subdir_name in ["LLM_inout_pair","tool_call_logs"]:
-            os.makedirs(os.path.join(self.record_root_dir,subdir_name),exist_ok=True)
+        # the writes go through a writer thread, the flushes of the storage are done by that thread
+        storage_cfg = CONFIG.record_storage
+        self.storage = RecordWriter(create_record_storage(self.record_root_dir, backend=storage_backend or storage_cfg["backend"]),
+                                    queue_size=storage_cfg["queue_size"],
+                                    flush_interval=storage_cfg["flush_interval"])
+        self.loaded_storage: RecordStorage = None # the storage of the record given to `load_from_disk`
             
 
     def save_meta(self):
         """
         Saves the meta information of the record.
 
-        This function writes the meta information of the record to a file in the
-        record root directory. The meta information includes the tool call ID and
-        the LLM inference ID.
+        This function writes the meta information of the record to the record
+        storage. The meta information includes the tool call ID and the LLM
+        inference ID.
 
         Parameters:
             None
@@ -80,12 +258,10 @@ class RunningRecoder():
         Returns:
             None
         """
-        with open(os.path.join(self.record_root_dir, "meta.meta"), "w", encoding="utf-8") as writer:
-            tool_call_log = {
-                "tool_call_id": self.tool_call_id,
-                "llm_inference_id": self.llm_interface_id,
-            }
-            json.dump(tool_call_log,writer,indent=2, ensure_ascii=False)
+        self.storage.put_meta({
+            "tool_call_id": self.tool_call_id,
+            "llm_inference_id": self.llm_interface_id,
+        })
 
     def load_from_disk(self, record_dir: str, cfg):
         """
@@ -104,19 +280,46 @@ class RunningRecoder():
             record_dir,
         )
         self.newly_start = False
-        for dir_name in os.listdir(record_dir):
-            if dir_name == "LLM_inout_pair":
-                inout_pair_list = os.listdir(os.path.join(record_dir,dir_name))
-                inout_pair_list.sort()
-                for file_name in inout_pair_list:
-                    with open(os.path.join(record_dir,dir_name,file_name), "r", encoding="utf-8") as reader:
-                        llm_pair = json.load(reader)
-                        self.llm_record_cache.append(llm_pair)
-            elif dir_name == "meta.meta":
-                with open(os.path.join(record_dir, "meta.meta"), "r", encoding="utf-8") as reader:
-                    tool_call_log = json.load(reader)
+        self.loaded_storage = open_record_storage(record_dir)
+        self.llm_record_cache = LLMRecordReader(self.loaded_storage, prefetch_window=CONFIG.record_storage["prefetch_window"])
+        self.llm_record_index = {}
+        self.llm_record_indexed = 0
         
     
+    def find_llm_records(self, key: str):
+        """
+        Yields the positions of the loaded records whose user messages have the given key, in order.
+
+        The records are indexed as they are read: the positions already indexed are yielded first,
+        then the next records are read one by one, only as far as the caller iterates.
+
+        Args:
+            key (str): The key of the user messages, see `get_user_messages_key`.
+
+        Yields:
+            int: The positions in `llm_record_cache`.
+        """
+        yield from list(self.llm_record_index.get(key, []))
+        while self.llm_record_indexed < len(self.llm_record_cache):
+            position = self.llm_record_indexed
+            record_key = get_user_messages_key(self.llm_record_cache[position]["input"]["messages"])
+            self.llm_record_index.setdefault(record_key, []).append(position)
+            self.llm_record_indexed += 1
+            if record_key == key:
+                yield position
+
+    def get_llm_record_input(self, position: int) -> dict:
+        """
+        Rebuilds the full input (messages and functions included) of a loaded record from the blob store.
+
+        Args:
+            position (int): The position of the record in `llm_record_cache`.
+
+        Returns:
+            dict: The input of the record.
+        """
+        return load_llm_record_blobs(self.llm_record_cache[position], self.loaded_storage)
+
     def regist_llm_inout(self, base_kwargs, messages, functions, function_call, stop, other_args, output_data, uuid=""):
         """
         Registers the LLM input and output data for the specified function call. 
@@ -136,23 +339,27 @@ class RunningRecoder():
 
         Raises:
             None
+
+        Note:
+            Each message and the function list are stored once in the blob store, the record only holds their keys.
         """
-        with open(os.path.join(self.record_root_dir, "LLM_inout_pair", f"{self.llm_interface_id:05d}.json"), "w", encoding="utf-8") as writer:
-            llm_inout_record = {
-                "input": {
-                    "base_kwargs": dump_common_things(base_kwargs),
-                    "messages":dump_common_things(messages),
-                    "functions":dump_common_things(functions),
-                    "function_call":dump_common_things(function_call),
-                    "stop":dump_common_things(stop),
-                    "other_args":dump_common_things(other_args),
-                    # 'uuid': dump_common_things(uuid)
-                },
-                "output": dump_common_things(output_data),
-                "llm_interface_id": self.llm_interface_id,
-            }
-            json.dump(llm_inout_record,writer,indent=2, ensure_ascii=False)
-            self.llm_server_cache.append(llm_inout_record)
+        functions = dump_common_things(functions)
+        llm_inout_record = {
+            "input": {
+                "base_kwargs": dump_common_things(base_kwargs),
+                "messages": [{"role": message["role"], "blob": self.storage.put_blob(message)} for message in dump_common_things(messages)],
+                "functions": {"role": "functions", "blob": self.storage.put_blob(functions)} if functions != None else None,
+                "function_call":dump_common_things(function_call),
+                "stop":dump_common_things(stop),
+                "other_args":dump_common_things(other_args),
+                # 'uuid': dump_common_things(uuid)
+            },
+            "output": dump_common_things(output_data),
+            "llm_interface_id": self.llm_interface_id,
+            "format_version": LLM_RECORD_FORMAT_VERSION,
+        }
+        self.storage.append_llm_record(llm_inout_record)
+        self.llm_server_cache.append(llm_inout_record)
 
         self.llm_interface_id += 1
         self.save_meta()
@@ -181,27 +388,18 @@ class RunningRecoder():
             self.is_cached = False
             return None
         elif CONFIG.environment == ENVIRONMENT.Refine:
-            input_data = {
-                "base_kwargs": dump_common_things(base_kwargs),
-                "messages":dump_common_things(messages),
-                "functions":dump_common_things(functions),
-                "function_call":dump_common_things(function_call),
-                "stop":dump_common_things(stop),
-                "other_args":dump_common_things(other_args),
-            }
-            for cache in self.llm_record_cache:
-                # compare user messages only
-                input_data_user_messages = [item for item in input_data['messages'] if item['role'] == 'user']
-                cache_data_user_messages = [item for item in cache["input"]['messages'] if item['role'] == 'user']
-                if input_data_user_messages == cache_data_user_messages:
-                    if restrict_cache_query and self.llm_interface_id != cache["llm_interface_id"]:
-                        continue
-                    logger.typewriter_log(
-                        f"get a llm_server response from Record {cache['llm_interface_id']}",
-                        Fore.RED,
-                    )
-                    self.is_cached = True
-                    return cache["output"]
+            # compare user messages only, by the hash of their contents
+            input_data_user_messages = [item for item in dump_common_things(messages) if item['role'] == 'user']
+            for position in self.find_llm_records(get_user_messages_key(input_data_user_messages)):
+                cache = self.llm_record_cache[position]
+                if restrict_cache_query and self.llm_interface_id != cache["llm_interface_id"]:
+                    continue
+                logger.typewriter_log(
+                    f"get a llm_server response from Record {cache['llm_interface_id']}",
+                    Fore.RED,
+                )
+                self.is_cached = True
+                return cache["output"]
             self.is_cached = False
             return None
         elif CONFIG.environment == ENVIRONMENT.Production:
@@ -222,7 +420,7 @@ class RunningRecoder():
 
     def regist_tool_call(self, action: Action, now_code: str):
         """
-        Registers a tool call by saving the action and code to files.
+        Registers a tool call by saving the action and code to the record storage.
 
         Args:
             action (Action): The action to be saved.
@@ -231,11 +429,7 @@ class RunningRecoder():
         Returns:
             None
         """
-        with open(os.path.join(self.record_root_dir, "tool_call_logs", f"{self.tool_call_id:05d}_tool.json"), "w", encoding="utf-8") as writer:
-            tool_call_log = action.to_json()
-            json.dump(tool_call_log,writer,indent=2, ensure_ascii=False)
-        with open(os.path.join(self.record_root_dir, "tool_call_logs", f"{self.tool_call_id:05d}_code.py"), "w", encoding="utf-8") as writer:
-            writer.write(now_code)
+        self.storage.append_tool_call(self.tool_call_id, action.to_json(), now_code)
 
         self.tool_call_id += 1
 
@@ -261,4 +455,39 @@ class RunningRecoder():
         Returns:
             bool: True if the current cache is the final cache, False otherwise.
         """
-        return self.llm_interface_id + 1 >= len(self.llm_record_cache)
\ No newline at end of file
+        return self.llm_interface_id + 1 >= len(self.llm_record_cache)
+
+    def flush(self):
+        """
+        Waits until the registered records are written to the storage.
+        """
+        self.storage.flush()
+
+    def get_write_stats(self) -> dict:
+        """
+        Returns the queue depth and the write latency of the recorder, see `RecordWriter.get_stats`.
+        """
+        return self.storage.get_stats()
+
+    def close(self):
+        """
+        Flushes and closes the storage, the recorder can't be written afterwards.
+
+        Raises:
+            RuntimeError: If a record write failed since the last flush, see `RecordWriter.close`.
+        """
+        try:
+            self.storage.close()
+        finally:
+            if self.loaded_storage != None:
+                self.llm_record_cache.close()
+                self.loaded_storage.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert record directories to the current llm record format.")
+    parser.add_argument("record_dirs", nargs="+", help="record directories, such as ./apa_case")
+    args = parser.parse_args()
+    for record_dir in args.record_dirs:
+        size_before, size_after = migrate_record_dir(record_dir)
+        print(f"{record_dir}: {size_before} -> {size_after} bytes")
@@ -0,0 +1,145 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from ProAgent.config import CONFIG
+from ProAgent.router.utils import ENVIRONMENT
+from ProAgent.record_storage import BlobStore, open_record_storage
+from ProAgent.running_recorder import RunningRecoder, LLMRecordReader, migrate_record_dir, load_llm_record_blobs, LLM_RECORD_FORMAT_VERSION
+
+
+class RunningRecoderTest(unittest.TestCase):
+    storage_backend = "directory"
+
+    def setUp(self) -> None:
+        """
+        Record three llm calls into a temporary directory, the first and the third with the same user message.
+        """
+        self.base_dir = tempfile.mkdtemp()
+        self.environment = CONFIG.environment
+        writer = RunningRecoder(record_base_dir=self.base_dir, storage_backend=self.storage_backend)
+        for k, user_content in enumerate(["draw a plan", "write the code", "draw a plan"]):
+            writer.regist_llm_inout(base_kwargs={"model": "gpt-4"},
+                                    messages=[{"role": "system", "content": f"system {k}"}, {"role": "user", "content": user_content}],
+                                    functions=None, function_call=None, stop=None, other_args={},
+                                    output_data={"choices": [{"message": {"content": f"answer {k}"}}]})
+        writer.close()
+        self.record_dir = writer.record_root_dir
+
+    def tearDown(self) -> None:
+        CONFIG.environment = self.environment
+        shutil.rmtree(self.base_dir)
+
+    def load(self):
+        reader = RunningRecoder(record_base_dir=self.base_dir, storage_backend="directory")
+        reader.load_from_disk(self.record_dir, cfg=None)
+        self.addCleanup(reader.close)
+        return reader
+
+    def query(self, reader, user_content, restrict_cache_query):
+        output = reader.query_llm_inout(restrict_cache_query=restrict_cache_query,
+                                        base_kwargs={"model": "gpt-4"},
+                                        messages=[{"role": "system", "content": "changed"}, {"role": "user", "content": user_content}],
+                                        functions=None, function_call=None, stop=None, other_args={})
+        return output["choices"][0]["message"]["content"] if output != None else None
+
+    def test_refine_query(self):
+        """
+        Only user messages are compared, and the first matching record wins unless the id is restricted.
+        The records are only read as far as needed to find a match.
+        """
+        CONFIG.environment = ENVIRONMENT.Refine
+        reader = self.load()
+        self.assertEqual(self.query(reader, "draw a plan", restrict_cache_query=False), "answer 0")
+        self.assertEqual(reader.llm_record_indexed, 1)
+        self.assertEqual(self.query(reader, "write the code", restrict_cache_query=False), "answer 1")
+        self.assertEqual(reader.llm_record_indexed, 2)
+        self.assertEqual(self.query(reader, "unknown", restrict_cache_query=False), None)
+        self.assertEqual(reader.llm_record_indexed, 3)
+        self.assertEqual(len(reader.llm_record_index), 2)
+
+        reader.llm_interface_id = 2
+        self.assertEqual(self.query(reader, "draw a plan", restrict_cache_query=True), "answer 2")
+        self.assertEqual(self.query(reader, "write the code", restrict_cache_query=True), None)
+
+    def test_production_query(self):
+        CONFIG.environment = ENVIRONMENT.Production
+        reader = self.load()
+        self.assertEqual(reader.llm_record_indexed, 0)
+        self.assertEqual(len(reader.llm_record_cache), 3)
+        reader.llm_interface_id = 1
+        self.assertEqual(self.query(reader, "anything", restrict_cache_query=True), "answer 1")
+        reader.llm_interface_id = 3
+        self.assertEqual(self.query(reader, "anything", restrict_cache_query=True), None)
+
+    def test_lazy_reader(self):
+        """
+        Records are read on demand, and only the prefetch window around the last read is kept.
+        """
+        reader = LLMRecordReader(open_record_storage(self.record_dir), prefetch_window=1)
+        self.addCleanup(reader.close)
+        self.assertEqual(reader.records, {})
+        self.assertEqual(reader[2]["output"]["choices"][0]["message"]["content"], "answer 2")
+        self.assertEqual([llm_pair["llm_interface_id"] for llm_pair in reader], [0, 1, 2])
+        self.assertEqual(sorted(reader.records.keys()), [1, 2])
+        self.assertEqual(reader[-1]["llm_interface_id"], 2)
+        with self.assertRaises(IndexError):
+            reader[3]
+
+    def test_migrate_legacy_records(self):
+        """
+        Legacy records repeat the request under base_kwargs, the migration keeps only the completion kwargs there.
+        """
+        pair_dir = os.path.join(self.record_dir, "LLM_inout_pair")
+        file_path = os.path.join(pair_dir, sorted(os.listdir(pair_dir))[0])
+        with open(file_path, "r", encoding="utf-8") as reader:
+            llm_pair = json.load(reader)
+        llm_pair.pop("format_version")
+        llm_pair["input"]["messages"] = [{"role": "system", "content": "system 0"}, {"role": "user", "content": "draw a plan"}]
+        llm_pair["input"]["base_kwargs"].update({"messages": llm_pair["input"]["messages"], "functions": []})
+        with open(file_path, "w", encoding="utf-8") as writer:
+            json.dump(llm_pair, writer, indent=2, ensure_ascii=False)
+
+        size_before, size_after = migrate_record_dir(self.record_dir)
+        self.assertLess(size_after, size_before)
+        with open(file_path, "r", encoding="utf-8") as reader:
+            migrated = json.load(reader)
+        self.assertEqual(migrated["input"]["base_kwargs"], {"model": "gpt-4"})
+        self.assertEqual(migrated["format_version"], LLM_RECORD_FORMAT_VERSION)
+        self.assertEqual(load_llm_record_blobs(migrated, BlobStore(os.path.join(self.record_dir, "blobs")))["messages"], llm_pair["input"]["messages"])
+        self.assertEqual(migrate_record_dir(self.record_dir), (size_after, size_after))
+
+    def test_messages_stored_once(self):
+        """
+        The repeated user message is stored once, and the full input is rebuilt on demand.
+        """
+        CONFIG.environment = ENVIRONMENT.Refine
+        reader = self.load()
+        self.assertEqual(len(os.listdir(os.path.join(self.record_dir, "blobs"))), 5)
+        self.assertEqual(reader.get_llm_record_input(2)["messages"], [{"role": "system", "content": "system 2"}, {"role": "user", "content": "draw a plan"}])
+
+
+class JsonlRunningRecoderTest(RunningRecoderTest):
+    storage_backend = "jsonl"
+
+    def test_migrate_legacy_records(self):
+        self.skipTest("only directories hold legacy records")
+
+    def test_messages_stored_once(self):
+        CONFIG.environment = ENVIRONMENT.Refine
+        reader = self.load()
+        self.assertEqual(len(reader.loaded_storage.load_blobs()), 5)
+        self.assertEqual(reader.get_llm_record_input(2)["messages"], [{"role": "system", "content": "system 2"}, {"role": "user", "content": "draw a plan"}])
+        self.assertEqual(os.listdir(self.record_dir), ["session.jsonl"])
+
+
+class SqliteRunningRecoderTest(JsonlRunningRecoderTest):
+    storage_backend = "sqlite"
+
+    def test_messages_stored_once(self):
+        CONFIG.environment = ENVIRONMENT.Refine
+        reader = self.load()
+        self.assertEqual(len(reader.loaded_storage.load_blobs()), 5)
+        self.assertEqual(reader.get_llm_record_input(2)["messages"], [{"role": "system", "content": "system 2"}, {"role": "user", "content": "draw a plan"}])
@@ -6,6 +6,8 @@ from typing import List, Optional
 import json
 from dataclasses import dataclass, field
 
+from ProAgent.data_preview import preview_data
+
 
 @unique
 class LLMStatusCode(Enum):
@@ -72,6 +74,14 @@ class TestResult():
     error_message: str = ""
     output_data: Optional[list] = field(default_factory=lambda: [])
 
+    # field name -> preview of the current input_data and output_data, dropped when the field is assigned
+    previews: dict = field(default_factory=lambda: {}, repr=False, compare=False)
+
+    def __setattr__(self, name, value):
+        if name in ["input_data", "output_data"] and "previews" in self.__dict__.keys():
+            self.previews.pop(name, None)
+        super().__setattr__(name, value)
+
 
     def load_from_json(self):
         pass
@@ -80,15 +90,24 @@ class TestResult():
     def to_json(self):
         pass
 
+    def get_preview(self, field_name: str) -> str:
+        """
+        Returns the bounded-size preview of `input_data` or `output_data`, computed once per assigned value.
+        The preview is dropped when the field is assigned, data changed in place must be assigned again.
+        """
+        if field_name not in self.previews.keys():
+            self.previews[field_name] = preview_data(getattr(self, field_name))
+        return self.previews[field_name]
+
     def to_str(self):
         prompt = f"""
 This function has been executed for {self.visit_times} times. Last execution:
 1.Status: {self.runtime_status.name}
 2.Input: 
-{self.input_data}
+{self.get_preview("input_data")}
 
 3.Output:
-{self.output_data}"""
+{self.get_preview("output_data")}"""
         return prompt
 
 @dataclass
@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# the tests log to a temporary directory, not to ProAgent/logs
+os.environ.setdefault("PROAGENT_LOG_DIR", tempfile.mkdtemp(prefix="proagent-logs-"))
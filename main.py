@@ -54,7 +54,16 @@ def main(cfg: omegaconf.DictConfig):
                             query=query,
                             compiler=compiler,
                             recorder=recorder)
-    handler.run()
+    try:
+        handler.run()
+    finally:
+        # the handler runs until it is interrupted
+        compiler.close()
+        try:
+            recorder.close()
+        except RuntimeError as e:
+            # the failed record writes are only reported here, they never stop the run
+            logger.error("record write failed", str(e))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,2 @@
+# measure the memory of the parameter trees of the white-listed integrations of nodes.json
+PYTHONPATH=. python scripts/parameters_benchmark.py "$@"
@@ -0,0 +1,2 @@
+# build ProAgent/n8n_parser/nodes_catalog.sqlite from nodes.json and pseudo_nodes_json/, rerun after either changes
+python -m ProAgent.n8n_parser.node_catalog "$@"
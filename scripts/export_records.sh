@@ -0,0 +1,3 @@
+# export a recording (session.jsonl, session.sqlite or a record directory) to the directory layout of ./apa_case
+# usage: sh scripts/export_records.sh <source_dir> <target_dir>
+python -m ProAgent.record_storage "$@"
@@ -0,0 +1,2 @@
+# convert record directories (such as ./apa_case) to the current llm record format
+python -m ProAgent.running_recorder "$@"
@@ -0,0 +1,108 @@
+"""Measures the memory of the parameter trees of the white-listed integrations.
+
+For every white-listed operation of `nodes.json`, the parameter trees are built as the compiler builds them
+for a new node, while tracemalloc traces the allocations. The report gives the number of parameter nodes,
+the traced bytes and the bytes of the parameter objects themselves (with their `__dict__` if they have one).
+
+Run it from the repository root with scripts/benchmark_parameters.sh. nodes.json is not part of the repository,
+it is the node definitions exported from n8n.
+"""
+import os
+import sys
+import argparse
+import tracemalloc
+
+from omegaconf import OmegaConf
+
+from ProAgent.n8n_parser.node import n8nPythonNode
+from ProAgent.n8n_parser.parameters import n8nParameter
+from ProAgent.n8n_parser.param_parser import parse_properties, clear_schema_cache
+from ProAgent.n8n_parser.node_catalog import load_integrations, resolve_integration, filter_integration_data
+
+
+def iter_parameters(param: n8nParameter):
+    """
+    Yields a parameter node and all the nodes of its `meta` children.
+    """
+    yield param
+    for sub_param in getattr(param, "meta", {}).values():
+        yield from iter_parameters(sub_param)
+
+def get_object_size(param: n8nParameter) -> int:
+    size = sys.getsizeof(param)
+    if hasattr(param, "__dict__"):
+        size += sys.getsizeof(param.__dict__)
+    return size
+
+def get_white_listed_nodes(integrations: list, white_list: list) -> list:
+    """
+    Creates a node for every white-listed operation.
+
+    Args:
+        integrations (list[dict]): The integration jsons, from `load_integrations`.
+        white_list (list[str]): The white list entries, such as "slack.message.post".
+
+    Returns:
+        list[n8nPythonNode]: The nodes, without parameters.
+    """
+    integration_jsons = {integration_json["name"].split(".")[-1]: integration_json for integration_json in integrations}
+    nodes = []
+    for full_tool in white_list:
+        integration_json = integration_jsons.get(full_tool.split(".")[0])
+        if integration_json == None:
+            continue
+        integration_data = filter_integration_data(resolve_integration(integration_json), full_tool)
+        for resource_name, operations in integration_data.items():
+            for operation_name, node_meta in operations.items():
+                nodes.append(n8nPythonNode(node_id=len(nodes) + 1, node_meta=node_meta, node_json=integration_json))
+    return nodes
+
+def run_benchmark(nodes: list) -> dict:
+    """
+    Builds the parameter trees of the nodes from scratch.
+
+    Args:
+        nodes (list[n8nPythonNode]): The nodes, from `get_white_listed_nodes`.
+
+    Returns:
+        dict: "operations", "parameters" (the number of parameter nodes), "traced_bytes" (the memory allocated
+            for the trees) and "object_bytes" (the size of the parameter objects, without their strings and containers).
+    """
+    clear_schema_cache()
+    tracemalloc.start()
+    try:
+        start_bytes = tracemalloc.get_traced_memory()[0]
+        all_params = [parse_properties(node) for node in nodes]
+        traced_bytes = tracemalloc.get_traced_memory()[0] - start_bytes
+    finally:
+        tracemalloc.stop()
+
+    parameters = [sub_param for params in all_params for param in params.values() for sub_param in iter_parameters(param)]
+    result = {
+        "operations": len(nodes),
+        "parameters": len(parameters),
+        "traced_bytes": traced_bytes,
+        "object_bytes": sum(get_object_size(param) for param in parameters),
+    }
+    clear_schema_cache()
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the memory of the parameter trees of the white-listed integrations.")
+    parser.add_argument("--nodes_json_path", default=None, help="defaults to the config's parser.nodes_json_path")
+    parser.add_argument("--pseudo_nodes_dir", default="ProAgent/n8n_parser/pseudo_nodes_json")
+    parser.add_argument("--config_path", default="ProAgent/configs/generate_n8n_query.yaml", help="the config whose parser.nodes_whtie_list is measured")
+    parser.add_argument("--white_list", nargs="*", default=None, help="white list entries used instead of the config's")
+    args = parser.parse_args()
+
+    parser_cfg = OmegaConf.load(args.config_path).parser
+    white_list = args.white_list if args.white_list != None else list(parser_cfg.nodes_whtie_list)
+    nodes_json_path = args.nodes_json_path if args.nodes_json_path != None else parser_cfg.nodes_json_path
+    if not os.path.isfile(nodes_json_path):
+        parser.error(f"{nodes_json_path} not found, export the node definitions of n8n there or pass --nodes_json_path")
+    nodes = get_white_listed_nodes(load_integrations(nodes_json_path, args.pseudo_nodes_dir), white_list)
+    result = run_benchmark(nodes)
+    print(f"{result['operations']} operations, {result['parameters']} parameter nodes")
+    print(f"traced memory: {result['traced_bytes']} bytes ({result['traced_bytes'] / max(1, result['parameters']):.1f} per parameter)")
+    print(f"parameter objects: {result['object_bytes']} bytes ({result['object_bytes'] / max(1, result['parameters']):.1f} per parameter)")